@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import time
+
+# Add the project root to the Python path so the example below can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from observability.log import get_logger
+from observability.metrics import CIRCUIT_BREAKER_STATE
+
+logger = get_logger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+# Values of the circuit_breaker_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_upstream_failure(status_code):
+    """
+    Whether a failed call says the upstream is unhealthy: no response at all, 429 or 5xx.
+    Other 4xx answers come from a healthy service and do not count against it.
+    """
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream service after failure_threshold consecutive failures.
+    While open, allow() returns False so callers fail fast and use their local fallback;
+    after reset_timeout seconds one trial call is let through (half-open), and its
+    outcome closes the circuit again or keeps it open for another reset_timeout.
+    Thread-safe, and usable from async code since it never blocks.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self.lock = threading.Lock()
+        CIRCUIT_BREAKER_STATE.labels(service=name).set(STATE_VALUES[CLOSED])
+
+    def allow(self):
+        """
+        Returns True if a call may be made now. A True in the half-open state reserves
+        the trial call, so the caller must report its outcome.
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+            # A trial whose outcome was never reported (e.g. a cancelled request) expires
+            if self.trial_started_at is not None and self.clock() - self.trial_started_at < self.reset_timeout:
+                return False
+            self.trial_started_at = self.clock()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.trial_started_at = None
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_started_at = None
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+                self._set_state(OPEN)
+
+    def record_error(self, status_code=None):
+        """
+        Records a failed call, with the status of the response (None when none was received).
+        Errors that are not the upstream's fault count as a success.
+        """
+        if is_upstream_failure(status_code):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning("Circuit breaker changed state",
+                           extra={"service": self.name, "from_state": self.state, "to_state": state, "failures": self.failures})
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(service=self.name).set(STATE_VALUES[state])
+
+    def status(self):
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(service):
+    """
+    The circuit breaker shared by every client of an upstream service (e.g. "rxnorm"),
+    configured with <SERVICE>_BREAKER_FAILURES (default 5) and <SERVICE>_BREAKER_RESET_S
+    (default 30). <SERVICE>_BREAKER_FAILURES=0 disables it.
+    """
+    with _breakers_lock:
+        if service not in _breakers:
+            prefix = service.upper()
+            threshold = int(os.getenv(f"{prefix}_BREAKER_FAILURES", "5"))
+            _breakers[service] = CircuitBreaker(
+                service,
+                failure_threshold=threshold if threshold > 0 else float("inf"),
+                reset_timeout=float(os.getenv(f"{prefix}_BREAKER_RESET_S", "30")),
+            )
+        return _breakers[service]
+
+
+def breaker_states():
+    """
+    {service: status} of every circuit breaker created so far, for the readiness endpoint.
+    """
+    with _breakers_lock:
+        return {service: breaker.status() for service, breaker in _breakers.items()}
+
+if __name__ == "__main__":
+    breaker = CircuitBreaker("example", failure_threshold=2, reset_timeout=0.1)
+    for _ in range(2):
+        breaker.record_failure()
+    print(breaker.state, breaker.allow())
+    time.sleep(0.1)
+    print(breaker.allow(), breaker.state)
+    breaker.record_success()
+    print(breaker.state)
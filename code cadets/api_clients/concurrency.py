@@ -0,0 +1,47 @@
+import asyncio
+import os
+import threading
+
+
+class AsyncConcurrencyLimit:
+    """
+    Lets at most limit coroutines into an 'async with' block at once; the others wait.
+    A limit of 0 means unlimited. The semaphore is created in the running event loop on
+    first use, so one instance can be shared by a client created outside the loop.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._loop = None
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._semaphore = loop, asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def __aenter__(self):
+        if self.limit:
+            await self._get_semaphore().acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.limit:
+            self._semaphore.release()
+
+
+_limits = {}
+_limits_lock = threading.Lock()
+
+
+def get_upstream_limit(service, default):
+    """
+    The limit on concurrent calls to an upstream service (e.g. "granite") shared by all of
+    its async clients, configured with <SERVICE>_MAX_IN_FLIGHT (0 for unlimited).
+    Calls over the limit wait here instead of piling onto the upstream and drawing 429s.
+    """
+    with _limits_lock:
+        if service not in _limits:
+            _limits[service] = AsyncConcurrencyLimit(int(os.getenv(f"{service.upper()}_MAX_IN_FLIGHT", str(default))))
+        return _limits[service]
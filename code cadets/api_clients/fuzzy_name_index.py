@@ -0,0 +1,198 @@
+from collections import namedtuple
+import os
+import sys
+
+# Add the project root to the Python path so the example below can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.rxnorm_store import SYNONYM_TTYS, normalize_name
+
+# Term types indexed by default: ingredients and brand names, which is what NER finds in
+# prescriptions. Clinical drug names ("aspirin 81 MG Oral Tablet") are left out.
+DEFAULT_FUZZY_TTYS = ("IN", "PIN", "MIN", "BN", "SY", "TMSY")
+
+# Only the first characters of each name are expanded into deletes; the rest is checked
+# by the edit distance of each candidate (the SymSpell prefix trick, which bounds memory)
+DEFAULT_PREFIX_LENGTH = 7
+
+# One ranked candidate for a query
+FuzzyMatch = namedtuple("FuzzyMatch", ["rxcui", "name", "tty", "distance"])
+
+
+def max_distance_for(term, max_distance=2):
+    """
+    Edits allowed for a query of this length: short names are too easily confused to correct.
+    """
+    if len(term) < 4:
+        return 0
+    if len(term) < 5:
+        return min(1, max_distance)
+    return max_distance
+
+
+def _deletes(word, distance):
+    """
+    Returns word and every string made by deleting up to distance characters from it.
+    """
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a, b, limit):
+    """
+    Damerau-Levenshtein distance (optimal string alignment) between a and b, or limit + 1
+    as soon as it is known to exceed limit. Only the diagonal band of width 2 * limit + 1
+    can hold distances within limit, so only that band is computed.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    beyond = limit + 1
+    previous_previous = None
+    previous = [j if j <= limit else beyond for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [beyond] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        char = a[i - 1]
+        # Plain comparisons instead of min(): this loop is where lookups spend their time
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            distance = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+            if previous[j] < distance:
+                distance = previous[j] + 1
+            if current[j - 1] < distance:
+                distance = current[j - 1] + 1
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1] and previous_previous[j - 2] < distance:
+                distance = previous_previous[j - 2] + 1
+            current[j] = distance
+            if distance < row_min:
+                row_min = distance
+        if row_min > limit:
+            return beyond
+        previous_previous, previous = previous, current
+    return min(previous[-1], beyond)
+
+
+class FuzzyNameIndex:
+    """
+    Typo-tolerant drug name lookup (a SymSpell-style deletion dictionary).
+    Every indexed name is stored under all the strings obtained by deleting up to
+    max_distance characters from its prefix. A query generates the same deletes of its own
+    prefix, so the names within max_distance edits are found with a few dozen dict lookups,
+    and only those candidates have their edit distance computed.
+    """
+
+    def __init__(self, names, max_distance=2, prefix_length=DEFAULT_PREFIX_LENGTH):
+        """
+        names: (name, rxcui, tty) tuples.
+        """
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.terms = []
+        self.concepts = []
+        term_ids = {}
+        self.deletes = {}
+        for name, rxcui, tty in names:
+            name = normalize_name(name)
+            term_id = term_ids.get(name)
+            if term_id is None:
+                term_id = term_ids[name] = len(self.terms)
+                self.terms.append(name)
+                self.concepts.append([])
+                for delete in _deletes(name[:prefix_length], max_distance):
+                    self.deletes.setdefault(delete, []).append(term_id)
+            self.concepts[term_id].append((rxcui, tty))
+        self.term_ids = term_ids
+
+    def __len__(self):
+        return len(self.terms)
+
+    @classmethod
+    def from_store(cls, store, ttys=DEFAULT_FUZZY_TTYS, **options):
+        """
+        Indexes the names of the given term types in an RxNormStore.
+        """
+        return cls(store.iter_names(ttys), **options)
+
+    def _closest(self, term, keep):
+        """
+        Returns (distance, term_id) of the keep closest indexed names (more on ties).
+        Candidates are checked in order of a lower bound on their distance (the characters
+        deleted on either side to meet), so once keep names are found the rest is skipped.
+        """
+        term = normalize_name(term.replace("#", " "))
+        exact = self.term_ids.get(term)
+        if exact is not None:
+            return [(0, exact)]
+        max_distance = max_distance_for(term, self.max_distance)
+        if max_distance == 0:
+            return []
+
+        prefix = term[:self.prefix_length]
+        bounds = {}
+        for delete in _deletes(prefix, max_distance):
+            deleted = len(prefix) - len(delete)
+            for term_id in self.deletes.get(delete, ()):
+                bound = max(deleted, min(len(self.terms[term_id]), self.prefix_length) - len(delete))
+                if bound < bounds.get(term_id, max_distance + 1):
+                    bounds[term_id] = bound
+
+        found = []
+        cutoff = max_distance
+        for term_id in sorted(bounds, key=bounds.get):
+            if bounds[term_id] > cutoff:
+                break
+            distance = edit_distance(term, self.terms[term_id], cutoff)
+            if distance <= cutoff:
+                found.append((distance, term_id))
+                if len(found) >= keep:
+                    cutoff = sorted(distance for distance, _ in found)[keep - 1]
+        return [(distance, term_id) for distance, term_id in found if distance <= cutoff]
+
+    def lookup(self, term, limit=5):
+        """
+        Returns up to limit FuzzyMatch candidates for term, closest first and canonical names
+        before synonyms. '##' word-piece markers left by NER are ignored.
+        """
+        matches = [
+            FuzzyMatch(rxcui, self.terms[term_id], tty, distance)
+            for distance, term_id in self._closest(term, limit)
+            for rxcui, tty in self.concepts[term_id]
+        ]
+        matches.sort(key=lambda match: (match.distance, match.tty in SYNONYM_TTYS, match.name))
+        return matches[:limit]
+
+    def best_match(self, term):
+        """
+        Returns the FuzzyMatch of the closest name, or None when nothing is close enough or
+        the closest names belong to different concepts (a guess would be unsafe).
+        """
+        matches = [
+            FuzzyMatch(rxcui, self.terms[term_id], tty, distance)
+            for distance, term_id in self._closest(term, 1)
+            for rxcui, tty in self.concepts[term_id]
+        ]
+        if len({match.rxcui for match in matches}) != 1:
+            return None
+        return min(matches, key=lambda match: (match.tty in SYNONYM_TTYS, match.name))
+
+    def best_rxcui(self, term):
+        """
+        Returns the RxCUI of best_match(term), or None.
+        """
+        match = self.best_match(term)
+        return match.rxcui if match else None
+
+if __name__ == "__main__":
+    index = FuzzyNameIndex([
+        ("acetaminophen", "161", "IN"), ("paracetamol", "161", "SY"), ("aspirin", "1191", "IN"),
+        ("ibuprofen", "5640", "IN"), ("advil", "153010", "BN"),
+    ])
+    for query in ["paracetmol", "##pirin", "ibuprofin", "advl", "xyz"]:
+        print(query, index.lookup(query), index.best_match(query))
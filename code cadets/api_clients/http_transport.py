@@ -0,0 +1,224 @@
+from contextlib import asynccontextmanager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import asyncio
+import httpx
+import os
+import requests
+import threading
+
+from observability.metrics import UPSTREAM_RETRIES
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class CountingRetry(Retry):
+    """
+    urllib3 retry policy that counts each retry in the upstream_retries_total metric.
+    A Retry-After header is honoured up to backoff_max seconds, like the computed backoff.
+    """
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, self.backoff_max) if retry_after is not None else None
+
+    def increment(self, method=None, url=None, *args, **kwargs):
+        # Raises instead of returning once the retries are exhausted, so only real retries are counted
+        retry = super().increment(method, url, *args, **kwargs)
+        pool = kwargs.get("_pool")
+        UPSTREAM_RETRIES.labels(host=getattr(pool, "host", None) or "unknown").inc()
+        return retry
+
+
+class HTTPTransport:
+    """
+    Shared HTTP transport for all outbound clients.
+    Wraps a pooled keep-alive requests.Session with default connect/read timeouts
+    and bounded retries with exponential backoff on connection errors and 429/5xx.
+    No wait between retries, including one asked for by Retry-After, exceeds max_backoff.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, connect_timeout=3.05, read_timeout=30,
+                 max_retries=3, backoff_factor=0.5, max_backoff=10, status_forcelist=RETRY_STATUS_CODES):
+        self.timeout = (connect_timeout, read_timeout)
+        retry = CountingRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_max=max_backoff,
+            status_forcelist=status_forcelist,
+            # The Granite generation call is a POST but safe to repeat
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            # Hand the final 429/5xx back to the caller, whose raise_for_status() reports it
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds a transport configured from HTTP_* environment variables.
+        """
+        return cls(
+            pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+            pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "20")),
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+            max_retries=int(os.getenv("HTTP_MAX_RETRIES", "3")),
+            backoff_factor=float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5")),
+            max_backoff=float(os.getenv("HTTP_MAX_BACKOFF", "10")),
+        )
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHTTPTransport:
+    """
+    Async counterpart of HTTPTransport for the FastAPI request path.
+    Wraps a shared httpx.AsyncClient with connection limits, timeouts and the same
+    bounded retry-with-backoff policy on transport errors and 429/5xx, waits capped at max_backoff.
+    """
+
+    def __init__(self, max_connections=100, max_keepalive_connections=20, connect_timeout=3.05, read_timeout=30,
+                 max_retries=3, backoff_factor=0.5, max_backoff=10, status_forcelist=RETRY_STATUS_CODES):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_forcelist = status_forcelist
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds an async transport configured from HTTP_* environment variables.
+        """
+        return cls(
+            max_connections=int(os.getenv("HTTP_ASYNC_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("HTTP_POOL_MAXSIZE", "20")),
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+            max_retries=int(os.getenv("HTTP_MAX_RETRIES", "3")),
+            backoff_factor=float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5")),
+            max_backoff=float(os.getenv("HTTP_MAX_BACKOFF", "10")),
+        )
+
+    def _backoff(self, attempt, response=None):
+        # A Retry-After far in the future would hold the request (and its admission slot) for
+        # that long, so it is capped like the exponential backoff
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+
+    @staticmethod
+    def _count_retry(url):
+        UPSTREAM_RETRIES.labels(host=httpx.URL(url).host or "unknown").inc()
+
+    async def request(self, method, url, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                self._count_retry(url)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if response.status_code not in self.status_forcelist or attempt == self.max_retries:
+                return response
+            self._count_retry(url)
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    @asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        """
+        Like request, but yields a response whose body has not been read yet, for
+        streaming endpoints. Retries only happen before the caller sees the response.
+        """
+        auth = kwargs.pop("auth", None)
+        for attempt in range(self.max_retries + 1):
+            request = self.client.build_request(method, url, **kwargs)
+            try:
+                response = await self.client.send(request, auth=auth, stream=True)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                self._count_retry(url)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if response.status_code in self.status_forcelist and attempt < self.max_retries:
+                await response.aclose()
+                self._count_retry(url)
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            try:
+                yield response
+            finally:
+                await response.aclose()
+            return
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_default_transport = None
+_default_async_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """
+    Returns the process-wide transport shared by RxNormAPI, IBMLanguageModel and the dataset downloader.
+    """
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = HTTPTransport.from_env()
+    return _default_transport
+
+
+def get_async_transport():
+    """
+    Returns the process-wide async transport shared by the async client methods.
+    """
+    global _default_async_transport
+    if _default_async_transport is None:
+        with _default_transport_lock:
+            if _default_async_transport is None:
+                _default_async_transport = AsyncHTTPTransport.from_env()
+    return _default_async_transport
+
+
+async def close_async_transport():
+    """
+    Closes the shared async transport; called when the backend shuts down.
+    """
+    global _default_async_transport
+    if _default_async_transport is not None:
+        await _default_async_transport.aclose()
+        _default_async_transport = None
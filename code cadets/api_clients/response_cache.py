@@ -0,0 +1,191 @@
+from collections import OrderedDict
+from fnmatch import fnmatch
+from urllib.parse import urlencode
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DAY = 24 * 60 * 60
+
+
+class LRUTier:
+    """
+    In-process cache tier bounded by entry count and total value size in bytes.
+    Values are stored as JSON strings so their size is known and cached
+    responses cannot be mutated by callers.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= now:
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return payload
+
+    def set(self, key, payload, expires_at):
+        if key in self.entries:
+            self._remove(key)
+        if len(payload) > self.max_bytes:
+            return
+        self.entries[key] = (expires_at, payload)
+        self.bytes += len(payload)
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def _remove(self, key):
+        _, payload = self.entries.pop(key)
+        self.bytes -= len(payload)
+
+
+class DiskTier:
+    """
+    Optional on-disk cache tier backed by SQLite, so cached responses survive restarts.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key, now):
+        row = self.conn.execute("SELECT expires_at, payload FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[0] <= now:
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+        return row[1], row[0]
+
+    def set(self, key, payload, expires_at):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cache (key, expires_at, payload) VALUES (?, ?, ?)",
+            (key, expires_at, payload),
+        )
+        self.conn.commit()
+
+    def clear(self):
+        self.conn.execute("DELETE FROM cache")
+        self.conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache keyed by endpoint and request parameters.
+
+    Lookups go to the in-process LRU tier first and then to the optional disk tier;
+    disk hits are promoted into memory. TTLs are chosen per endpoint by matching the
+    endpoint against glob patterns in 'ttls', and negative results (e.g. "no RxCUI
+    found") are cached with the shorter 'negative_ttl'.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, disk_path=None,
+                 ttls=None, default_ttl=DAY, negative_ttl=60 * 60):
+        self.memory = LRUTier(max_entries, max_bytes)
+        self.disk = DiskTier(disk_path) if disk_path else None
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    @staticmethod
+    def make_key(endpoint, params=None):
+        if not params:
+            return endpoint
+        return f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+    def ttl_for(self, endpoint):
+        for pattern, ttl in self.ttls.items():
+            if fnmatch(endpoint, pattern):
+                return ttl
+        return self.default_ttl
+
+    def get(self, endpoint, params=None):
+        """
+        Returns (hit, value) for the given endpoint and parameters.
+        """
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        with self.lock:
+            payload = self.memory.get(key, now)
+            if payload is None and self.disk:
+                row = self.disk.get(key, now)
+                if row is not None:
+                    payload, expires_at = row
+                    self.memory.set(key, payload, expires_at)
+                    self.disk_hits += 1
+            if payload is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+        entry = json.loads(payload)
+        if entry["negative"]:
+            with self.lock:
+                self.negative_hits += 1
+        return True, entry["value"]
+
+    def set(self, endpoint, params, value, negative=False):
+        """
+        Caches value for the given endpoint and parameters.
+        Negative results expire after negative_ttl instead of the endpoint TTL.
+        """
+        key = self.make_key(endpoint, params)
+        ttl = self.negative_ttl if negative else self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+        payload = json.dumps({"negative": negative, "value": value}, separators=(",", ":"))
+        expires_at = time.time() + ttl
+        with self.lock:
+            self.memory.set(key, payload, expires_at)
+            if self.disk:
+                self.disk.set(key, payload, expires_at)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.disk:
+                self.disk.clear()
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters for monitoring.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "negative_hits": self.negative_hits,
+                "evictions": self.memory.evictions,
+                "entries": len(self.memory.entries),
+                "bytes": self.memory.bytes,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,68 +1,469 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import httpx
+import json
 import requests
 import os
+import sys
+import threading
+
+# Add the project root to the Python path so the example below can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.circuit_breaker import get_breaker
+from api_clients.concurrency import get_upstream_limit
+from api_clients.fuzzy_name_index import FuzzyNameIndex
+from api_clients.http_transport import get_async_transport, get_transport
+from api_clients.response_cache import DAY, ResponseCache
+from api_clients.rxnorm_store import RxNormStore, normalize_name
+from api_clients.single_flight import AsyncSingleFlight, SingleFlight
+from observability.log import get_logger
+from observability.metrics import CACHE_LOOKUPS, COALESCED_REQUESTS, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS
+from observability.tracing import span
+
+logger = get_logger(__name__)
+
+class NameMatch(namedtuple("NameMatch", ["rxcui", "name", "distance"])):
+    """
+    How a drug name was resolved. 'name' is the name that matched and 'distance' the number
+    of edits between the two: 0 for an exact match, more for a typo corrected by the fuzzy index.
+    """
+    __slots__ = ()
+
+    def describe(self):
+        """
+        The match as reported in API responses.
+        """
+        return {"rxcui": self.rxcui, "matched_name": self.name, "edit_distance": self.distance,
+                "corrected": self.distance > 0}
 
 class RxNormAPI:
     BASE_URL = "https://rxnav.nlm.nih.gov/REST"
 
-    def __init__(self, api_key=None):
+    # RxNorm content only changes with the monthly releases, so responses can be kept for days.
+    CACHE_TTLS = {
+        "rxcui": 7 * DAY,
+        "rxcui/*/properties": 7 * DAY,
+        "rxcui/*/related": 7 * DAY,
+    }
+
+    def __init__(self, api_key=None, local_store=None, remote_fallback=None, cache=None, transport=None,
+                 async_transport=None, base_url=None, fuzzy_index=None):
         # RxNorm API typically doesn't require an API key for basic searches,
         # but some advanced features or higher rate limits might. 
         # Including it for consistency with other APIs.
         self.api_key = api_key or os.getenv("RXNORM_API_KEY")
+        self.base_url = base_url or os.getenv("RXNORM_BASE_URL") or self.BASE_URL
+        self.transport = transport or get_transport()
+        self._async_transport = async_transport
+
+        # Offline mode: answer lookups from the local RxNorm store built by
+        # scripts/load_rxnorm.py, and only go to RxNav when the store has no answer.
+        self.local_store = local_store
+        if self.local_store is None:
+            try:
+                self.local_store = RxNormStore()
+            except FileNotFoundError as e:
+                logger.warning("RxNorm local store not available, using the remote API only", extra={"error": str(e)})
+        if remote_fallback is None:
+            remote_fallback = os.getenv("RXNORM_REMOTE_FALLBACK", "true").lower() != "false"
+        self.remote_fallback = remote_fallback
+
+        # Typo-tolerant name matching over the local store's ingredient and brand names, tried
+        # when neither the local store nor RxNav know the name exactly. Corrections are only
+        # returned by the match_* methods, which report them. Built on first use.
+        self._fuzzy_index = fuzzy_index
+        self.fuzzy_enabled = fuzzy_index is not None or os.getenv("RXNORM_FUZZY_ENABLED", "true").lower() != "false"
+        self._fuzzy_lock = threading.Lock()
+
+        # Any object with get(endpoint, params) -> (hit, value) and
+        # set(endpoint, params, value, negative=False) can be plugged in as the cache.
+        self.cache = cache if cache is not None else self._default_cache()
+
+        # Concurrent requests for the same endpoint and params share one upstream call,
+        # and batch lookups (resolve_many, related_many) run at most this many at once.
+        count_shared = lambda: COALESCED_REQUESTS.labels(service="rxnorm").inc()
+        self._flight = SingleFlight(on_shared=count_shared)
+        self._async_flight = AsyncSingleFlight(on_shared=count_shared)
+        self.max_concurrency = int(os.getenv("RXNORM_MAX_CONCURRENCY", "8"))
+
+        # Shared by all clients: at most RXNORM_MAX_IN_FLIGHT async calls to RxNav at once, and
+        # while RxNav keeps failing the circuit is open and lookups are answered locally only.
+        self.upstream_limit = get_upstream_limit("rxnorm", 32)
+        self.breaker = get_breaker("rxnorm")
+
+    @property
+    def async_transport(self):
+        # Resolved on first use so the shared httpx client is created inside the running event loop
+        if self._async_transport is None:
+            self._async_transport = get_async_transport()
+        return self._async_transport
+
+    @property
+    def fuzzy_index(self):
+        if self._fuzzy_index is None and self.fuzzy_enabled and self.local_store:
+            with self._fuzzy_lock:
+                if self._fuzzy_index is None:
+                    self._fuzzy_index = FuzzyNameIndex.from_store(
+                        self.local_store, max_distance=int(os.getenv("RXNORM_FUZZY_MAX_DISTANCE", "2"))
+                    )
+        return self._fuzzy_index
+
+    def load_fuzzy_index(self):
+        """
+        Builds the fuzzy name index now instead of on the first name the local store cannot match.
+        """
+        return self.fuzzy_index
+
+    @classmethod
+    def _default_cache(cls):
+        if os.getenv("RXNORM_CACHE_ENABLED", "true").lower() == "false":
+            return None
+        return ResponseCache(
+            max_entries=int(os.getenv("RXNORM_CACHE_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.getenv("RXNORM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            disk_path=os.getenv("RXNORM_CACHE_PATH"),
+            ttls=cls.CACHE_TTLS,
+            negative_ttl=int(os.getenv("RXNORM_CACHE_NEGATIVE_TTL", str(60 * 60))),
+        )
+
+    @staticmethod
+    def _is_negative(endpoint, result):
+        """
+        A name search that matched nothing still returns 200 with an empty idGroup.
+        """
+        return endpoint == "rxcui" and "rxnormId" not in result.get("idGroup", {})
+
+    def cache_stats(self):
+        if self.cache is None or not hasattr(self.cache, "stats"):
+            return None
+        return self.cache.stats()
+
+    def _prepare_request(self, endpoint, params):
+        """
+        Returns (url, params) for a request, adding the API key if one is configured.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        params = dict(params) if params else {}
 
-    def _make_request(self, endpoint, params=None):
-        url = f"{self.BASE_URL}/{endpoint}"
-        if params is None:
-            params = {}
-        
         # Add API key if it exists and is needed (though often not for RxNorm)
         if self.api_key:
             params['apiKey'] = self.api_key # This is a placeholder, check RxNav docs for actual param name
+        return url, params
+
+    def _cached(self, endpoint, params, recheck=False):
+        if self.cache is None:
+            return False, None
+        hit, result = self.cache.get(endpoint, params or {})
+        # Re-checks before a fetch are not counted, so each lookup is one hit or one miss
+        if not recheck:
+            CACHE_LOOKUPS.labels(cache="rxnorm", result="hit" if hit else "miss").inc()
+        return hit, result
+
+    def _store(self, endpoint, params, result):
+        if self.cache is not None:
+            self.cache.set(endpoint, params or {}, result, negative=self._is_negative(endpoint, result))
+
+    @staticmethod
+    def _flight_key(endpoint, params):
+        return endpoint, tuple(sorted((params or {}).items()))
+
+    def _remote_allowed(self, url):
+        """
+        False while the circuit is open: the call fails fast, like a lookup RxNav could
+        not answer, and is not cached, so it is retried once RxNav has recovered.
+        """
+        if self.breaker.allow():
+            return True
+        UPSTREAM_REQUESTS.labels(service="rxnorm", outcome="rejected").inc()
+        logger.debug("RxNorm circuit open, skipping the remote call", extra={"url": url})
+        return False
+
+    def _make_request(self, endpoint, params=None):
+        hit, result = self._cached(endpoint, params)
+        if hit:
+            return result
+        return self._flight.do(self._flight_key(endpoint, params), lambda: self._fetch(endpoint, params))
+
+    async def _make_request_async(self, endpoint, params=None):
+        hit, result = self._cached(endpoint, params)
+        if hit:
+            return result
+        return await self._async_flight.do(self._flight_key(endpoint, params), lambda: self._fetch_async(endpoint, params))
+
+    def _fetch(self, endpoint, params):
+        # A call for the same key may have finished and been cached since the cache was checked
+        hit, result = self._cached(endpoint, params, recheck=True)
+        if hit:
+            return result
+
+        url, request_params = self._prepare_request(endpoint, params)
+        if not self._remote_allowed(url):
+            return None
+        logger.debug("RxNorm request", extra={"url": url, "params": params})
+        with span("rxnorm", endpoint=endpoint), UPSTREAM_IN_FLIGHT.labels(service="rxnorm").track_inprogress():
+            try:
+                response = self.transport.get(url, params=request_params)
+                response.raise_for_status()  # Raise an exception for HTTP errors
+                result = response.json()
+            except requests.exceptions.RequestException as e:
+                UPSTREAM_REQUESTS.labels(service="rxnorm", outcome="error").inc()
+                error_response = getattr(e, 'response', None)
+                self.breaker.record_error(error_response.status_code if error_response is not None else None)
+                response_text = error_response.text if error_response is not None else None
+                logger.error("RxNorm API call failed", extra={"url": url, "error": str(e), "response": response_text})
+                return None
+        self.breaker.record_success()
+        UPSTREAM_REQUESTS.labels(service="rxnorm", outcome="ok").inc()
+        self._store(endpoint, params, result)
+        return result
+
+    async def _fetch_async(self, endpoint, params):
+        hit, result = self._cached(endpoint, params, recheck=True)
+        if hit:
+            return result
 
-        print(f"Making request to: {url} with params: {params}")
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error calling RxNorm API: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Response content: {e.response.text}")
+        url, request_params = self._prepare_request(endpoint, params)
+        if not self._remote_allowed(url):
             return None
+        logger.debug("RxNorm async request", extra={"url": url, "params": params})
+        async with self.upstream_limit:
+            with span("rxnorm", endpoint=endpoint), UPSTREAM_IN_FLIGHT.labels(service="rxnorm").track_inprogress():
+                try:
+                    response = await self.async_transport.get(url, params=request_params)
+                    response.raise_for_status()  # Raise an exception for HTTP errors
+                    result = response.json()
+                except httpx.HTTPError as e:
+                    UPSTREAM_REQUESTS.labels(service="rxnorm", outcome="error").inc()
+                    status_error = isinstance(e, httpx.HTTPStatusError)
+                    self.breaker.record_error(e.response.status_code if status_error else None)
+                    response_text = e.response.text if status_error else None
+                    logger.error("RxNorm API call failed", extra={"url": url, "error": str(e), "response": response_text})
+                    return None
+                except json.JSONDecodeError as e:
+                    # A 200 that is not JSON (e.g. a proxy's HTML error page) is an upstream failure too
+                    UPSTREAM_REQUESTS.labels(service="rxnorm", outcome="error").inc()
+                    self.breaker.record_failure()
+                    logger.error("Could not decode the RxNorm response", extra={"url": url, "error": str(e)})
+                    return None
+        self.breaker.record_success()
+        UPSTREAM_REQUESTS.labels(service="rxnorm", outcome="ok").inc()
+        self._store(endpoint, params, result)
+        return result
+
+    @staticmethod
+    def _parse_rxcui(result):
+        if result and "idGroup" in result and "rxnormId" in result["idGroup"]:
+            return result["idGroup"]["rxnormId"][0]
+        return None
+
+    @staticmethod
+    def _parse_properties(result):
+        if result and "propConceptGroup" in result and "propConcept" in result["propConceptGroup"]:
+            properties = {prop["propName"]: prop["propValue"] for prop in result["propConceptGroup"]["propConcept"]}
+            return properties
+        return None
+
+    @staticmethod
+    def _parse_related(result):
+        if result and "resultSet" in result and "conceptGroup" in result["resultSet"]:
+            return result["resultSet"]["conceptGroup"]
+        return None
+
+    def _fuzzy_match(self, drug_name):
+        """
+        The closest indexed name within a few typos, as a NameMatch, or None.
+        """
+        match = self.fuzzy_index.best_match(drug_name) if self.fuzzy_index is not None else None
+        return NameMatch(match.rxcui, match.name, match.distance) if match else None
 
     def get_rxcui_by_name(self, drug_name):
         """
         Searches for an RxCUI (RxNorm Concept Unique Identifier) by drug name.
+        Only exact matches are returned; use match_name to also correct typos.
         """
+        if self.local_store:
+            rxcui = self.local_store.get_rxcui_by_name(drug_name)
+            if rxcui or not self.remote_fallback:
+                return rxcui
+
         endpoint = "rxcui"
         params = {"name": drug_name}
-        result = self._make_request(endpoint, params)
-        if result and "idGroup" in result and "rxnormId" in result["idGroup"]:
-            return result["idGroup"]["rxnormId"][0]
-        return None
+        return self._parse_rxcui(self._make_request(endpoint, params))
+
+    def match_name(self, drug_name):
+        """
+        Resolves a drug name to a NameMatch, or None. Names known neither locally nor to
+        RxNav are matched to the closest indexed name; callers must show such a correction
+        (distance > 0) instead of treating it as the drug that was asked for.
+        """
+        rxcui = self.get_rxcui_by_name(drug_name)
+        return NameMatch(rxcui, drug_name, 0) if rxcui else self._fuzzy_match(drug_name)
 
     def get_drug_properties(self, rxcui):
         """
         Gets properties for a given RxCUI.
         """
+        if self.local_store:
+            properties = self.local_store.get_drug_properties(rxcui)
+            if properties or not self.remote_fallback:
+                return properties
+
         endpoint = f"rxcui/{rxcui}/properties"
-        result = self._make_request(endpoint)
-        if result and "propConceptGroup" in result and "propConcept" in result["propConceptGroup"]:
-            properties = {prop["propName"]: prop["propValue"] for prop in result["propConceptGroup"]["propConcept"]}
-            return properties
-        return None
+        return self._parse_properties(self._make_request(endpoint))
 
     def get_related_concepts(self, rxcui, rela_source="ALL", rela="ALL"):
         """
         Gets related concepts for a given RxCUI.
         Useful for finding alternatives or related drug forms.
         """
+        if self.local_store:
+            concept_groups = self.local_store.get_related_concepts(rxcui, rela)
+            if concept_groups or not self.remote_fallback:
+                return concept_groups
+
         endpoint = f"rxcui/{rxcui}/related"
         params = {"relaSource": rela_source, "rela": rela}
-        result = self._make_request(endpoint, params)
-        if result and "resultSet" in result and "conceptGroup" in result["resultSet"]:
-            return result["resultSet"]["conceptGroup"]
-        return None
+        return self._parse_related(self._make_request(endpoint, params))
+
+    # Async versions of the lookups for the FastAPI request path. They share the
+    # local store, cache and parsing with the blocking methods above.
+
+    async def get_rxcui_by_name_async(self, drug_name):
+        if self.local_store:
+            rxcui = self.local_store.get_rxcui_by_name(drug_name)
+            if rxcui or not self.remote_fallback:
+                return rxcui
+
+        result = await self._make_request_async("rxcui", {"name": drug_name})
+        return self._parse_rxcui(result)
+
+    async def match_name_async(self, drug_name):
+        rxcui = await self.get_rxcui_by_name_async(drug_name)
+        return NameMatch(rxcui, drug_name, 0) if rxcui else self._fuzzy_match(drug_name)
+
+    async def get_drug_properties_async(self, rxcui):
+        if self.local_store:
+            properties = self.local_store.get_drug_properties(rxcui)
+            if properties or not self.remote_fallback:
+                return properties
+
+        result = await self._make_request_async(f"rxcui/{rxcui}/properties")
+        return self._parse_properties(result)
+
+    async def get_related_concepts_async(self, rxcui, rela_source="ALL", rela="ALL"):
+        if self.local_store:
+            concept_groups = self.local_store.get_related_concepts(rxcui, rela)
+            if concept_groups or not self.remote_fallback:
+                return concept_groups
+
+        result = await self._make_request_async(f"rxcui/{rxcui}/related", {"relaSource": rela_source, "rela": rela})
+        return self._parse_related(result)
+
+    # Batch lookups. Local answers are read first; the remaining remote lookups run in
+    # parallel, at most max_concurrency at a time, instead of one after the other.
+
+    def _map_remote(self, fn, keys):
+        if len(keys) < 2:
+            return {key: fn(key) for key in keys}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(keys))) as pool:
+            return dict(zip(keys, pool.map(fn, keys)))
+
+    async def _map_remote_async(self, fn, keys):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited(key):
+            async with semaphore:
+                return await fn(key)
+
+        return dict(zip(keys, await asyncio.gather(*(limited(key) for key in keys))))
+
+    def _split_names(self, drug_names):
+        """
+        Groups names that normalize alike, resolves what it can locally and returns
+        ({normalized: [names]}, {normalized: NameMatch or None} resolved, [one name per remote lookup]).
+        """
+        groups = {}
+        for drug_name in drug_names:
+            groups.setdefault(normalize_name(drug_name), []).append(drug_name)
+        resolved, remote = {}, []
+        for key, names in groups.items():
+            rxcui = self.local_store.get_rxcui_by_name(names[0]) if self.local_store else None
+            if rxcui:
+                resolved[key] = NameMatch(rxcui, names[0], 0)
+            elif self.local_store and not self.remote_fallback:
+                resolved[key] = self._fuzzy_match(names[0])
+            else:
+                remote.append(names[0])
+        return groups, resolved, remote
+
+    def _join_names(self, groups, resolved, remote_results):
+        for drug_name, rxcui in remote_results.items():
+            resolved[normalize_name(drug_name)] = NameMatch(rxcui, drug_name, 0) if rxcui else self._fuzzy_match(drug_name)
+        return {drug_name: resolved[key] for key, names in groups.items() for drug_name in names}
+
+    def _remote_rxcui(self, drug_name):
+        return self._parse_rxcui(self._make_request("rxcui", {"name": drug_name}))
+
+    async def _remote_rxcui_async(self, drug_name):
+        return self._parse_rxcui(await self._make_request_async("rxcui", {"name": drug_name}))
+
+    def match_many(self, drug_names):
+        """
+        Matches many drug names at once, like match_name. Returns {drug_name: NameMatch or None};
+        names that only differ in case or spacing are looked up once.
+        """
+        groups, resolved, remote = self._split_names(drug_names)
+        return self._join_names(groups, resolved, self._map_remote(self._remote_rxcui, remote))
+
+    async def match_many_async(self, drug_names):
+        groups, resolved, remote = self._split_names(drug_names)
+        return self._join_names(groups, resolved, await self._map_remote_async(self._remote_rxcui_async, remote))
+
+    @staticmethod
+    def _exact_rxcuis(matches):
+        return {drug_name: match.rxcui if match and match.distance == 0 else None for drug_name, match in matches.items()}
+
+    def resolve_many(self, drug_names):
+        """
+        Resolves many drug names at once. Returns {drug_name: rxcui or None}, exact matches only.
+        """
+        return self._exact_rxcuis(self.match_many(drug_names))
+
+    async def resolve_many_async(self, drug_names):
+        return self._exact_rxcuis(await self.match_many_async(drug_names))
+
+    def _split_rxcuis(self, rxcuis, rela):
+        resolved, remote = {}, []
+        for rxcui in dict.fromkeys(rxcuis):
+            concept_groups = self.local_store.get_related_concepts(rxcui, rela) if self.local_store else None
+            if concept_groups or (self.local_store and not self.remote_fallback):
+                resolved[rxcui] = concept_groups
+            else:
+                remote.append(rxcui)
+        return resolved, remote
+
+    def related_many(self, rxcuis, rela_source="ALL", rela="ALL"):
+        """
+        Gets the related concepts of many RxCUIs at once. Returns {rxcui: concept groups or None}.
+        """
+        resolved, remote = self._split_rxcuis(rxcuis, rela)
+        fetch = lambda rxcui: self._parse_related(
+            self._make_request(f"rxcui/{rxcui}/related", {"relaSource": rela_source, "rela": rela})
+        )
+        resolved.update(self._map_remote(fetch, remote))
+        return resolved
+
+    async def related_many_async(self, rxcuis, rela_source="ALL", rela="ALL"):
+        resolved, remote = self._split_rxcuis(rxcuis, rela)
+
+        async def fetch(rxcui):
+            result = await self._make_request_async(f"rxcui/{rxcui}/related", {"relaSource": rela_source, "rela": rela})
+            return self._parse_related(result)
+
+        resolved.update(await self._map_remote_async(fetch, remote))
+        return resolved
 
 if __name__ == "__main__":
     # Example Usage:
@@ -0,0 +1,167 @@
+import sqlite3
+import os
+
+# Default location of the local RxNorm mirror built by scripts/load_rxnorm.py
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'processed', 'rxnorm.db'
+)
+
+# Term types that name a concept but are not its canonical RxNorm name
+SYNONYM_TTYS = ("SY", "TMSY", "PSN")
+
+# Term types of ingredients, which brand names resolve to
+INGREDIENT_TTYS = ("IN", "MIN", "PIN")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS concepts (
+    rxcui TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    tty TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names (
+    name_key TEXT NOT NULL,
+    rxcui TEXT NOT NULL,
+    tty TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS relations (
+    rxcui TEXT NOT NULL,
+    rela TEXT NOT NULL,
+    related_rxcui TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS properties (
+    rxcui TEXT NOT NULL,
+    prop_name TEXT NOT NULL,
+    prop_value TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_names_key ON names (name_key);
+CREATE INDEX IF NOT EXISTS idx_relations_rxcui ON relations (rxcui, rela);
+CREATE INDEX IF NOT EXISTS idx_properties_rxcui ON properties (rxcui);
+"""
+
+
+def normalize_name(name):
+    """
+    Normalizes a drug name the way lookups are keyed in the local store.
+    """
+    return " ".join(name.lower().split())
+
+
+class RxNormStore:
+    """
+    Read-only access to a local RxNorm mirror stored in SQLite.
+    Answers the same questions as the RxNav REST endpoints used by RxNormAPI,
+    returning results in the same shape.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv("RXNORM_LOCAL_DB") or DEFAULT_DB_PATH
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"RxNorm local store not found at {self.db_path}")
+        # The backend calls into the store from worker threads, and the
+        # connection is only ever read from once the loader has finished.
+        self.conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def get_rxcui_by_name(self, drug_name):
+        """
+        Returns the RxCUI whose name or synonym matches drug_name, or None.
+        Canonical names win over synonyms when both match.
+        """
+        rows = self.conn.execute(
+            "SELECT rxcui, tty FROM names WHERE name_key = ?",
+            (normalize_name(drug_name),),
+        ).fetchall()
+        if not rows:
+            return None
+        rows.sort(key=lambda row: row[1] in SYNONYM_TTYS)
+        return rows[0][0]
+
+    def iter_names(self, ttys=None):
+        """
+        Yields (name, rxcui, tty) for every name in the store, or only those of the given term types.
+        """
+        query = "SELECT name_key, rxcui, tty FROM names"
+        params = []
+        if ttys:
+            query += f" WHERE tty IN ({','.join('?' * len(ttys))})"
+            params.extend(ttys)
+        yield from self.conn.execute(query, params)
+
+    def iter_concepts(self):
+        """
+        Yields (rxcui, name, tty) for every concept in the store.
+        """
+        yield from self.conn.execute("SELECT rxcui, name, tty FROM concepts")
+
+    def iter_relations(self):
+        """
+        Yields (rxcui, rela, related_rxcui) for every relation in the store.
+        """
+        yield from self.conn.execute("SELECT rxcui, rela, related_rxcui FROM relations")
+
+    def get_drug_properties(self, rxcui):
+        """
+        Returns a propName -> propValue dict for the given RxCUI, or None.
+        """
+        concept = self.conn.execute(
+            "SELECT name, tty FROM concepts WHERE rxcui = ?", (rxcui,)
+        ).fetchone()
+        if concept is None:
+            return None
+        properties = {"RxCUI": rxcui, "RxNorm Name": concept[0], "TTY": concept[1]}
+        for prop_name, prop_value in self.conn.execute(
+            "SELECT prop_name, prop_value FROM properties WHERE rxcui = ?", (rxcui,)
+        ):
+            properties[prop_name] = prop_value
+        return properties
+
+    def get_ingredient_names(self, rxcui):
+        """
+        Returns the normalized names of the ingredients a concept stands for: its own name
+        for an ingredient, the ingredients of a brand name, or [] for any other concept.
+        """
+        concept = self.conn.execute("SELECT name, tty FROM concepts WHERE rxcui = ?", (rxcui,)).fetchone()
+        if concept is None:
+            return []
+        name, tty = concept
+        if tty in INGREDIENT_TTYS:
+            return [normalize_name(name)]
+        if tty != "BN":
+            return []
+        rows = self.conn.execute(
+            "SELECT c.name FROM relations r JOIN concepts c ON c.rxcui = r.related_rxcui "
+            f"WHERE r.rxcui = ? AND r.rela = 'tradename_of' AND c.tty IN ({','.join('?' * len(INGREDIENT_TTYS))})",
+            (rxcui, *INGREDIENT_TTYS),
+        )
+        return sorted({normalize_name(row[0]) for row in rows})
+
+    def get_related_concepts(self, rxcui, rela="ALL"):
+        """
+        Returns related concepts grouped by term type, shaped like the
+        RxNav 'conceptGroup' list, or None if nothing is related.
+        """
+        query = (
+            "SELECT c.rxcui, c.name, c.tty FROM relations r "
+            "JOIN concepts c ON c.rxcui = r.related_rxcui WHERE r.rxcui = ?"
+        )
+        params = [rxcui]
+        if rela and rela != "ALL":
+            relas = rela.split("+")
+            query += f" AND r.rela IN ({','.join('?' * len(relas))})"
+            params.extend(relas)
+
+        groups = {}
+        for related_rxcui, name, tty in self.conn.execute(query, params):
+            concepts = groups.setdefault(tty, [])
+            if not any(c["rxcui"] == related_rxcui for c in concepts):
+                concepts.append({"rxcui": related_rxcui, "name": name, "tty": tty})
+        if not groups:
+            return None
+        return [{"conceptType": tty, "concept": concepts} for tty, concepts in sorted(groups.items())]
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: while a call for a key is in flight,
+    other threads asking for that key wait for it and get its result (or its exception)
+    instead of making their own. Nothing is kept once the call finishes; caching is
+    left to the caller. on_shared, if given, is called each time a caller joins a call.
+    """
+
+    def __init__(self, on_shared=None):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.shared = 0
+        self.on_shared = on_shared
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            if self.on_shared:
+                self.on_shared()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Async twin of SingleFlight: concurrent awaiters of the same key share one task running
+    coro_fn(). The task is shielded, so one awaiter being cancelled does not cancel the
+    call for the others.
+    """
+
+    def __init__(self, on_shared=None):
+        self.tasks = {}
+        self.shared = 0
+        self.on_shared = on_shared
+
+    async def do(self, key, coro_fn):
+        task = self.tasks.get(key)
+        if task is None:
+            task = self.tasks[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda _: self.tasks.pop(key, None))
+        else:
+            self.shared += 1
+            if self.on_shared:
+                self.on_shared()
+        return await asyncio.shield(task)
+
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    flight = SingleFlight()
+    upstream_calls = []
+
+    def lookup():
+        upstream_calls.append(1)
+        time.sleep(0.1)
+        return "1191"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: flight.do(("rxcui", "aspirin"), lookup), range(8)))
+    print(f"{results} from {len(upstream_calls)} upstream call(s)")
@@ -0,0 +1,192 @@
+from collections import OrderedDict
+import asyncio
+import math
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+from api_clients.concurrency import AsyncConcurrencyLimit
+from observability.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS
+
+
+class AdmissionQueue(AsyncConcurrencyLimit):
+    """
+    Serves at most limit requests of one endpoint at once. Up to max_queue more wait for a
+    slot, for at most queue_timeout seconds; beyond that requests are rejected right away
+    instead of piling up in memory.
+    """
+
+    def __init__(self, endpoint, limit, max_queue, queue_timeout):
+        super().__init__(limit)
+        self.endpoint = endpoint
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+
+    async def acquire(self):
+        """
+        Waits for a slot. Returns None once the request holds one, or the reason it
+        was rejected ('queue_full' or 'queue_timeout').
+        """
+        semaphore = self._get_semaphore()
+        if not semaphore.locked():
+            await semaphore.acquire()
+            return None
+        if self.waiting >= self.max_queue:
+            return "queue_full"
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(endpoint=self.endpoint).inc()
+        acquire = asyncio.ensure_future(semaphore.acquire())
+        acquired = False
+        try:
+            await asyncio.wait_for(acquire, self.queue_timeout)
+            acquired = True
+            return None
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(endpoint=self.endpoint).dec()
+            if not acquired:
+                # Before Python 3.12, wait_for can time out (or be cancelled) just as the
+                # acquire goes through; the permit is then handed back instead of leaking
+                acquire.cancel()
+                acquire.add_done_callback(self._release_if_acquired)
+
+    def _release_if_acquired(self, acquire):
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._semaphore.release()
+
+    def release(self):
+        self._semaphore.release()
+
+
+class TokenBucketLimiter:
+    """
+    Per-client rate limiting: each client may make burst requests at once, refilled at
+    rate requests per second. Only the most recently seen max_clients are tracked, so
+    memory stays bounded. Used from the event loop only, so it needs no lock.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self.buckets = OrderedDict()
+
+    def take(self, client):
+        """
+        Takes a token for a request of client. Returns 0 if the request may proceed,
+        otherwise the seconds until a token is available.
+        """
+        now = self.clock()
+        tokens, last = self.buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0
+        else:
+            wait = (1 - tokens) / self.rate
+        self.buckets[client] = (tokens, now)
+        if len(self.buckets) > self.max_clients:
+            self.buckets.popitem(last=False)
+        return wait
+
+
+def endpoint_env_name(path):
+    """
+    The environment variable setting the concurrency limit of an endpoint,
+    e.g. /verify_prescription/stream -> VERIFY_PRESCRIPTION_STREAM_MAX_CONCURRENCY.
+    """
+    return path.strip("/").replace("/", "_").upper() + "_MAX_CONCURRENCY"
+
+
+def build_admission_queues(default_limits):
+    """
+    One AdmissionQueue per endpoint of {path: default limit}. Limits are overridden with
+    <ENDPOINT>_MAX_CONCURRENCY (0 for unlimited); ADMISSION_QUEUE_SIZE (default 32) and
+    ADMISSION_QUEUE_TIMEOUT (seconds, default 5) apply to every endpoint.
+    """
+    max_queue = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+    queue_timeout = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+    queues = {}
+    for path, default in default_limits.items():
+        limit = int(os.getenv(endpoint_env_name(path), str(default)))
+        if limit > 0:
+            queues[path] = AdmissionQueue(path, limit, max_queue, queue_timeout)
+    return queues
+
+
+def build_rate_limiter():
+    """
+    The per-client limiter configured by RATE_LIMIT_PER_SECOND and RATE_LIMIT_BURST
+    (default 40), or None when RATE_LIMIT_PER_SECOND is unset or 0. It is off by default:
+    behind a proxy every client has the proxy's address, so limiting needs
+    RATE_LIMIT_CLIENT_HEADER to tell clients apart.
+    """
+    rate = float(os.getenv("RATE_LIMIT_PER_SECOND") or "0")
+    if rate <= 0:
+        return None
+    return TokenBucketLimiter(rate, float(os.getenv("RATE_LIMIT_BURST", "40")))
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that decides whether a request is served before any work is done for it:
+    per-client rate limiting (429 with Retry-After), then the endpoint's concurrency limit
+    and bounded queue (503 with Retry-After when the queue is full or the wait too long).
+    A slot is held until the response is fully sent, so streamed responses count in full.
+
+    Clients are identified by the client_header when one is configured (e.g. X-API-Key, or
+    X-Forwarded-For behind a proxy), otherwise by their address.
+    """
+
+    def __init__(self, app, queues=None, rate_limiter=None, client_header=None,
+                 exempt_paths=("/", "/health", "/ready", "/metrics")):
+        self.app = app
+        self.queues = queues or {}
+        self.rate_limiter = rate_limiter
+        self.client_header = client_header.lower().encode("latin-1") if client_header else None
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        # Only limited endpoints get their own label, to keep the number of series bounded
+        endpoint = path if path in self.queues else "other"
+        if self.rate_limiter:
+            wait = self.rate_limiter.take(self._client_id(scope))
+            if wait:
+                ADMISSION_REJECTIONS.labels(endpoint=endpoint, reason="rate_limited").inc()
+                return await self._reject(scope, receive, send, 429, "Rate limit exceeded.", wait)
+
+        queue = self.queues.get(path)
+        if queue is None:
+            return await self.app(scope, receive, send)
+        reason = await queue.acquire()
+        if reason:
+            ADMISSION_REJECTIONS.labels(endpoint=endpoint, reason=reason).inc()
+            return await self._reject(scope, receive, send, 503, "Server is busy, retry shortly.", 1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            queue.release()
+
+    def _client_id(self, scope):
+        if self.client_header:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    # X-Forwarded-For lists the original client first
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    async def _reject(scope, receive, send, status_code, detail, retry_after):
+        response = JSONResponse({"detail": detail}, status_code=status_code,
+                                headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+        await response(scope, receive, send)
@@ -0,0 +1,179 @@
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+import asyncio
+import json
+
+from nlp_models.ner_model import extract_drug_dosages
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams NDJSON while the request body is still being read.
+    Starlette's StreamingResponse listens for client disconnects on the same ASGI
+    receive channel that request.stream() reads from, which would swallow request
+    body chunks the bulk pipeline has not consumed yet. This response only starts
+    listening once body_read is set; until then request.stream() itself raises
+    ClientDisconnect. Either way the content iterator is closed, so no more input
+    is read or verified for a client that went away.
+    """
+    media_type = "application/x-ndjson"
+
+    def __init__(self, content, body_read=None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def __call__(self, scope, receive, send):
+        stream = asyncio.ensure_future(self._stream(send))
+        tasks = {stream}
+        if self.body_read is not None:
+            tasks.add(asyncio.ensure_future(self._wait_for_disconnect(receive)))
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if not stream.cancelled():
+            stream.result()
+
+    async def _stream(self, send):
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            async for chunk in self.body_iterator:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(self.charset)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except (ClientDisconnect, OSError):
+            # The client went away while the body was being read or a line was being sent
+            pass
+        finally:
+            await self.body_iterator.aclose()
+
+    async def _wait_for_disconnect(self, receive):
+        await self.body_read.wait()
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+
+async def read_body(request, body_read):
+    """
+    Yields the request body's chunks and sets body_read (an asyncio.Event) once all of it is received.
+    """
+    async for chunk in request.stream():
+        yield chunk
+    body_read.set()
+
+
+async def iter_ndjson_lines(chunks):
+    """
+    Splits an async stream of byte chunks into non-empty lines without buffering the whole body.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+class BulkVerifier:
+    """
+    Verifies a stream of prescriptions for the bulk endpoint.
+
+    Each NDJSON input line is either {"id", "prescription_text", "patient_age"}, whose
+    drugs and dosages are extracted with NER, or {"id", "drug_name", "dosage", "patient_age"}.
+    Items go through NER, RxNorm resolution and dosage checking with at most
+    max_concurrency items in flight, and results are yielded as NDJSON lines in
+    completion order. Drug name lookups are deduplicated across the whole batch; a
+    misspelled name is reported with its closest match and its dosage is not checked.
+    """
+
+    def __init__(self, nlp_integrator, drug_suggester, max_concurrency=32):
+        self.nlp_integrator = nlp_integrator
+        self.drug_suggester = drug_suggester
+        self.max_concurrency = max_concurrency
+        self.rxcui_lookups = {}
+
+    async def _match_name(self, drug_name):
+        # Every item naming the same drug awaits the same lookup task
+        key = " ".join(drug_name.lower().split())
+        task = self.rxcui_lookups.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.drug_suggester.rxnorm_api.match_name_async(drug_name))
+            self.rxcui_lookups[key] = task
+        return await asyncio.shield(task)
+
+    async def verify_item(self, item):
+        patient_age = item.get("patient_age")
+        if item.get("drug_name"):
+            pairs = [{"drug": item["drug_name"], "dosage": item.get("dosage")}]
+        elif item.get("prescription_text"):
+            if not self.nlp_integrator or not self.nlp_integrator.ner_model:
+                raise RuntimeError("NER is not available to extract drugs from prescription text.")
+            text = item["prescription_text"]
+            entities = await self.nlp_integrator.extract_entities_async(text)
+            pairs = extract_drug_dosages(entities, text)
+        else:
+            raise ValueError("Each item needs either 'prescription_text' or 'drug_name'.")
+
+        matches = await asyncio.gather(*(self._match_name(pair["drug"]) for pair in pairs))
+        drugs = []
+        for pair, match in zip(pairs, matches):
+            # A corrected name leaves rxcui unset, so verify_dosage_async reports the correction
+            rxcui = match.rxcui if match and not match.distance else None
+            is_safe, message = None, "No dosage found for this drug."
+            if pair["dosage"]:
+                is_safe, message = await self.drug_suggester.verify_dosage_async(
+                    pair["drug"], pair["dosage"], patient_age,
+                    patient_weight=item.get("patient_weight_kg"), route=item.get("route"), rxcui=rxcui
+                )
+            drugs.append({
+                "drug_name": pair["drug"],
+                "rxcui": rxcui,
+                "name_match": match.describe() if match else None,
+                "dosage": pair["dosage"],
+                "is_safe": is_safe,
+                "message": message
+            })
+        return {"id": item.get("id"), "patient_age": patient_age, "drugs": drugs}
+
+    async def _verify_line(self, line_number, line):
+        item_id = line_number
+        try:
+            item = json.loads(line)
+            item_id = item.setdefault("id", line_number)
+            return await self.verify_item(item)
+        except Exception as e:
+            return {"id": item_id, "error": str(e)}
+
+    async def verify_stream(self, lines):
+        """
+        Consumes an async iterator of NDJSON lines and yields NDJSON result lines as items complete.
+        """
+        pending = set()
+        line_number = 0
+        try:
+            async for line in lines:
+                if len(pending) >= self.max_concurrency:
+                    # Stop reading input until a slot frees up, so memory stays bounded
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield json.dumps(task.result()) + "\n"
+                line_number += 1
+                pending.add(asyncio.ensure_future(self._verify_line(line_number, line)))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield json.dumps(task.result()) + "\n"
+        finally:
+            # The client went away mid-stream; drop work nobody will read, including
+            # name lookups the cancelled items were sharing
+            for task in pending:
+                task.cancel()
+            for task in self.rxcui_lookups.values():
+                task.cancel()
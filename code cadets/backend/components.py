@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+from observability.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class LazyComponent:
+    """
+    Builds a backend component on first use, or earlier during the background warm-up.
+    A component that fails to build is remembered as failed and served as None, so
+    endpoints that depend on it return 503 while the rest of the API keeps working.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.state = "not_loaded"
+        self.error = None
+        self.load_seconds = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        if self.state in ("loaded", "failed"):
+            return self.instance
+        with self.lock:
+            if self.state not in ("loaded", "failed"):
+                self._load()
+        return self.instance
+
+    def _load(self):
+        self.state = "loading"
+        start = time.perf_counter()
+        try:
+            self.instance = self.factory()
+            self.state = "loaded"
+        except Exception as e:
+            logger.error("Failed to initialize component, some functionalities might be limited",
+                         extra={"component": self.name, "error": str(e)})
+            self.error = str(e)
+            self.state = "failed"
+        self.load_seconds = round(time.perf_counter() - start, 3)
+
+    async def get_async(self):
+        """
+        Returns the component, loading it on a worker thread so the event loop keeps serving.
+        """
+        if self.state in ("loaded", "failed"):
+            return self.instance
+        return await asyncio.get_running_loop().run_in_executor(None, self.get)
+
+    @property
+    def settled(self):
+        return self.state in ("loaded", "failed")
+
+    def status(self):
+        return {"state": self.state, "error": self.error, "load_seconds": self.load_seconds}
+
+
+async def warm_up(components):
+    """
+    Loads components one after another in the background after startup.
+    """
+    for component in components:
+        await component.get_async()
@@ -1,6 +1,11 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from typing import List
+import asyncio
+import json
 import os
 import sys
 
@@ -10,28 +15,79 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # Load environment variables from .env file
 load_dotenv()
 
-# Import custom modules
-from nlp_models.nlp_integrator import NLPIntegrator
-from scripts.drug_suggestions import DrugSuggester
+# Import custom modules. The heavy ones (transformers, pandas, the HTTP clients)
+# are only imported when a component is first built, so importing this module is fast.
+from backend.bulk_verification import BulkVerifier, NDJSONStreamingResponse, iter_ndjson_lines, read_body
+from backend.admission import AdmissionMiddleware, build_admission_queues, build_rate_limiter
+from backend.components import LazyComponent, warm_up
+from api_clients.circuit_breaker import breaker_states
+from observability.log import configure_logging
+from observability.metrics import CONTENT_TYPE, render
+from observability.middleware import MetricsMiddleware
+
+configure_logging()
+
+# Maximum number of bulk items being verified at the same time per request
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "32"))
+
+# Requests each endpoint serves at once (override with e.g. VERIFY_PRESCRIPTION_MAX_CONCURRENCY).
+# The analysis endpoints are kept low since every request runs NER and calls Granite.
+ENDPOINT_CONCURRENCY = {
+    "/verify_prescription": 16,
+    "/verify_prescription/stream": 16,
+    "/verify_prescriptions/bulk": 2,
+    "/verify_dosage": 64,
+    "/suggest_alternatives": 64,
+    "/suggest_alternatives/batch": 32,
+}
+
+def _build_nlp_integrator():
+    from nlp_models.nlp_integrator import NLPIntegrator
+    return NLPIntegrator()
+
+def _build_drug_suggester():
+    from scripts.drug_suggestions import DrugSuggester
+    suggester = DrugSuggester()
+    # Part of the warm-up, so no request waits for the index to be built
+    suggester.rxnorm_api.load_fuzzy_index()
+    return suggester
+
+# NLP and Drug Suggester components, initialized on first use or by the warm-up task
+nlp_integrator = LazyComponent("nlp_integrator", _build_nlp_integrator)
+drug_suggester = LazyComponent("drug_suggester", _build_drug_suggester)
+COMPONENTS = [drug_suggester, nlp_integrator]
+
+@asynccontextmanager
+async def lifespan(app):
+    warm_up_task = None
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() != "false":
+        # Load components in the background so the server answers health checks right away
+        warm_up_task = asyncio.create_task(warm_up(COMPONENTS))
+    yield
+    if warm_up_task:
+        warm_up_task.cancel()
+    if nlp_integrator.instance:
+        await nlp_integrator.instance.aclose()
+    # Release the pooled connections of the shared async HTTP client
+    from api_clients.http_transport import close_async_transport
+    await close_async_transport()
 
 app = FastAPI(
     title="AI Medical Prescription Verification API",
     description="API for analyzing drug interactions, verifying dosages, and suggesting alternatives.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
-
-# Initialize NLP and Drug Suggester components
-try:
-    nlp_integrator = NLPIntegrator()
-except ValueError as e:
-    print(f"Failed to initialize NLPIntegrator: {e}. Some functionalities might be limited.")
-    nlp_integrator = None
-
-try:
-    drug_suggester = DrugSuggester()
-except Exception as e:
-    print(f"Failed to initialize DrugSuggester: {e}. Some functionalities might be limited.")
-    drug_suggester = None
+# Rate limiting and per-endpoint concurrency limits, checked before a request is served
+app.add_middleware(
+    AdmissionMiddleware,
+    queues=build_admission_queues(ENDPOINT_CONCURRENCY),
+    rate_limiter=build_rate_limiter(),
+    client_header=os.getenv("RATE_LIMIT_CLIENT_HEADER"),
+)
+# Latency and in-flight counts of every endpoint, served by /metrics. Added last so it
+# runs first and also records the requests rejected by admission control.
+app.add_middleware(MetricsMiddleware)
 
 class PrescriptionRequest(BaseModel):
     prescription_text: str
@@ -41,45 +97,133 @@ class DosageVerificationRequest(BaseModel):
     drug_name: str
     dosage: str
     patient_age: int = None
+    patient_weight_kg: float = None
+    route: str = None
 
 class AlternativeSuggestionRequest(BaseModel):
     drug_name: str
     patient_age: int = None
 
+class BatchAlternativeSuggestionRequest(BaseModel):
+    drug_names: List[str]
+    patient_age: int = None
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to the AI Medical Prescription Verification API"}
 
+@app.get("/health", tags=["Root"])
+async def health():
+    """
+    Liveness check: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@app.get("/ready", tags=["Root"])
+async def ready():
+    """
+    Readiness check: reports which components are loaded.
+    Returns 503 until every component has loaded, and for good once one has failed to load,
+    since its endpoints would only answer 503.
+    """
+    body = {
+        "ready": all(component.state == "loaded" for component in COMPONENTS),
+        "failed": [component.name for component in COMPONENTS if component.state == "failed"],
+        "components": {component.name: component.status() for component in COMPONENTS},
+        # Informational: with an open circuit the service still answers from local data
+        "upstreams": breaker_states(),
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/metrics", tags=["Root"])
+async def metrics():
+    """
+    Prometheus metrics: request latency per endpoint, pipeline stage timings, upstream
+    errors and retries, cache hit ratios and in-flight requests.
+    """
+    return Response(render(), media_type=CONTENT_TYPE)
+
 @app.post("/verify_prescription", tags=["Prescription Verification"])
 async def verify_prescription(request: PrescriptionRequest):
     """
     Analyzes a given prescription text for drug interactions and extracts entities.
     """
-    if not nlp_integrator:
+    integrator = await nlp_integrator.get_async()
+    if not integrator:
         raise HTTPException(status_code=503, detail="NLP services are not available.")
     
-    analysis_results = nlp_integrator.analyze_prescription(request.prescription_text)
+    analysis_results = await integrator.analyze_prescription_async(request.prescription_text)
     return {
         "prescription_text": request.prescription_text,
         "extracted_entities": analysis_results["extracted_entities"],
-        "interaction_analysis": analysis_results["interaction_analysis"]
+        "interaction_analysis": analysis_results["interaction_analysis"],
+        "interactions": analysis_results["interactions"],
+        "partial": analysis_results["partial"],
+        "timed_out": analysis_results["timed_out"],
+        "timings": analysis_results["timings"]
     }
 
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/verify_prescription/stream", tags=["Prescription Verification"])
+async def verify_prescription_stream(request: PrescriptionRequest):
+    """
+    Streaming version of /verify_prescription as server-sent events.
+    The extracted entities are sent first, then known interactions (if the interaction
+    index is loaded), then the Granite analysis token by token, then a final 'done' event.
+    """
+    integrator = await nlp_integrator.get_async()
+    if not integrator:
+        raise HTTPException(status_code=503, detail="NLP services are not available.")
+
+    async def events():
+        async for event, data in integrator.analyze_prescription_stream(request.prescription_text):
+            yield format_sse(event, data)
+
+    # No-cache and no proxy buffering, so each event reaches the client as soon as it is sent
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+@app.post("/verify_prescriptions/bulk", tags=["Prescription Verification"])
+async def verify_prescriptions_bulk(request: Request):
+    """
+    Verifies many prescriptions in one request.
+    The body is NDJSON (e.g. an uploaded .ndjson file), one item per line:
+    {"id": ..., "prescription_text": ..., "patient_age": ...} or
+    {"id": ..., "drug_name": ..., "dosage": ..., "patient_age": ...}.
+    Results are streamed back as NDJSON lines as soon as each item completes.
+    """
+    suggester = await drug_suggester.get_async()
+    if not suggester:
+        raise HTTPException(status_code=503, detail="Drug suggestion services are not available.")
+
+    # Drugs can still be checked by name when NER is unavailable
+    integrator = await nlp_integrator.get_async()
+    verifier = BulkVerifier(integrator, suggester, max_concurrency=BULK_MAX_CONCURRENCY)
+    body_read = asyncio.Event()
+    lines = iter_ndjson_lines(read_body(request, body_read))
+    return NDJSONStreamingResponse(verifier.verify_stream(lines), body_read=body_read)
+
 @app.post("/verify_dosage", tags=["Dosage Verification"])
 async def verify_dosage(request: DosageVerificationRequest):
     """
     Verifies if a given drug dosage is within a safe range.
     """
-    if not drug_suggester:
+    suggester = await drug_suggester.get_async()
+    if not suggester:
         raise HTTPException(status_code=503, detail="Drug suggestion services are not available.")
 
-    is_safe, message = drug_suggester.verify_dosage(
-        request.drug_name, request.dosage, request.patient_age
+    is_safe, message = await suggester.verify_dosage_async(
+        request.drug_name, request.dosage, request.patient_age,
+        patient_weight=request.patient_weight_kg, route=request.route
     )
     return {
         "drug_name": request.drug_name,
         "dosage": request.dosage,
         "patient_age": request.patient_age,
+        "patient_weight_kg": request.patient_weight_kg,
+        "route": request.route,
         "is_safe": is_safe,
         "message": message
     }
@@ -88,16 +232,42 @@ async def verify_dosage(request: DosageVerificationRequest):
 async def suggest_alternatives(request: AlternativeSuggestionRequest):
     """
     Suggests alternative safe drug options for a given drug.
+    A misspelled drug name is matched to the closest known name, reported in 'drug_match'.
     """
-    if not drug_suggester:
+    suggester = await drug_suggester.get_async()
+    if not suggester:
         raise HTTPException(status_code=503, detail="Drug suggestion services are not available.")
 
-    alternatives = drug_suggester.suggest_alternatives(
-        request.drug_name, request.patient_age
-    )
+    match = await suggester.rxnorm_api.match_name_async(request.drug_name)
+    alternatives = []
+    if match:
+        alternatives = await suggester.suggest_alternatives_async(
+            request.drug_name, request.patient_age, match=match
+        )
     return {
         "original_drug": request.drug_name,
+        "drug_match": match.describe() if match else None,
+        "patient_age": request.patient_age,
+        "suggested_alternatives": alternatives
+    }
+
+@app.post("/suggest_alternatives/batch", tags=["Alternative Suggestions"])
+async def suggest_alternatives_batch(request: BatchAlternativeSuggestionRequest):
+    """
+    Suggests alternatives for several drugs (e.g. every drug of a prescription) in one request.
+    The RxNorm lookups for all drugs run in parallel.
+    """
+    suggester = await drug_suggester.get_async()
+    if not suggester:
+        raise HTTPException(status_code=503, detail="Drug suggestion services are not available.")
+
+    matches = await suggester.rxnorm_api.match_many_async(request.drug_names)
+    alternatives = await suggester.suggest_alternatives_many_async(
+        request.drug_names, request.patient_age, matches=matches
+    )
+    return {
         "patient_age": request.patient_age,
+        "drug_matches": {drug_name: match.describe() if match else None for drug_name, match in matches.items()},
         "suggested_alternatives": alternatives
     }
 
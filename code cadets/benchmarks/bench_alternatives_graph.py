@@ -0,0 +1,152 @@
+"""
+Per-query latency of alternative suggestions from the precomputed alternatives graph
+versus the live relation walk (RxNormAPI.get_related_concepts against the local SQLite
+store, and against a local RxNav stub). Builds a synthetic RxNorm store unless one is given.
+
+    python benchmarks/bench_alternatives_graph.py --ingredients 5000 --queries 2000
+    python benchmarks/bench_alternatives_graph.py --db-path data/processed/rxnorm.db
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Every remote lookup should reach the stub
+os.environ["RXNORM_CACHE_ENABLED"] = "false"
+
+from api_clients.rxnorm_api import RxNormAPI
+from api_clients.rxnorm_store import INDEXES, SCHEMA, RxNormStore
+from benchmarks.stubs import RxNavStubHandler, start_stub_server
+from scripts.alternatives_graph import AlternativesGraph, build_graph, save_graph
+from scripts.dosage_rules import DosageRule
+
+
+def synthetic_store(path, ingredients, rng):
+    """
+    Writes an RxNorm-shaped store: per ingredient a precise ingredient, one or two brands,
+    clinical drug components and clinical and branded drugs in a few strengths, plus
+    some two-ingredient products. Returns (ingredient rxcuis, dosage rules, classes).
+    """
+    concepts, relations = [], []
+    next_rxcui = iter(range(1000, 10 ** 9))
+
+    def concept(name, tty):
+        rxcui = str(next(next_rxcui))
+        concepts.append((rxcui, name, tty))
+        return rxcui
+
+    def relate(rxcui, rela, related_rxcui, inverse):
+        relations.append((rxcui, rela, related_rxcui))
+        relations.append((related_rxcui, inverse, rxcui))
+
+    ingredient_rxcuis, rules, classes = [], [], []
+    for i in range(ingredients):
+        name = f"drug{i}"
+        ingredient = concept(name, "IN")
+        ingredient_rxcuis.append(ingredient)
+        classes.append((ingredient, f"class{i // 8}"))
+        relate(ingredient, "has_precise_ingredient", concept(f"{name} hydrochloride", "PIN"), "precise_ingredient_of")
+        brands = [concept(f"Brand{i}{suffix}", "BN") for suffix in "ab"[:rng.randint(1, 2)]]
+        for brand in brands:
+            relate(ingredient, "tradename_of", brand, "has_tradename")
+        for strength in rng.sample([5, 10, 25, 50, 100, 250, 500], 3):
+            component = concept(f"{name} {strength} MG", "SCDC")
+            relate(ingredient, "ingredient_of", component, "has_ingredient")
+            drug = concept(f"{name} {strength} MG Oral Tablet", "SCD")
+            relate(component, "constitutes", drug, "consists_of")
+            for brand in brands:
+                branded = concept(f"{name} {strength} MG Oral Tablet [Brand{i}]", "SBD")
+                relate(drug, "tradename_of", branded, "has_tradename")
+                relate(brand, "ingredient_of", branded, "has_ingredient")
+        if i % 3 == 0:
+            rules.append(DosageRule(ingredient, name, None, 18, None, None, None, 1, 100, 400))
+        elif i % 3 == 1:
+            rules.append(DosageRule(ingredient, name, None, 2, None, None, None, 1, 100, 400))
+        if i % 10 == 9:
+            combination = concept(f"drug{i - 1} / {name}", "MIN")
+            relate(combination, "has_part", ingredient_rxcuis[-2], "part_of")
+            relate(combination, "has_part", ingredient, "part_of")
+            drug = concept(f"drug{i - 1} 5 MG / {name} 10 MG Oral Tablet", "SCD")
+            relate(combination, "ingredients_of", drug, "has_ingredients")
+
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO concepts VALUES (?, ?, ?)", concepts)
+    conn.executemany("INSERT INTO names VALUES (?, ?, ?)", [(name.lower(), rxcui, tty) for rxcui, name, tty in concepts])
+    conn.executemany("INSERT INTO relations VALUES (?, ?, ?)", relations)
+    conn.executescript(INDEXES)
+    conn.commit()
+    conn.close()
+    return ingredient_rxcuis, rules, classes
+
+
+def measure(label, lookup, rxcuis, ages):
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for rxcui, age in zip(rxcuis, ages):
+            start = time.perf_counter()
+            lookup(rxcui, age)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<34} p50 {statistics.median(latencies):9.1f} us   p99 {p99:9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the alternatives graph against the relation walk.")
+    parser.add_argument("--ingredients", type=int, default=5000, help="Ingredients in the synthetic store")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--db-path", help="Use this RxNorm store instead of a synthetic one")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = args.db_path
+        rules, classes = [], []
+        if not db_path:
+            db_path = os.path.join(folder, "rxnorm.db")
+            _, rules, classes = synthetic_store(db_path, args.ingredients, rng)
+        store = RxNormStore(db_path)
+        rxcuis = [rxcui for rxcui, _, tty in store.iter_concepts() if tty in ("IN", "BN")]
+
+        start = time.perf_counter()
+        arrays = build_graph(store, rules, classes=classes)
+        build_seconds = time.perf_counter() - start
+        graph_path = os.path.join(folder, "alternatives_graph.npz")
+        save_graph(arrays, graph_path)
+        start = time.perf_counter()
+        graph = AlternativesGraph.from_file(graph_path)
+        load_ms = (time.perf_counter() - start) * 1000
+        print(f"\n{len(graph)} concepts, {len(arrays['indices'])} alternatives: built in {build_seconds:.1f} s, "
+              f"{os.path.getsize(graph_path) / 1e6:.1f} MB on disk, loaded in {load_ms:.0f} ms")
+
+        queries = [rng.choice(rxcuis) for _ in range(args.queries)]
+        ages = [rng.choice([None, 1, 8, 15, 40, 80]) for _ in queries]
+        sample = graph.alternatives(queries[0], 8)
+        print(f"Example: {len(sample)} alternatives for {queries[0]} at age 8, e.g. {sample[:2]}")
+
+        local = RxNormAPI(local_store=store, remote_fallback=False, fuzzy_index=False)
+        server, base_url = start_stub_server(RxNavStubHandler)
+        remote = RxNormAPI(local_store=False, base_url=f"{base_url}/REST")
+        try:
+            print(f"\n--- {args.queries} queries ---")
+            measure("graph (with age filter)", graph.alternatives, queries, ages)
+            measure("local store relation walk", lambda rxcui, age: local.get_related_concepts(
+                rxcui, rela="has_precise_ingredient"), queries, ages)
+            measure("RxNav stub relation walk", lambda rxcui, age: remote.get_related_concepts(
+                rxcui, rela="has_precise_ingredient"), queries[:500], ages)
+        finally:
+            server.shutdown()
+            store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Throughput of the dosage parser, per string and over whole pandas columns.
+The column case compares parsing every row against parse_dosage_series, which
+parses each distinct string once.
+
+    python benchmarks/bench_dosage_parser.py --strings 200000 --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.dosage_parser import parse_dosage, parse_dosage_series
+
+AMOUNTS = ["500mg", "1 g", "250 mcg", "0.5g", "1,000 mg", "20 IU", "5 mL of 250mg/5mL", "10 ml of 125 mg/mL", "81 mg"]
+SCHEDULES = ["", " BID", " b.i.d.", " twice daily", " every 8 hours", " q6h prn", " 3 times a day", " once daily"]
+DURATIONS = ["", " for 7 days", " x 10 days", " for 2 weeks"]
+
+
+def synthetic_doses(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(AMOUNTS) + rng.choice(SCHEDULES) + rng.choice(DURATIONS) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark free-text dosage parsing.")
+    parser.add_argument("--strings", type=int, default=200000, help="Strings for the per-string benchmark")
+    parser.add_argument("--rows", type=int, default=1000000, help="Rows in the pandas column benchmark")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    doses = synthetic_doses(args.strings)
+    start = time.perf_counter()
+    for text in doses:
+        parse_dosage(text)
+    scalar_seconds = time.perf_counter() - start
+
+    column = pd.Series(synthetic_doses(args.rows, seed=1))
+    start = time.perf_counter()
+    column.map(parse_dosage)
+    per_row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse_dosage_series(column)
+    series_seconds = time.perf_counter() - start
+
+    print(f"\n--- Dosage parser, {len(AMOUNTS) * len(SCHEDULES) * len(DURATIONS)} distinct dose strings ---")
+    print(f"parse_dosage           {args.strings / scalar_seconds:10.0f} strings/s ({scalar_seconds / args.strings * 1e6:.2f} us/string)")
+    print(f"column, per row        {args.rows / per_row_seconds:10.0f} rows/s ({per_row_seconds:.2f} s)")
+    print(f"parse_dosage_series    {args.rows / series_seconds:10.0f} rows/s ({series_seconds:.2f} s)")
+
+if __name__ == "__main__":
+    main()
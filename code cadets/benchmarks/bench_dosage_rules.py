@@ -0,0 +1,75 @@
+"""
+Throughput of the dosage rule engine over a large synthetic rule set.
+
+    python benchmarks/bench_dosage_rules.py --rules 100000 --checks 200000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.dosage_rules import DosageRule, DosageRuleEngine
+
+AGE_BANDS = [(0, 2), (2, 12), (12, 18), (18, 65), (65, None)]
+ROUTES = ["oral", "iv"]
+
+
+def synthetic_rules(count, seed=0):
+    """
+    Yields count rules: one per (drug, route, age band), spread over count / 10 drugs.
+    """
+    rng = random.Random(seed)
+    per_drug = len(AGE_BANDS) * len(ROUTES)
+    for i in range(count):
+        drug, rest = divmod(i, per_drug)
+        route_index, band_index = divmod(rest, len(AGE_BANDS))
+        age_min, age_max = AGE_BANDS[band_index]
+        max_dose = rng.choice([50, 100, 250, 500, 1000])
+        yield DosageRule(str(100000 + drug), f"drug {drug}", ROUTES[route_index], age_min, age_max,
+                         None, None, max_dose / 10, max_dose, max_dose * 4)
+
+
+def write_rules(path, rules):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(DosageRule._fields)
+        for rule in rules:
+            writer.writerow(["" if value is None else value for value in rule])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dosage rule checks per second.")
+    parser.add_argument("--rules", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dosage_rules.csv")
+        write_rules(path, synthetic_rules(args.rules))
+
+        start = time.perf_counter()
+        engine = DosageRuleEngine(path)
+        load_seconds = time.perf_counter() - start
+
+        drugs = args.rules // (len(AGE_BANDS) * len(ROUTES))
+        rng = random.Random(1)
+        queries = [(str(100000 + rng.randrange(drugs)), rng.uniform(0, 90), rng.choice(ROUTES), rng.choice([10, 100, 800]))
+                   for _ in range(args.checks)]
+
+        start = time.perf_counter()
+        for rxcui, age, route, dose in queries:
+            engine.check(None, dose, rxcui=rxcui, age=age, route=route)
+        check_seconds = time.perf_counter() - start
+
+    print(f"\n--- Dosage rule engine, {args.rules} rules over {drugs} drugs ---")
+    print(f"load + compile         {load_seconds:8.3f} s")
+    print(f"checks                 {args.checks / check_seconds:8.0f} checks/s ({check_seconds / args.checks * 1e6:.2f} us/check)")
+
+if __name__ == "__main__":
+    main()
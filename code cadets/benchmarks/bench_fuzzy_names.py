@@ -0,0 +1,109 @@
+"""
+Recall and latency of typo-tolerant drug name resolution on a misspelling corpus:
+names from the index with one or two random edits (deletion, insertion, substitution,
+transposition) and NER word-piece fragments ("##pirin"). Uses the names of a local
+RxNorm store if given, otherwise a synthetic vocabulary of the same order of size.
+
+    python benchmarks/bench_fuzzy_names.py --names 30000 --queries 5000
+    python benchmarks/bench_fuzzy_names.py --db-path data/processed/rxnorm.db
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.fuzzy_name_index import DEFAULT_FUZZY_TTYS, FuzzyNameIndex
+from api_clients.rxnorm_store import RxNormStore
+
+COMMON_DRUGS = [
+    "acetaminophen", "paracetamol", "aspirin", "ibuprofen", "naproxen", "amoxicillin", "azithromycin",
+    "metformin", "lisinopril", "atorvastatin", "simvastatin", "amlodipine", "losartan", "omeprazole",
+    "pantoprazole", "levothyroxine", "warfarin", "clopidogrel", "metoprolol", "furosemide", "prednisone",
+    "gabapentin", "sertraline", "fluoxetine", "citalopram", "tramadol", "ciprofloxacin", "doxycycline",
+    "cetirizine", "loratadine", "albuterol", "montelukast", "insulin glargine", "hydrochlorothiazide",
+]
+CONSONANTS = "bcdfghjklmnprstvxz"
+VOWELS = "aeiouy"
+SUFFIXES = ["", "", "", "ine", "ol", "in", "ide", "pril", "sartan", "statin", "mab", "cillin", "azole", "xaban"]
+
+
+def synthetic_vocabulary(count, rng):
+    """
+    Common drug names plus made-up ones built from random syllables and typical drug suffixes.
+    """
+    names = {name: str(rxcui) for rxcui, name in enumerate(COMMON_DRUGS, start=1)}
+    while len(names) < count:
+        syllables = [rng.choice(CONSONANTS) + rng.choice(VOWELS) + rng.choice(["", "", rng.choice(CONSONANTS)])
+                     for _ in range(rng.randint(2, 3))]
+        names.setdefault("".join(syllables) + rng.choice(SUFFIXES), str(len(names) + 1))
+    return [(name, rxcui, "IN") for name, rxcui in names.items()]
+
+
+def misspell(name, rng):
+    """
+    Returns name with one or two random edits, or as a word-piece fragment.
+    """
+    if rng.random() < 0.1 and len(name) > 7:
+        return "##" + name[2:]
+    for _ in range(rng.choice([1, 1, 2])):
+        i = rng.randrange(len(name))
+        edit = rng.choice(["delete", "insert", "substitute", "transpose"])
+        if edit == "delete":
+            name = name[:i] + name[i + 1:]
+        elif edit == "insert":
+            name = name[:i] + rng.choice(string.ascii_lowercase) + name[i:]
+        elif edit == "substitute":
+            name = name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+        elif i < len(name) - 1:
+            name = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy drug name resolution.")
+    parser.add_argument("--names", type=int, default=30000, help="Size of the synthetic vocabulary")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--db-path", help="Index the names of this RxNorm store instead")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    if args.db_path:
+        store = RxNormStore(args.db_path)
+        names = list(store.iter_names(DEFAULT_FUZZY_TTYS))
+    else:
+        names = synthetic_vocabulary(args.names, rng)
+
+    start = time.perf_counter()
+    index = FuzzyNameIndex(names)
+    build_seconds = time.perf_counter() - start
+
+    # Words of at least 5 letters; shorter ones are deliberately matched exactly only
+    targets = [(name, rxcui) for name, rxcui, _ in names if len(name) >= 5]
+    top1 = top5 = wrong = 0
+    latencies = []
+    for _ in range(args.queries):
+        name, rxcui = rng.choice(targets)
+        query = misspell(name, rng)
+        start = time.perf_counter()
+        best = index.best_rxcui(query)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        matches = index.lookup(query)
+        top1 += best == rxcui
+        top5 += any(match.rxcui == rxcui for match in matches)
+        wrong += best is not None and best != rxcui
+
+    latencies.sort()
+    print(f"\n--- Fuzzy name index, {len(index)} names, {len(index.deletes)} delete keys, built in {build_seconds:.2f} s ---")
+    print(f"recall@1 (resolved)    {top1 / args.queries:.1%}")
+    print(f"recall@5 (candidates)  {top5 / args.queries:.1%}")
+    print(f"resolved to wrong drug {wrong / args.queries:.1%}")
+    print(f"resolve                p50 {statistics.median(latencies):.1f} us, p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} us")
+
+if __name__ == "__main__":
+    main()
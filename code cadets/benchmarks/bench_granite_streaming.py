@@ -0,0 +1,69 @@
+"""
+Time to first byte of the Granite interaction analysis, blocking vs streaming,
+against a local stub that generates one canned token at a time.
+
+    python benchmarks/bench_granite_streaming.py --latency 0.3 --token-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.samples import SAMPLE_PRESCRIPTIONS
+from benchmarks.stubs import GraniteStubHandler, start_stub_server
+from nlp_models.ibm_granite_nlp import IBMLanguageModel
+
+
+async def time_stream(model, text):
+    """
+    Returns (seconds to first chunk, seconds to last chunk) of one streamed analysis.
+    """
+    start = time.perf_counter()
+    first = None
+    async for _ in model.analyze_text_stream_async(text):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def run(model, repeats):
+    blocking, first_chunk, last_chunk = [], [], []
+    for _ in range(repeats):
+        for text in SAMPLE_PRESCRIPTIONS:
+            start = time.perf_counter()
+            await model.analyze_text_async(text)
+            blocking.append(time.perf_counter() - start)
+            first, last = await time_stream(model, text)
+            first_chunk.append(first)
+            last_chunk.append(last)
+    return blocking, first_chunk, last_chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming vs blocking Granite generation.")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub delay before the first token, in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.1, help="Stub delay between tokens, in seconds")
+    parser.add_argument("--repeats", type=int, default=1)
+    args = parser.parse_args()
+
+    # Every call must reach the stub
+    os.environ["GRANITE_CACHE_ENABLED"] = "false"
+    server, url = start_stub_server(GraniteStubHandler, args.latency, token_latency=args.token_latency)
+    model = IBMLanguageModel(api_key="stub", service_url=f"{url}/ml/v1/text/generation")
+    try:
+        blocking, first_chunk, last_chunk = asyncio.run(run(model, args.repeats))
+    finally:
+        server.shutdown()
+
+    print(f"\n--- Granite analysis, {len(blocking)} calls, {len(GraniteStubHandler.STUB_TOKENS)} tokens each ---")
+    print(f"blocking, full response        p50 {statistics.median(blocking) * 1000:8.1f} ms")
+    print(f"streaming, first token         p50 {statistics.median(first_chunk) * 1000:8.1f} ms")
+    print(f"streaming, last token          p50 {statistics.median(last_chunk) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Per-call latency of RxNorm lookups against a local RxNav stub, comparing
+module-level requests.get (a new connection per call) with the pooled HTTPTransport.
+
+    python benchmarks/bench_http_transport.py --calls 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.http_transport import HTTPTransport
+from benchmarks.stubs import RxNavStubHandler, start_stub_server
+
+
+def measure(get, url, calls):
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        response = get(url, params={"name": "aspirin"})
+        response.raise_for_status()
+        response.json()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(latencies):7.3f} ms   p50 {statistics.median(latencies):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server latency in seconds")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(RxNavStubHandler, latency=args.latency)
+    url = f"{base_url}/REST/rxcui"
+    try:
+        transport = HTTPTransport()
+        # Warm up both paths so neither pays one-off import or DNS costs
+        measure(requests.get, url, 5)
+        measure(transport.get, url, 5)
+
+        print(f"\n--- {args.calls} calls per client against {base_url} ---")
+        report("requests.get (no pooling)", measure(requests.get, url, args.calls))
+        report("HTTPTransport (pooled)", measure(transport.get, url, args.calls))
+        transport.close()
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
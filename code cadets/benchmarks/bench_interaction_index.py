@@ -0,0 +1,60 @@
+"""
+Latency of checking every drug pair of a prescription against the local interaction index.
+
+    python benchmarks/bench_interaction_index.py --interactions 500000 --drugs 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.interaction_index import Interaction, InteractionIndex, pair_key
+
+
+def synthetic_interactions(count, drugs, seed=0):
+    rng = random.Random(seed)
+    seen = set()
+    while len(seen) < count:
+        a, b = rng.sample(range(drugs), 2)
+        key = pair_key(f"drug {a}", f"drug {b}")
+        if key not in seen:
+            seen.add(key)
+            yield Interaction(*key, rng.choice(["minor", "moderate", "major"]), "Synthetic interaction.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pairwise interaction lookups.")
+    parser.add_argument("--interactions", type=int, default=500000)
+    parser.add_argument("--drugs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--drugs-per-prescription", type=int, default=8)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = InteractionIndex(synthetic_interactions(args.interactions, args.drugs))
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(1)
+    prescriptions = [[f"Drug {rng.randrange(args.drugs)}" for _ in range(args.drugs_per_prescription)]
+                     for _ in range(args.queries)]
+    latencies = []
+    hits = 0
+    for drugs in prescriptions:
+        start = time.perf_counter()
+        hits += len(index.find_interactions(drugs))
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+    latencies.sort()
+    print(f"\n--- Interaction index, {len(index)} pairs over {args.drugs} drugs ---")
+    print(f"build                  {build_seconds:8.3f} s")
+    print(f"{args.drugs_per_prescription} drugs per check     p50 {statistics.median(latencies):.1f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} us")
+    print(f"hits                   {hits} over {args.queries} prescriptions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Microbenchmarks of the per-request CPU work: dosage parsing, dosage rule checks,
+DrugSuggester.verify_dosage with a known RxCUI (no RxNorm calls), and NER extraction
+one text at a time and in batches. Each case reports operations per second and the
+p50/p95/p99 latency of a single operation. Results are saved under benchmarks/results/
+and compared with the previous run.
+
+NER needs HUGGING_FACE_API_KEY (and the model weights); without it the NER cases are skipped.
+
+    python benchmarks/bench_micro.py --operations 20000 --ner-texts 64
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep per-call debug and info logs out of the timings
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+from benchmarks.bench_dosage_parser import synthetic_doses
+from benchmarks.bench_dosage_rules import AGE_BANDS, ROUTES, synthetic_rules, write_rules
+from benchmarks.results import report, summarize_latencies
+from benchmarks.samples import SAMPLE_PRESCRIPTIONS
+from scripts.dosage_parser import parse_dosage
+
+
+def measure(fn, calls):
+    """
+    Runs fn(*args) for every args tuple in calls, timing each call.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for args in calls:
+        call_start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {"ops_per_s": round(len(latencies) / elapsed, 1), **summarize_latencies(latencies)}
+
+
+def dosage_cases(operations, rule_count):
+    rng = random.Random(1)
+    doses = synthetic_doses(operations)
+    drugs = rule_count // (len(AGE_BANDS) * len(ROUTES))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dosage_rules.csv")
+        write_rules(path, synthetic_rules(rule_count))
+        os.environ["DOSAGE_RULES_PATH"] = path
+        from scripts.dosage_rules import DosageRuleEngine
+        from scripts.drug_suggestions import DrugSuggester
+
+        engine = DosageRuleEngine(path)
+        suggester = DrugSuggester()
+        suggester.dosage_rules = engine
+        # check(drug_name, dose_mg, daily_mg, rxcui, age, weight, route)
+        checks = [(None, rng.choice([10, 100, 800]), None, str(100000 + rng.randrange(drugs)),
+                   rng.uniform(0, 90), None, rng.choice(ROUTES)) for _ in range(operations)]
+        # verify_dosage(drug_name, dosage, patient_age, patient_weight, route, rxcui)
+        verifications = [(f"drug {rng.randrange(drugs)}", doses[i], rng.uniform(0, 90), None, rng.choice(ROUTES),
+                          str(100000 + rng.randrange(drugs))) for i in range(operations)]
+        return {
+            "parse_dosage": measure(parse_dosage, [(dose,) for dose in doses]),
+            "dosage_rules.check": measure(engine.check, checks),
+            "verify_dosage": measure(suggester.verify_dosage, verifications),
+        }
+
+
+def ner_cases(text_count):
+    from nlp_models.ner_model import NERModel
+
+    try:
+        model = NERModel()
+    except ValueError as e:
+        print(f"Skipping the NER cases: {e}")
+        return {}
+    texts = [SAMPLE_PRESCRIPTIONS[i % len(SAMPLE_PRESCRIPTIONS)] for i in range(text_count)]
+    # Warm up the pipeline so the first measurement does not include lazy initialisation
+    model.extract_entities_batch(texts[:8])
+    cases = {"ner.extract_entities": measure(model.extract_entities, [(text,) for text in texts])}
+    batch = measure(model.extract_entities_batch, [(texts[i:i + 8],) for i in range(0, len(texts), 8)])
+    # Reported per text, so it compares with the single-text case
+    batch["texts_per_s"] = round(batch["ops_per_s"] * 8, 1)
+    cases["ner.extract_entities_batch(8)"] = batch
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of dosage checking and NER.")
+    parser.add_argument("--operations", type=int, default=20000, help="Calls per dosage case")
+    parser.add_argument("--rules", type=int, default=10000, help="Rules in the synthetic dosage rule set")
+    parser.add_argument("--ner-texts", type=int, default=64, help="Texts per NER case")
+    parser.add_argument("--skip-ner", action="store_true")
+    parser.add_argument("--no-save", action="store_true", help="Do not save the results under benchmarks/results/")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    results = dosage_cases(args.operations, args.rules)
+    if not args.skip_ner:
+        results.update(ner_cases(args.ner_texts))
+
+    print("\n--- Microbenchmarks ---")
+    print(f"{'case':<32} {'ops/s':>10} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}")
+    for case, metrics in results.items():
+        print(f"{case:<32} {metrics['ops_per_s']:>10.1f} {metrics['p50_ms'] * 1000:>9.1f} "
+              f"{metrics['p95_ms'] * 1000:>9.1f} {metrics['p99_ms'] * 1000:>9.1f}")
+
+    parameters = {key: value for key, value in vars(args).items() if key != "no_save"}
+    report("bench_micro", parameters, results, save=not args.no_save)
+
+if __name__ == "__main__":
+    main()
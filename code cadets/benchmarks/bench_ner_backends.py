@@ -0,0 +1,120 @@
+"""
+Compares the NER inference backends on CPU: accuracy against the fp32 PyTorch
+pipeline on the fixed sample prescriptions, per-text latency and peak RSS.
+Each backend runs in its own process so RSS figures do not include the others.
+
+    python scripts/export_ner_model.py --quantize
+    python benchmarks/bench_ner_backends.py --repeats 20
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from benchmarks.samples import SAMPLE_PRESCRIPTIONS
+from nlp_models.ner_model import group_entities
+
+# (label, backend, ONNX file)
+VARIANTS = [
+    ("pytorch fp32", "pytorch", None),
+    ("pytorch int8", "int8", None),
+    ("onnx fp32", "onnx", "model.onnx"),
+    ("onnx int8", "onnx", "model_quantized.onnx"),
+]
+
+
+def run_worker(backend, onnx_file, repeats):
+    """
+    Loads one backend, times it on the samples and prints a JSON report to stdout.
+    """
+    from nlp_models.ner_model import NERModel
+
+    load_dotenv()
+    start = time.perf_counter()
+    model = NERModel(backend=backend, onnx_file_name=onnx_file)
+    load_seconds = time.perf_counter() - start
+
+    spans = []
+    for text in SAMPLE_PRESCRIPTIONS:
+        entities = model.nlp(text)
+        spans.append([[span["label"], span["start"], span["end"]] for span in group_entities(entities, text)])
+
+    latencies = []
+    for _ in range(repeats):
+        for text in SAMPLE_PRESCRIPTIONS:
+            start = time.perf_counter()
+            model.nlp(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "spans": spans,
+    }))
+
+
+def span_f1(reference, candidate):
+    """
+    Span-level precision, recall and F1 of candidate against reference (exact label and offsets).
+    """
+    true_positives = predicted = expected = 0
+    for ref_spans, cand_spans in zip(reference, candidate):
+        ref_set = {tuple(span) for span in ref_spans}
+        cand_set = {tuple(span) for span in cand_spans}
+        true_positives += len(ref_set & cand_set)
+        predicted += len(cand_set)
+        expected += len(ref_set)
+    precision = true_positives / predicted if predicted else 1.0
+    recall = true_positives / expected if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare NER inference backends.")
+    parser.add_argument("--repeats", type=int, default=10, help="Passes over the sample texts when timing")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "ONNX_FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        backend, onnx_file = args.worker
+        return run_worker(backend, None if onnx_file == "-" else onnx_file, args.repeats)
+
+    reports = {}
+    for label, backend, onnx_file in VARIANTS:
+        result = subprocess.run(
+            [sys.executable, __file__, "--repeats", str(args.repeats), "--worker", backend, onnx_file or "-"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print(f"{label}: failed to run ({result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'no output'})")
+            continue
+        reports[label] = json.loads(result.stdout.strip().splitlines()[-1])
+
+    reference = reports.get("pytorch fp32")
+    print(f"\n--- NER backends on {len(SAMPLE_PRESCRIPTIONS)} sample prescriptions ---")
+    print(f"{'backend':<14} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'precision':>10} {'recall':>8} {'F1':>6}")
+    for label, report in reports.items():
+        if reference:
+            precision, recall, f1 = span_f1(reference["spans"], report["spans"])
+            accuracy = f"{precision:10.3f} {recall:8.3f} {f1:6.3f}"
+        else:
+            accuracy = f"{'n/a':>10} {'n/a':>8} {'n/a':>6}"
+        print(f"{label:<14} {report['load_seconds']:7.2f} {report['p50_ms']:8.2f} {report['p95_ms']:8.2f} "
+              f"{report['peak_rss_mb']:8.1f} {accuracy}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+CPU throughput of NERModel.extract_entities_batch for batch sizes 1, 8 and 32,
+and of the async micro-batcher under concurrent single-text requests.
+
+    python benchmarks/bench_ner_batching.py --texts 256
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.samples import SAMPLE_PRESCRIPTIONS
+from nlp_models.micro_batcher import MicroBatcher
+from nlp_models.ner_model import NERModel
+
+
+def bench_batches(model, texts, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        model.extract_entities_batch(texts[i:i + batch_size], batch_size=batch_size)
+    return len(texts) / (time.perf_counter() - start)
+
+
+async def bench_micro_batcher(model, texts, max_batch_size, max_wait_ms):
+    batcher = MicroBatcher(model.extract_entities_batch, ThreadPoolExecutor(max_workers=1),
+                           max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    start = time.perf_counter()
+    await asyncio.gather(*(batcher.submit(text) for text in texts))
+    elapsed = time.perf_counter() - start
+    stats = batcher.stats()
+    await batcher.close()
+    return len(texts) / elapsed, stats["mean_batch_size"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched NER inference on CPU.")
+    parser.add_argument("--texts", type=int, default=256, help="Number of texts per measurement")
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    model = NERModel()
+    texts = [SAMPLE_PRESCRIPTIONS[i % len(SAMPLE_PRESCRIPTIONS)] for i in range(args.texts)]
+    # Warm up the pipeline so the first measurement does not include lazy initialisation
+    model.extract_entities_batch(texts[:8])
+
+    print(f"\n--- NER throughput over {args.texts} texts ---")
+    for batch_size in (1, 8, 32):
+        print(f"extract_entities_batch, batch size {batch_size:>2}: {bench_batches(model, texts, batch_size):8.1f} texts/s")
+    for max_batch_size in (8, 32):
+        throughput, mean_batch = asyncio.run(bench_micro_batcher(model, texts, max_batch_size, args.max_wait_ms))
+        print(f"MicroBatcher, max batch {max_batch_size:>2}:          {throughput:8.1f} texts/s (mean batch {mean_batch:.1f})")
+
+if __name__ == "__main__":
+    main()
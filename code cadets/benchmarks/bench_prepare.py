@@ -0,0 +1,83 @@
+"""
+Peak memory and per-stage throughput of dataset preparation on a synthetic
+prescriptions CSV with duplicate rows and a free-text dosage column: the whole
+file at once (the old behaviour) vs bounded-memory chunks, then incremental
+rebuilds: unchanged input, and only the transform stage changed. Each run happens
+in a fresh process so its peak RSS is its own.
+
+    python benchmarks/bench_prepare.py --rows 1000000 --chunksize 100000
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.prepare_datasets import STAGES, prepare_dataset
+
+DRUGS = ["Amoxicillin", "Ibuprofen", "Paracetamol", "Warfarin", "Metformin", "Lisinopril", "Atorvastatin"]
+DOSAGES = ["500 mg bid", "250mg q8h", "1 g every 6 hours", "5 mL of 250mg/5mL tid", "10 mg once daily for 7 days"]
+
+
+def write_dataset(path, rows, duplicate_ratio, seed=0):
+    rng = random.Random(seed)
+    written = []
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("patient_id,drug_name,dosage,route,notes\n")
+        for i in range(rows):
+            if written and rng.random() < duplicate_ratio:
+                f.write(rng.choice(written))
+                continue
+            line = f"{i},{rng.choice(DRUGS)},{rng.choice(DOSAGES)},oral,note {rng.randrange(1000)}\n"
+            f.write(line)
+            if len(written) < 10000:
+                written.append(line)
+
+
+def run(data_dir, processed_dir, chunksize, **options):
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+        return pool.submit(prepare_dataset, "prescriptions.csv", data_dir, processed_dir, chunksize, **options).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunked vs whole-file dataset preparation.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Share of rows repeating an earlier row")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_dataset(os.path.join(data_dir, "prescriptions.csv"), args.rows, args.duplicates)
+        size_mb = os.path.getsize(os.path.join(data_dir, "prescriptions.csv")) / (1024 * 1024)
+        reports = {
+            "whole file": run(data_dir, data_dir, 0),
+            f"chunks of {args.chunksize}": run(data_dir, data_dir, args.chunksize),
+        }
+        with tempfile.TemporaryDirectory() as processed_dir:
+            incremental = {"first build": run(data_dir, processed_dir, args.chunksize, output_format="csv", incremental=True)}
+            incremental["unchanged"] = run(data_dir, processed_dir, args.chunksize, output_format="csv", incremental=True)
+            # A different output format changes the transform stage only
+            incremental["transform changed"] = run(data_dir, processed_dir, args.chunksize, output_format="arrow",
+                                                   incremental=True)
+
+    print(f"\n--- {args.rows} rows ({size_mb:.1f} MB CSV), {args.duplicates:.0%} duplicates ---")
+    for label, report in reports.items():
+        total = sum(report["seconds"].values())
+        rss = f"{report['peak_rss_mb']:8.1f} MB" if report["peak_rss_mb"] is not None else "     n/a   "
+        print(f"{label:<20} peak RSS {rss}  total {total:6.2f} s  "
+              f"{report['rows']['write']} rows written")
+        for stage in STAGES:
+            elapsed = report["seconds"][stage]
+            rate = report["rows"][stage] / elapsed if elapsed else 0.0
+            print(f"    {stage:<10} {elapsed:6.2f} s {rate:12.0f} rows/s")
+
+    print("\nincremental builds")
+    for label, report in incremental.items():
+        print(f"{label:<20} {report['build']:<10} total {sum(report['seconds'].values()):6.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Load time and memory of the processed interaction table as CSV (parsed into a dict per
+worker) vs Arrow IPC (memory-mapped). Each load runs in a fresh process, like a backend
+worker starting up; RSS counts the mapped file pages, which live in the shared page cache,
+while anonymous memory is what each worker holds on its own.
+
+    python benchmarks/bench_processed_formats.py --interactions 500000 --drugs 5000
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_interaction_index import synthetic_interactions
+from scripts.prepare_datasets import prepare_dataset
+
+
+def memory_mb():
+    """
+    Returns (RSS, anonymous RSS) of this process in MB.
+    """
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    return int(status["VmRSS"].split()[0]) / 1024, int(status["RssAnon"].split()[0]) / 1024
+
+
+def load_and_query(path, drugs, queries):
+    # Imported here so the baseline memory includes the modules but not the table
+    from scripts.interaction_index import InteractionIndex
+
+    rss_before, anon_before = memory_mb()
+    start = time.perf_counter()
+    index = InteractionIndex.from_file(path)
+    load_seconds = time.perf_counter() - start
+    rss_after, anon_after = memory_mb()
+
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(queries):
+        names = [f"Drug {rng.randrange(drugs)}" for _ in range(8)]
+        start = time.perf_counter()
+        index.find_interactions(names)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return {
+        "pairs": len(index), "load_seconds": load_seconds, "rss_mb": rss_after - rss_before,
+        "anon_mb": anon_after - anon_before, "p50_us": statistics.median(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs memory-mapped Arrow processed data.")
+    parser.add_argument("--interactions", type=int, default=500000)
+    parser.add_argument("--drugs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.path.join(data_dir, "drug_interactions.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["drug_1", "drug_2", "severity", "description"])
+            for interaction in synthetic_interactions(args.interactions, args.drugs):
+                writer.writerow(interaction)
+
+        results = {}
+        for output_format in ["csv", "arrow"]:
+            report = prepare_dataset("drug_interactions.csv", data_dir, data_dir, output_format=output_format)
+            with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+                result = pool.submit(load_and_query, report["output"], args.drugs, args.queries).result()
+            result["file_mb"] = os.path.getsize(report["output"]) / (1024 * 1024)
+            results[output_format] = result
+
+    print(f"\n--- Processed interaction table, {results['csv']['pairs']} pairs over {args.drugs} drugs ---")
+    for output_format, result in results.items():
+        print(f"{output_format:<6} file {result['file_mb']:7.1f} MB  load {result['load_seconds']:7.3f} s  "
+              f"RSS +{result['rss_mb']:7.1f} MB  anonymous +{result['anon_mb']:7.1f} MB  "
+              f"8-drug check p50 {result['p50_us']:6.1f} us")
+
+if __name__ == "__main__":
+    main()
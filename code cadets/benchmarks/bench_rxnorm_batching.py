@@ -0,0 +1,106 @@
+"""
+Alternative suggestions for a multi-drug prescription against a local RxNav stub with
+per-call latency: one drug after the other versus suggest_alternatives_many, and the
+upstream calls made by many concurrent requests for the same drugs with and without
+single-flight coalescing.
+
+    python benchmarks/bench_rxnorm_batching.py --latency 0.05 --concurrency 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Every lookup should reach the stub: no response cache, no local RxNorm store
+os.environ["RXNORM_CACHE_ENABLED"] = "false"
+
+from api_clients.http_transport import close_async_transport
+from api_clients.rxnorm_api import RxNormAPI
+from benchmarks.stubs import RxNavStubHandler, start_stub_server
+from scripts.drug_suggestions import DrugSuggester
+
+PRESCRIPTION = ["Aspirin", "Ibuprofen", "Warfarin", "Metformin", "Paracetamol"]
+
+
+class NoCoalescing:
+    """
+    Stands in for SingleFlight / AsyncSingleFlight: every caller makes its own call.
+    """
+    shared = 0
+
+    def do(self, key, fn):
+        return fn()
+
+
+def new_suggester(base_url, coalesce=True):
+    suggester = DrugSuggester()
+    suggester.rxnorm_api = RxNormAPI(local_store=False, base_url=f"{base_url}/REST")
+    if not coalesce:
+        suggester.rxnorm_api._flight = NoCoalescing()
+        suggester.rxnorm_api._async_flight = NoCoalescing()
+    return suggester
+
+
+def timed(fn, request_log):
+    del request_log[:]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, (time.perf_counter() - start) * 1000, len(request_log)
+
+
+def serial(suggester, patient_age):
+    return {drug_name: suggester.suggest_alternatives(drug_name, patient_age) for drug_name in PRESCRIPTION}
+
+
+async def concurrent_requests(suggester, concurrency, patient_age):
+    # Simultaneous API requests for the same prescription, as under load
+    return await asyncio.gather(*(
+        suggester.suggest_alternatives_many_async(PRESCRIPTION, patient_age) for _ in range(concurrency)
+    ))
+
+
+async def run_concurrent(base_url, concurrency, coalesce):
+    suggester = new_suggester(base_url, coalesce)
+    try:
+        return await concurrent_requests(suggester, concurrency, 40), suggester.rxnorm_api._async_flight.shared
+    finally:
+        await close_async_transport()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=50, help="Simultaneous requests in the coalescing test")
+    args = parser.parse_args()
+
+    request_log = []
+    server, base_url = start_stub_server(RxNavStubHandler, latency=args.latency, request_log=request_log)
+    try:
+        print(f"\n--- {len(PRESCRIPTION)}-drug prescription, stub latency {args.latency * 1000:.0f} ms ---")
+        suggester = new_suggester(base_url)
+        one_by_one, serial_ms, serial_calls = timed(lambda: serial(suggester, 40), request_log)
+        batched, batch_ms, batch_calls = timed(lambda: suggester.suggest_alternatives_many(PRESCRIPTION, 40), request_log)
+        assert one_by_one == batched, "batched suggestions differ from the serial ones"
+        print(f"{'serial suggest_alternatives':<32} {serial_ms:8.1f} ms   {serial_calls:4d} upstream calls")
+        print(f"{'suggest_alternatives_many':<32} {batch_ms:8.1f} ms   {batch_calls:4d} upstream calls")
+
+        print(f"\n--- {args.concurrency} concurrent requests for the same prescription ---")
+        for label, coalesce in [("without coalescing", False), ("single-flight", True)]:
+            (results, shared), elapsed_ms, calls = timed(
+                lambda: asyncio.run(run_concurrent(base_url, args.concurrency, coalesce)), request_log
+            )
+            assert all(result == batched for result in results)
+            print(f"{label:<32} {elapsed_ms:8.1f} ms   {calls:4d} upstream calls   {shared:4d} shared")
+        print(f"(minimum: {2 * len(PRESCRIPTION)} upstream calls, one per name and one per RxCUI)")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Backend startup time: how long `import backend.main` takes in a fresh interpreter,
+and how long a uvicorn worker takes to answer /health and to report /ready.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from benchmarks.load_test_backend import free_port
+
+
+def measure_import(runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import backend.main"], cwd=PROJECT_ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def wait_for(url, start, timeout, expect_status=200):
+    while time.perf_counter() - start < timeout:
+        try:
+            if httpx.get(url, timeout=1).status_code == expect_status:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure_server(timeout):
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        healthy = wait_for(f"{base_url}/health", start, timeout)
+        ready = wait_for(f"{base_url}/ready", start, timeout)
+        return healthy, ready
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend import and startup time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for /ready")
+    args = parser.parse_args()
+
+    print(f"\n--- Backend startup ({args.runs} runs) ---")
+    # Includes interpreter startup, measured the same way a worker process pays it
+    timings = measure_import(args.runs)
+    print(f"import backend.main   median {statistics.median(timings):6.3f} s   min {min(timings):6.3f} s")
+
+    healthy, ready = measure_server(args.timeout)
+    print(f"uvicorn /health 200   {healthy:6.3f} s" if healthy else "uvicorn /health       timed out")
+    print(f"uvicorn /ready 200    {ready:6.3f} s" if ready else "uvicorn /ready        timed out")
+
+if __name__ == "__main__":
+    main()
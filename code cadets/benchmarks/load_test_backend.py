@@ -0,0 +1,185 @@
+"""
+Load test for the FastAPI backend against local RxNav and Granite stubs.
+
+Drives each endpoint at fixed concurrency levels (closed loop: every client sends its
+next request as soon as the previous one is answered) and reports p50/p95/p99 latency,
+requests per second, failed requests and the process RSS after each level. The stubs
+can inject latency and errors; the backend, stubs and clients share this process,
+so the RSS includes the (small) load generator.
+
+With --compare-blocking, the async endpoints are also compared with baseline routes
+that call the blocking code paths from inside the event loop (what the endpoints did
+before). Results are saved under benchmarks/results/ and compared with the previous run.
+
+    python benchmarks/load_test_backend.py --requests 200 --concurrency 1 8 32 --latency 0.1
+    python benchmarks/load_test_backend.py --endpoints suggest_alternatives --error-rate 0.05
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.results import report, rss_mb, summarize_latencies
+from benchmarks.samples import SAMPLE_PRESCRIPTIONS
+from benchmarks.stubs import STUB_CONCEPTS, GraniteStubHandler, RxNavStubHandler, start_stub_server
+
+DRUG_NAMES = list(STUB_CONCEPTS)
+DOSAGES = ["100mg", "500mg twice daily", "1 g every 8 hours", "5 mL of 250mg/5mL three times daily"]
+
+# Request bodies per endpoint; the i-th request of a run uses payload(i), so runs send the same requests
+SCENARIOS = {
+    "suggest_alternatives": lambda i: {"drug_name": DRUG_NAMES[i % len(DRUG_NAMES)], "patient_age": 40},
+    "suggest_alternatives/batch": lambda i: {"drug_names": DRUG_NAMES[i % 2:][:3], "patient_age": 40},
+    "verify_dosage": lambda i: {"drug_name": DRUG_NAMES[i % len(DRUG_NAMES)], "dosage": DOSAGES[i % len(DOSAGES)],
+                                "patient_age": 40},
+    "verify_prescription": lambda i: {"prescription_text": SAMPLE_PRESCRIPTIONS[i % len(SAMPLE_PRESCRIPTIONS)]},
+    "verify_prescription/stream": lambda i: {"prescription_text": SAMPLE_PRESCRIPTIONS[i % len(SAMPLE_PRESCRIPTIONS)]},
+}
+# Endpoints that have a blocking baseline route for --compare-blocking
+BLOCKING_BASELINES = ("suggest_alternatives", "verify_prescription")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(app):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def add_blocking_routes(app, backend):
+    """
+    Registers routes that call the blocking implementations from an async handler.
+    """
+    @app.post("/_blocking/suggest_alternatives")
+    async def blocking_suggest_alternatives(request: backend.AlternativeSuggestionRequest):
+        return backend.drug_suggester.get().suggest_alternatives(request.drug_name, request.patient_age)
+
+    @app.post("/_blocking/verify_prescription")
+    async def blocking_verify_prescription(request: backend.PrescriptionRequest):
+        return backend.nlp_integrator.get().analyze_prescription(request.prescription_text)
+
+
+async def drive(base_url, path, payload, total, concurrency):
+    """
+    Sends total requests with concurrency clients in a closed loop.
+    Returns the wall time, the latency of every request and the number of failed requests.
+    """
+    requests = itertools.count()
+    latencies, failures = [], [0]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def worker():
+            while (i := next(requests)) < total:
+                start = time.perf_counter()
+                try:
+                    # Streamed endpoints count until the last byte of the response
+                    async with client.stream("POST", path, json=payload(i)) as response:
+                        await response.aread()
+                    if response.status_code >= 400:
+                        failures[0] += 1
+                except httpx.HTTPError:
+                    failures[0] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies, failures[0]
+
+
+def run_level(base_url, path, payload, total, concurrency):
+    elapsed, latencies, failures = asyncio.run(drive(base_url, path, payload, total, concurrency))
+    return {
+        **summarize_latencies(latencies),
+        "rps": round(total / elapsed, 1),
+        "failed": failures,
+        "rss_mb": rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against local upstream stubs.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--endpoints", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.1, help="Upstream stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls the stubs fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected upstream errors")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the stubs' error injection")
+    parser.add_argument("--cache", action="store_true", help="Keep the RxNorm and Granite response caches enabled")
+    parser.add_argument("--local-data", action="store_true",
+                        help="Use the local RxNorm store and alternatives graph if they are built")
+    parser.add_argument("--compare-blocking", action="store_true",
+                        help="Also run the blocking baseline routes at the highest concurrency level")
+    parser.add_argument("--no-save", action="store_true", help="Do not save the results under benchmarks/results/")
+    args = parser.parse_args()
+
+    injection = {"error_rate": args.error_rate, "error_status": args.error_status, "seed": args.seed}
+    rxnav, rxnav_url = start_stub_server(RxNavStubHandler, latency=args.latency, **injection)
+    granite, granite_url = start_stub_server(GraniteStubHandler, latency=args.latency, **injection)
+
+    # Point the clients at the stubs; without --cache every request reaches an upstream
+    os.environ["RXNORM_BASE_URL"] = f"{rxnav_url}/REST"
+    os.environ["IBM_GRANITE_API_URL"] = f"{granite_url}/ml/v1/text/generation"
+    os.environ.setdefault("IBM_GRANITE_API_KEY", "stub")
+    if not args.cache:
+        os.environ["RXNORM_CACHE_ENABLED"] = "false"
+        os.environ["GRANITE_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "warning")
+    # All the load comes from one client, which the per-client rate limit would throttle
+    os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+
+    import backend.main as backend
+    if backend.drug_suggester.get() and not args.local_data:
+        # Measure the upstream path even if a local RxNorm store has been built
+        backend.drug_suggester.instance.rxnorm_api.local_store = None
+        backend.drug_suggester.instance.alternatives_graph = None
+    backend.nlp_integrator.get()
+    if args.compare_blocking:
+        add_blocking_routes(backend.app, backend)
+    server, base_url = start_backend(backend.app)
+
+    results = {}
+    print(f"\n--- {args.requests} requests per level, upstream latency {args.latency * 1000:.0f} ms, "
+          f"upstream error rate {args.error_rate:.0%} ---")
+    print(f"{'endpoint':<32} {'conc':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'failed':>6} {'RSS MB':>7}")
+    try:
+        for name in args.endpoints:
+            payload = SCENARIOS[name]
+            # One unmeasured request per endpoint, so lazy initialisation is not timed
+            run_level(base_url, f"/{name}", payload, 1, 1)
+            runs = [(f"/{name}", concurrency) for concurrency in args.concurrency]
+            if args.compare_blocking and name in BLOCKING_BASELINES:
+                runs.append((f"/_blocking/{name}", max(args.concurrency)))
+            for path, concurrency in runs:
+                level = run_level(base_url, path, payload, args.requests, concurrency)
+                results[f"{path} c={concurrency}"] = level
+                print(f"{path:<32} {concurrency:>4} {level['p50_ms']:>9.1f} {level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f} "
+                      f"{level['rps']:>8.1f} {level['failed']:>6} {level['rss_mb']:>7.1f}")
+    finally:
+        server.should_exit = True
+        rxnav.shutdown()
+        granite.shutdown()
+
+    parameters = {key: value for key, value in vars(args).items() if key != "no_save"}
+    report("load_test_backend", parameters, results, save=not args.no_save)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Saving and comparing benchmark results across runs.
+
+Each run is written to benchmarks/results/<benchmark>/<timestamp>-<commit>.json with the
+parameters it ran with and a {case: {metric: value}} table, so two runs of the same
+benchmark can be compared case by case:
+
+    python benchmarks/results.py load_test_backend
+    python benchmarks/results.py bench_micro --baseline benchmarks/results/bench_micro/<file>.json
+"""
+import argparse
+from datetime import datetime, timezone
+import glob
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(seconds):
+    """
+    p50/p95/p99, mean and max of a list of latencies in seconds, in milliseconds.
+    """
+    values = sorted(seconds)
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    # Four decimals keep a resolution of 0.1 us for the microbenchmarks
+    return {
+        "p50_ms": round(percentile(values, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 4),
+        "mean_ms": round(sum(values) / len(values) * 1000, 4),
+        "max_ms": round(values[-1] * 1000, 4),
+    }
+
+
+def rss_mb():
+    """
+    Resident set size of this process in MB; the peak size on systems without /proc.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return round(peak / 2**20 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def save_results(benchmark, parameters, results, results_dir=RESULTS_DIR):
+    """
+    Writes one run of a benchmark and returns the path of the file.
+    """
+    commit = _git_commit()
+    now = datetime.now(timezone.utc)
+    run = {
+        "benchmark": benchmark,
+        "timestamp": now.isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": parameters,
+        "results": results,
+    }
+    directory = os.path.join(results_dir, benchmark)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{now.strftime('%Y%m%dT%H%M%SZ')}-{commit or 'nocommit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    return path
+
+
+def load_run(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_paths(benchmark, results_dir=RESULTS_DIR):
+    """
+    Saved runs of a benchmark, oldest first.
+    """
+    return sorted(glob.glob(os.path.join(results_dir, benchmark, "*.json")))
+
+
+def previous_run(benchmark, current_path=None, results_dir=RESULTS_DIR):
+    """
+    The latest saved run of the benchmark other than current_path, or None.
+    """
+    paths = [path for path in run_paths(benchmark, results_dir) if path != current_path]
+    return load_run(paths[-1]) if paths else None
+
+
+def compare(baseline, current):
+    """
+    Prints every metric present in both runs with its relative change.
+    Runs with different parameters are compared anyway, with a warning.
+    """
+    print(f"\n--- {current['benchmark']}: {current['timestamp']} ({current['commit']}) "
+          f"vs {baseline['timestamp']} ({baseline['commit']}) ---")
+    if baseline.get("parameters") != current.get("parameters"):
+        print(f"warning: parameters differ: {baseline.get('parameters')} vs {current.get('parameters')}")
+    for case, metrics in current["results"].items():
+        before = baseline["results"].get(case)
+        if before is None:
+            continue
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = f"{(value - old) / old * 100:+7.1f}%" if old else "      -"
+            print(f"{case:<40} {metric:<14} {old:>12.4f} -> {value:>12.4f}  {change}")
+
+
+def report(benchmark, parameters, results, save=True):
+    """
+    Saves a run and compares it with the previous run of the same benchmark, if any.
+    """
+    if not save:
+        return None
+    path = save_results(benchmark, parameters, results)
+    print(f"\nResults saved to {path}")
+    baseline = previous_run(benchmark, path)
+    if baseline is not None:
+        compare(baseline, load_run(path))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two saved runs of a benchmark.")
+    parser.add_argument("benchmark", help="Benchmark name, e.g. load_test_backend or bench_micro")
+    parser.add_argument("--baseline", help="Run to compare against (default: the second most recent)")
+    parser.add_argument("--run", help="Run to compare (default: the most recent)")
+    args = parser.parse_args()
+
+    paths = run_paths(args.benchmark)
+    current = args.run or (paths[-1] if paths else None)
+    baseline = args.baseline or next((path for path in reversed(paths) if path != current), None)
+    if current is None or baseline is None:
+        sys.exit(f"Need two saved runs of {args.benchmark} in {RESULTS_DIR}.")
+    compare(load_run(baseline), load_run(current))
+
+if __name__ == "__main__":
+    main()
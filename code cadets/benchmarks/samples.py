@@ -0,0 +1,19 @@
+# Fixed prescription texts shared by the NER benchmarks, so runs stay comparable
+SAMPLE_PRESCRIPTIONS = [
+    "Patient was prescribed 10mg of Aspirin daily and 500mg of Paracetamol twice a day.",
+    "Take 500mg of Amoxicillin three times a day for 7 days.",
+    "Warfarin 5mg once daily; avoid Ibuprofen 400mg due to bleeding risk.",
+    "Metformin 1 g twice daily with meals and Lisinopril 10mg every morning.",
+    "Atorvastatin 20mg at bedtime. Continue Amlodipine 5mg daily.",
+    "Prednisone 40mg daily for 5 days, then stop.",
+    "Levothyroxine 50 mcg every morning on an empty stomach.",
+    "Omeprazole 20mg before breakfast and Clopidogrel 75mg daily.",
+    "Sertraline 50mg daily; patient also reports taking St. John's Wort.",
+    "Amoxicillin 5 mL of 250mg/5mL suspension three times daily for 10 days.",
+    "Insulin glargine 20 IU subcutaneously at night.",
+    "Azithromycin 500mg on day 1, then 250mg daily for 4 days.",
+    "Furosemide 40mg every morning and Potassium chloride 20 mEq daily.",
+    "Ciprofloxacin 500mg BID for 3 days; avoid antacids within 2 hours.",
+    "Gabapentin 300mg TID and Tramadol 50mg as needed for pain.",
+    "Simvastatin 40mg nightly; patient started Clarithromycin 500mg BID.",
+]
@@ -0,0 +1,217 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+# Canned RxNorm content served by the RxNav stub
+STUB_CONCEPTS = {
+    "aspirin": "1191",
+    "ibuprofen": "5640",
+    "warfarin": "11289",
+    "metformin": "6809",
+    "paracetamol": "161",
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between calls
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; with Nagle's algorithm on, the body
+    # waits for a delayed ACK (~40 ms per call) on a kept-alive connection
+    disable_nagle_algorithm = True
+    latency = 0.0
+    # Fraction of requests answered with error_status instead of a result, after the latency
+    error_rate = 0.0
+    error_status = 503
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def inject_error(self):
+        """
+        Answers with error_status for about error_rate of the requests; returns True when it did.
+        The draws come from the server's seeded generator, so runs see the same error pattern.
+        """
+        if not self.error_rate or self.server.rng.random() >= self.error_rate:
+            return False
+        self.send_json({"error": "injected failure"}, status=self.error_status)
+        return True
+
+
+class RxNavStubHandler(StubHandler):
+    """
+    Mimics the RxNav REST endpoints used by RxNormAPI.
+    Pass request_log=[] to record the path of every request received.
+    """
+    request_log = None
+
+    def do_GET(self):
+        if self.request_log is not None:
+            self.request_log.append(self.path)
+        self.delay()
+        if self.inject_error():
+            return
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path[len("/REST/"):] if url.path.startswith("/REST/") else url.path
+
+        if path == "rxcui":
+            name = query.get("name", [""])[0].lower()
+            id_group = {"name": name}
+            if name in STUB_CONCEPTS:
+                id_group["rxnormId"] = [STUB_CONCEPTS[name]]
+            return self.send_json({"idGroup": id_group})
+
+        match = re.fullmatch(r"rxcui/(\d+)/(properties|related)", path)
+        if not match:
+            return self.send_json({"error": "not found"}, status=404)
+        rxcui, kind = match.groups()
+        if kind == "properties":
+            return self.send_json({"propConceptGroup": {"propConcept": [
+                {"propCategory": "NAMES", "propName": "RxNorm Name", "propValue": f"Stub drug {rxcui}"},
+            ]}})
+        return self.send_json({"resultSet": {"conceptGroup": [
+            {"conceptType": "SCD", "concept": [
+                {"rxcui": f"{rxcui}01", "name": f"Stub drug {rxcui} 100 MG Oral Tablet"},
+                {"rxcui": f"{rxcui}02", "name": f"Stub drug {rxcui} 500 MG Oral Tablet"},
+            ]},
+        ]}})
+
+
+class GraniteStubHandler(StubHandler):
+    """
+    Mimics the IBM Granite text generation endpoint used by IBMLanguageModel.
+    Requests to .../generation_stream are answered as server-sent events, one canned
+    token every token_latency seconds after the initial latency; the plain endpoint
+    waits for the whole generation before answering, like the real service.
+    With fail_after_tokens set, the stream is cut off after that many tokens.
+    """
+    STUB_TOKENS = ["No", " clinically", " significant", " interaction", " identified", " (stub", " response)."]
+    token_latency = 0.0
+    fail_after_tokens = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.delay()
+        if self.inject_error():
+            return
+        if urlparse(self.path).path.endswith("/generation_stream"):
+            return self.stream_tokens(request)
+        time.sleep(self.token_latency * len(self.STUB_TOKENS))
+        self.send_json({
+            "model_id": request.get("model_id"),
+            "results": [{
+                "generated_text": "".join(self.STUB_TOKENS),
+                "stop_reason": "eos_token",
+            }],
+        })
+
+    def stream_tokens(self, request):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(self.STUB_TOKENS):
+            if i == self.fail_after_tokens:
+                # Drop the connection without the final chunk, like a crashed upstream
+                self.close_connection = True
+                return
+            if i:
+                time.sleep(self.token_latency)
+            event = json.dumps({"model_id": request.get("model_id"), "results": [{"generated_text": token}]})
+            self.write_chunk(f"id: {i + 1}\nevent: message\ndata: {event}\n\n".encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FileStubHandler(StubHandler):
+    """
+    Serves the in-memory files in 'files' ({name: bytes}) with HEAD, ETag, Last-Modified
+    and single-range Range / If-Range support, like a dataset mirror. Each connection is
+    limited to 'bandwidth' bytes per second (0 for unlimited).
+    """
+    files = {}
+    bandwidth = 0
+    last_modified = "Mon, 06 Jan 2025 00:00:00 GMT"
+
+    def resolve(self):
+        body = self.files.get(urlparse(self.path).path.lstrip("/"))
+        if body is None:
+            self.send_json({"error": "not found"}, status=404)
+        return body
+
+    def send_file_headers(self, status, body, start, end):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{hashlib.sha1(body).hexdigest()}"')
+        self.send_header("Last-Modified", self.last_modified)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(body)}")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.delay()
+        body = self.resolve()
+        if body is not None:
+            self.send_file_headers(200, body, 0, len(body))
+
+    def do_GET(self):
+        self.delay()
+        body = self.resolve()
+        if body is None:
+            return
+        status, start, end = 200, 0, len(body)
+        range_header = self.headers.get("Range", "")
+        if_range = self.headers.get("If-Range")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if range_header.startswith("bytes=") and if_range in (None, etag, self.last_modified):
+            first, _, last = range_header[6:].partition("-")
+            start, end = int(first), int(last) + 1 if last else len(body)
+            status = 206
+        self.send_file_headers(status, body, start, end)
+        block = 64 * 1024
+        for offset in range(start, end, block):
+            self.wfile.write(body[offset:min(offset + block, end)])
+            if self.bandwidth:
+                time.sleep(min(block, end - offset) / self.bandwidth)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connection bursts from the load tests
+    request_queue_size = 1024
+
+
+def start_stub_server(handler_class, latency=0.0, seed=0, **attributes):
+    """
+    Starts handler_class on a free localhost port in a background thread.
+    Extra keyword arguments override handler class attributes (e.g. token_latency, error_rate).
+    Returns the server and its base URL; call server.shutdown() when done.
+    """
+    handler = type(handler_class.__name__, (handler_class,), {"latency": latency, **attributes})
+    server = StubServer(("127.0.0.1", 0), handler)
+    server.rng = random.Random(seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -1,10 +1,26 @@
 import streamlit as st
 import requests
+import json
 import os
 
 # FastAPI backend URL
 FASTAPI_URL = os.getenv("FASTAPI_URL", "http://localhost:8000")
 
+def iter_sse_events(response):
+    """
+    Yields (event, data) pairs from a server-sent events response as they arrive.
+    """
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
 st.set_page_config(page_title="AI Medical Prescription Verification", layout="wide")
 
 st.title("💊 AI Medical Prescription Verification System")
@@ -22,8 +38,58 @@ if page == "Prescription Verification":
     prescription_text = st.text_area("Enter Prescription Text:", height=150, help="e.g., Take 10mg of Amoxicillin twice a day for 7 days. Also, take 500mg of Paracetamol as needed.")
     patient_age_pv = st.number_input("Patient Age (optional, for context):", min_value=0, max_value=120, value=None, format="%d", help="Enter patient's age for more accurate interaction analysis.")
 
+    stream_results = st.checkbox("Stream the interaction analysis as it is generated", value=True)
+
     if st.button("Analyze Prescription"): 
-        if prescription_text:
+        if prescription_text and stream_results:
+            try:
+                response = requests.post(
+                    f"{FASTAPI_URL}/verify_prescription/stream",
+                    json={
+                        "prescription_text": prescription_text,
+                        "patient_age": patient_age_pv
+                    },
+                    stream=True
+                )
+                response.raise_for_status() # Raise an exception for HTTP errors
+
+                st.subheader("Analysis Results:")
+                status = st.empty()
+                status.info("Extracting entities...")
+                analysis_placeholder = None
+                analysis_text = ""
+                for event, data in iter_sse_events(response):
+                    if event == "entities":
+                        st.markdown("**Extracted Entities:**")
+                        st.json(data["extracted_entities"])
+                        status.info("Analyzing interactions...")
+                    elif event == "interactions":
+                        st.markdown("**Known Interactions:**")
+                        st.write(data["summary"])
+                    elif event == "token":
+                        if analysis_placeholder is None:
+                            st.markdown("**Interaction Analysis:**")
+                            analysis_placeholder = st.empty()
+                        analysis_text += data["text"]
+                        analysis_placeholder.markdown(analysis_text)
+                    elif event == "error":
+                        st.error(data["detail"])
+                    elif event == "done":
+                        if data["timed_out"]:
+                            status.warning(f"Partial results: {', '.join(data['timed_out'])} timed out.")
+                        elif data["partial"]:
+                            status.warning("Partial results: the analysis did not complete.")
+                        else:
+                            status.empty()
+                        st.caption(f"Timings (ms): {data['timings']}")
+
+            except requests.exceptions.ConnectionError:
+                st.error("Could not connect to the FastAPI backend. Please ensure it is running.")
+            except requests.exceptions.RequestException as e:
+                st.error(f"An error occurred during the request: {e}")
+            except Exception as e:
+                st.error(f"An unexpected error occurred: {e}")
+        elif prescription_text:
             with st.spinner("Analyzing prescription..."):
                 try:
                     response = requests.post(
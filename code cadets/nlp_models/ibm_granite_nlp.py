@@ -1,28 +1,132 @@
+import hashlib
+import httpx
 import requests
 import json
 import os
+import sys
+
+# Add the project root to the Python path so the example below can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.circuit_breaker import get_breaker
+from api_clients.concurrency import get_upstream_limit
+from api_clients.http_transport import get_async_transport, get_transport
+from api_clients.response_cache import DAY, ResponseCache
+from observability.log import get_logger
+from observability.metrics import CACHE_LOOKUPS, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS
+from scripts.interaction_index import default_resolver
+
+logger = get_logger(__name__)
+
+# Default location of the on-disk tier of the generation cache
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cache', 'granite_responses.db'
+)
+
+class GenerationError(Exception):
+    """
+    Raised by the streaming methods when Granite fails once the stream was requested, so
+    a streamed analysis reports the failure instead of ending as if it were complete.
+    """
+
 
 class IBMLanguageModel:
-    def __init__(self, api_key=None, service_url=None):
+    def __init__(self, api_key=None, service_url=None, transport=None, async_transport=None, cache=None, stream_url=None,
+                 drug_resolver=None):
         self.api_key = api_key or os.getenv("IBM_GRANITE_API_KEY")
         self.service_url = service_url or os.getenv("IBM_GRANITE_API_URL")
 
         if not self.api_key or not self.service_url:
             raise ValueError("IBM Granite API key and/or service URL not provided or found in environment variables.")
 
+        # The streaming endpoint sits next to the generation endpoint
+        # (.../text/generation -> .../text/generation_stream) unless configured explicitly.
+        self.stream_url = stream_url or os.getenv("IBM_GRANITE_STREAM_URL") or self._default_stream_url(self.service_url)
+
         self.headers = {
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        self.stream_headers = {
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
         self.auth = ("apikey", self.api_key)
+        self.transport = transport or get_transport()
+        self._async_transport = async_transport
 
-    def analyze_text(self, text, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        # Greedy decoding returns the same text for the same prompt, so generations are
+        # cached by model, parameters and normalized prompt. The same drug combination
+        # then costs one LLM call no matter how many prescriptions contain it.
+        self.cache = cache if cache is not None else self._default_cache()
+        # A free-text analysis is cached by the drugs the text names (see IngredientResolver),
+        # so differently worded prescriptions of the same drugs share an entry
+        self.drug_resolver = drug_resolver if drug_resolver is not None else default_resolver()
+
+        # Shared by all clients: at most GRANITE_MAX_IN_FLIGHT async generations at once, and
+        # while Granite keeps failing the circuit is open and no generation is attempted.
+        self.upstream_limit = get_upstream_limit("granite", 8)
+        self.breaker = get_breaker("granite")
+
+    @property
+    def async_transport(self):
+        # Resolved on first use so the shared httpx client is created inside the running event loop
+        if self._async_transport is None:
+            self._async_transport = get_async_transport()
+        return self._async_transport
+
+    @staticmethod
+    def _default_stream_url(service_url):
+        base, query_sep, query = service_url.partition("?")
+        if base.endswith("/generation"):
+            base += "_stream"
+        return base + query_sep + query
+
+    @staticmethod
+    def _default_cache():
+        if os.getenv("GRANITE_CACHE_ENABLED", "true").lower() == "false":
+            return None
+        return ResponseCache(
+            max_entries=int(os.getenv("GRANITE_CACHE_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.getenv("GRANITE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            # An empty GRANITE_CACHE_PATH keeps the cache in memory only
+            disk_path=os.getenv("GRANITE_CACHE_PATH", DEFAULT_CACHE_PATH) or None,
+            default_ttl=int(os.getenv("GRANITE_CACHE_TTL", str(7 * DAY))),
+        )
+
+    def cache_stats(self):
+        if self.cache is None or not hasattr(self.cache, "stats"):
+            return None
+        return self.cache.stats()
+
+    def _cache_params(self, data, drugs=None):
         """
-        Analyzes text using the IBM Granite NLP model to understand interaction context.
+        Cache key parameters for a request, or None if its output should not be cached.
+        The key is the sorted drug set when one is given, otherwise the prompt normalized
+        for case and whitespace; either is hashed to keep keys short.
         """
-        if not text:
+        if self.cache is None or data["parameters"].get("decoding_method", "greedy") != "greedy":
             return None
+        if drugs:
+            name, value = "drugs", "\n".join(sorted(set(drugs)))
+        else:
+            name, value = "prompt", " ".join(data["input"].lower().split())
+        return {
+            "model_id": data["model_id"],
+            "parameters": json.dumps(data["parameters"], sort_keys=True),
+            name: hashlib.sha256(value.encode("utf-8")).hexdigest(),
+        }
+
+    def _drugs_in_text(self, text):
+        # None when the drugs cannot be recognized; the prompt is the cache key then
+        return self.drug_resolver.drugs_in_text(text) if self.drug_resolver is not None else None
+
+    def _cached_generation(self, cache_params):
+        hit, result = self.cache.get("generation", cache_params)
+        CACHE_LOOKUPS.labels(cache="granite", result="hit" if hit else "miss").inc()
+        return hit, result
 
+    def _build_request(self, prompt, model_id, parameters):
         # Default parameters for the model
         if parameters is None:
             parameters = {
@@ -32,35 +136,268 @@ class IBMLanguageModel:
                 "repetition_penalty": 1.2
             }
 
-        # Construct the prompt for interaction context understanding
-        # This is a basic example; a more sophisticated prompt might be needed
-        prompt = f"Analyze the following medical text for drug interaction context and potential implications: {text}\n\nInteraction analysis:"
-
-        data = {
+        return {
             "model_id": model_id,
             "input": prompt,
             "parameters": parameters
         }
 
-        print(f"Sending request to IBM Granite NLP for text: '{text[:50]}...' ")
+    @staticmethod
+    def _analysis_prompt(text):
+        # Construct the prompt for interaction context understanding
+        # This is a basic example; a more sophisticated prompt might be needed
+        return f"Analyze the following medical text for drug interaction context and potential implications: {text}\n\nInteraction analysis:"
+
+    @staticmethod
+    def _explanation_prompt(interactions):
+        # The interactions are already known from the local index; the model only explains them
+        # Sorted so the same set of pairs always gives the same prompt, and the same cache key
+        lines = "\n".join(
+            f"- {i.drug_a} + {i.drug_b}" + (f" ({i.severity})" if i.severity else "") + (f": {i.description}" if i.description else "")
+            for i in sorted(interactions)
+        )
+        return f"The following drug interactions were found in a prescription:\n{lines}\n\nExplain each interaction and its clinical implications for the patient:"
+
+    @staticmethod
+    def _parse_response(result):
+        # Assuming the response structure contains 'results' and 'generated_text'
+        if "results" in result and len(result["results"]) > 0:
+            return result["results"][0]["generated_text"]
+        else:
+            logger.warning("No results found in IBM Granite NLP response")
+            return None
+
+    @staticmethod
+    def _parse_stream_line(line):
+        """
+        Returns the text of one server-sent event line of the streaming endpoint, or None.
+        Each 'data:' line carries a JSON document shaped like a generation response.
+        """
+        if not line or not line.startswith("data:"):
+            return None
         try:
-            response = requests.post(self.service_url, headers=self.headers, auth=self.auth, data=json.dumps(data))
+            result = json.loads(line[5:])
+        except json.JSONDecodeError:
+            return None
+        results = result.get("results") or []
+        return results[0].get("generated_text") if results else None
+
+    def _remote_allowed(self):
+        """
+        False while the circuit is open; callers then return None, as for a failed call,
+        and the analysis falls back to what was found locally.
+        """
+        if self.breaker.allow():
+            return True
+        UPSTREAM_REQUESTS.labels(service="granite", outcome="rejected").inc()
+        logger.debug("IBM Granite circuit open, skipping generation")
+        return False
+
+    def _generate(self, prompt, model_id, parameters, drugs=None):
+        data = self._build_request(prompt, model_id, parameters)
+        cache_params = self._cache_params(data, drugs)
+        if cache_params:
+            hit, result = self._cached_generation(cache_params)
+            if hit:
+                return result
+        if not self._remote_allowed():
+            return None
+        try:
+            with UPSTREAM_IN_FLIGHT.labels(service="granite").track_inprogress():
+                response = self.transport.post(self.service_url, headers=self.headers, auth=self.auth, data=json.dumps(data))
             response.raise_for_status()  # Raise an exception for HTTP errors
-            result = response.json()
-            # Assuming the response structure contains 'results' and 'generated_text'
-            if "results" in result and len(result["results"]) > 0:
-                return result["results"][0]["generated_text"]
-            else:
-                print("No results found in IBM Granite NLP response.")
-                return None
+            result = self._parse_response(response.json())
         except requests.exceptions.RequestException as e:
-            print(f"Error calling IBM Granite NLP API: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Response content: {e.response.text}")
+            UPSTREAM_REQUESTS.labels(service="granite", outcome="error").inc()
+            error_response = getattr(e, 'response', None)
+            self.breaker.record_error(error_response.status_code if error_response is not None else None)
+            response_text = error_response.text if error_response is not None else None
+            logger.error("IBM Granite NLP API call failed", extra={"error": str(e), "response": response_text})
             return None
         except json.JSONDecodeError as e:
-            print(f"Error decoding JSON response from IBM Granite NLP: {e}")
+            UPSTREAM_REQUESTS.labels(service="granite", outcome="error").inc()
+            self.breaker.record_failure()
+            logger.error("Could not decode the IBM Granite NLP response", extra={"error": str(e)})
             return None
+        self.breaker.record_success()
+        UPSTREAM_REQUESTS.labels(service="granite", outcome="ok").inc()
+        if cache_params and result is not None:
+            self.cache.set("generation", cache_params, result)
+        return result
+
+    async def _generate_async(self, prompt, model_id, parameters, drugs=None):
+        data = self._build_request(prompt, model_id, parameters)
+        cache_params = self._cache_params(data, drugs)
+        if cache_params:
+            hit, result = self._cached_generation(cache_params)
+            if hit:
+                return result
+        if not self._remote_allowed():
+            return None
+        try:
+            async with self.upstream_limit:
+                with UPSTREAM_IN_FLIGHT.labels(service="granite").track_inprogress():
+                    response = await self.async_transport.post(self.service_url, headers=self.headers, auth=self.auth, content=json.dumps(data))
+            response.raise_for_status()  # Raise an exception for HTTP errors
+            result = self._parse_response(response.json())
+        except httpx.HTTPError as e:
+            UPSTREAM_REQUESTS.labels(service="granite", outcome="error").inc()
+            status_error = isinstance(e, httpx.HTTPStatusError)
+            self.breaker.record_error(e.response.status_code if status_error else None)
+            response_text = e.response.text if status_error else None
+            logger.error("IBM Granite NLP API call failed", extra={"error": str(e), "response": response_text})
+            return None
+        except json.JSONDecodeError as e:
+            UPSTREAM_REQUESTS.labels(service="granite", outcome="error").inc()
+            self.breaker.record_failure()
+            logger.error("Could not decode the IBM Granite NLP response", extra={"error": str(e)})
+            return None
+        self.breaker.record_success()
+        UPSTREAM_REQUESTS.labels(service="granite", outcome="ok").inc()
+        if cache_params and result is not None:
+            self.cache.set("generation", cache_params, result)
+        return result
+
+    def _generate_stream(self, prompt, model_id, parameters, drugs=None):
+        """
+        Yields generated text chunks from the streaming endpoint as they arrive.
+        A cached generation is yielded as a single chunk; a fully received stream is cached.
+        Raises GenerationError when the request or the stream fails; while the circuit is
+        open nothing is yielded.
+        """
+        data = self._build_request(prompt, model_id, parameters)
+        cache_params = self._cache_params(data, drugs)
+        if cache_params:
+            hit, result = self._cached_generation(cache_params)
+            if hit:
+                yield result
+                return
+        if not self._remote_allowed():
+            return
+        chunks = []
+        try:
+            with UPSTREAM_IN_FLIGHT.labels(service="granite").track_inprogress(), \
+                    self.transport.post(self.stream_url, headers=self.stream_headers, auth=self.auth,
+                                        data=json.dumps(data), stream=True) as response:
+                response.raise_for_status()  # Raise an exception for HTTP errors
+                for line in response.iter_lines(decode_unicode=True):
+                    text = self._parse_stream_line(line)
+                    if text:
+                        chunks.append(text)
+                        yield text
+        except requests.exceptions.RequestException as e:
+            UPSTREAM_REQUESTS.labels(service="granite", outcome="error").inc()
+            error_response = getattr(e, 'response', None)
+            self.breaker.record_error(error_response.status_code if error_response is not None else None)
+            logger.error("IBM Granite NLP streaming failed", extra={"error": str(e)})
+            raise GenerationError(f"IBM Granite streaming failed: {e}") from e
+        self.breaker.record_success()
+        UPSTREAM_REQUESTS.labels(service="granite", outcome="ok").inc()
+        if cache_params and chunks:
+            self.cache.set("generation", cache_params, "".join(chunks))
+
+    async def _generate_stream_async(self, prompt, model_id, parameters, drugs=None):
+        """
+        Async version of _generate_stream.
+        """
+        data = self._build_request(prompt, model_id, parameters)
+        cache_params = self._cache_params(data, drugs)
+        if cache_params:
+            hit, result = self._cached_generation(cache_params)
+            if hit:
+                yield result
+                return
+        if not self._remote_allowed():
+            return
+        chunks = []
+        try:
+            async with self.upstream_limit:
+                with UPSTREAM_IN_FLIGHT.labels(service="granite").track_inprogress():
+                    async with self.async_transport.stream("POST", self.stream_url, headers=self.stream_headers,
+                                                           auth=self.auth, content=json.dumps(data)) as response:
+                        if response.is_error:
+                            await response.aread()
+                            UPSTREAM_REQUESTS.labels(service="granite", outcome="error").inc()
+                            self.breaker.record_error(response.status_code)
+                            logger.error("IBM Granite NLP streaming failed",
+                                         extra={"status": response.status_code, "response": response.text})
+                            raise GenerationError(f"IBM Granite streaming failed with status {response.status_code}")
+                        async for line in response.aiter_lines():
+                            text = self._parse_stream_line(line)
+                            if text:
+                                chunks.append(text)
+                                yield text
+        except httpx.HTTPError as e:
+            UPSTREAM_REQUESTS.labels(service="granite", outcome="error").inc()
+            self.breaker.record_error(None)
+            logger.error("IBM Granite NLP streaming failed", extra={"error": str(e)})
+            raise GenerationError(f"IBM Granite streaming failed: {e}") from e
+        self.breaker.record_success()
+        UPSTREAM_REQUESTS.labels(service="granite", outcome="ok").inc()
+        if cache_params and chunks:
+            self.cache.set("generation", cache_params, "".join(chunks))
+
+    def analyze_text(self, text, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        """
+        Analyzes text using the IBM Granite NLP model to understand interaction context.
+        Texts naming the same drugs share one cached analysis.
+        """
+        if not text:
+            return None
+
+        logger.debug("Sending request to IBM Granite NLP", extra={"text": text[:50]})
+        return self._generate(self._analysis_prompt(text), model_id, parameters, self._drugs_in_text(text))
+
+    async def analyze_text_async(self, text, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        """
+        Async version of analyze_text that does not block the event loop while the model generates.
+        """
+        if not text:
+            return None
+
+        logger.debug("Sending async request to IBM Granite NLP", extra={"text": text[:50]})
+        return await self._generate_async(self._analysis_prompt(text), model_id, parameters, self._drugs_in_text(text))
+
+    def explain_interactions(self, interactions, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        """
+        Asks the model to explain interactions already found in the local interaction index.
+        """
+        if not interactions:
+            return None
+
+        logger.debug("Requesting IBM Granite NLP explanation", extra={"interactions": len(interactions)})
+        return self._generate(self._explanation_prompt(interactions), model_id, parameters)
+
+    async def explain_interactions_async(self, interactions, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        """
+        Async version of explain_interactions.
+        """
+        if not interactions:
+            return None
+
+        logger.debug("Requesting async IBM Granite NLP explanation", extra={"interactions": len(interactions)})
+        return await self._generate_async(self._explanation_prompt(interactions), model_id, parameters)
+
+    def analyze_text_stream(self, text, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        """
+        Streaming version of analyze_text: yields the analysis in chunks as the model generates it.
+        """
+        logger.debug("Streaming from IBM Granite NLP", extra={"text": text[:50]})
+        return self._generate_stream(self._analysis_prompt(text), model_id, parameters, self._drugs_in_text(text))
+
+    def analyze_text_stream_async(self, text, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        """
+        Async streaming version of analyze_text, used by the backend's server-sent events endpoint.
+        """
+        logger.debug("Streaming async from IBM Granite NLP", extra={"text": text[:50]})
+        return self._generate_stream_async(self._analysis_prompt(text), model_id, parameters, self._drugs_in_text(text))
+
+    def explain_interactions_stream_async(self, interactions, model_id="ibm/granite-13b-instruct-v1", parameters=None):
+        """
+        Async streaming version of explain_interactions.
+        """
+        logger.debug("Streaming async IBM Granite NLP explanation", extra={"interactions": len(interactions)})
+        return self._generate_stream_async(self._explanation_prompt(interactions), model_id, parameters)
 
 if __name__ == "__main__":
     # Example Usage:
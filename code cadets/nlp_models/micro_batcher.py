@@ -0,0 +1,102 @@
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into batches.
+
+    Callers await submit(item). A background task collects queued items until either
+    max_batch_size items are waiting or max_wait_ms has passed since the first one
+    arrived, then runs batch_fn(items) on the given executor and resolves each
+    caller's future with its own result. At most max_concurrent_batches batches run
+    at once; while all slots are busy, new requests keep queueing and form larger batches.
+    """
+
+    def __init__(self, batch_fn, executor, max_batch_size=8, max_wait_ms=5, max_concurrent_batches=1):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+        self.queue = None
+        self.slots = None
+        self.task = None
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        # The queue and worker task are bound to the event loop of the first caller
+        if self.task is None or self.task.done():
+            self.queue = asyncio.Queue()
+            self.slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item):
+        """
+        Queues one item and returns its result once its batch has run.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Skip callers that gave up (e.g. hit their deadline) while waiting
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            batch = await self._collect()
+            if not batch:
+                self.slots.release()
+                continue
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            items = [item for item, _ in batch]
+            self.batches += 1
+            self.items += len(items)
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.batch_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.slots.release()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
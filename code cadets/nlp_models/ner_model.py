@@ -1,34 +1,134 @@
-from transformers import pipeline
 import os
+import sys
+
+# Add the project root to the Python path so the example below can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from observability.log import get_logger
+from observability.metrics import NER_BATCH_SIZE
+
+logger = get_logger(__name__)
+
+# Substrings of NER labels that mark drug names and dosage amounts
+DRUG_LABEL_KEYWORDS = ("DRUG", "MEDIC", "CHEM")
+DOSAGE_LABEL_KEYWORDS = ("DOS", "STRENGTH")
+
+
+def group_entities(entities, text):
+    """
+    Merges token-level entities (B-/I- tags and '##' word pieces) into spans.
+    Returns dicts with the span label, its text as written in the input, offsets and mean score.
+    """
+    spans = []
+    for entity in entities:
+        label = entity["entity"]
+        tag, _, label_type = label.partition("-") if label[:2] in ("B-", "I-") else ("", "", label)
+        previous = spans[-1] if spans else None
+        # Word pieces always extend the current span; other tokens do so only when
+        # they are not tagged as the beginning of a new entity and directly follow it
+        continues = previous is not None and previous["label"] == label_type and (
+            entity["word"].startswith("##") or (tag != "B" and entity["start"] <= previous["end"] + 1)
+        )
+        if continues:
+            previous["end"] = entity["end"]
+            previous["scores"].append(entity["score"])
+        else:
+            spans.append({"label": label_type, "start": entity["start"], "end": entity["end"], "scores": [entity["score"]]})
+
+    return [{
+        "label": span["label"],
+        "text": text[span["start"]:span["end"]],
+        "start": span["start"],
+        "end": span["end"],
+        "score": sum(span["scores"]) / len(span["scores"])
+    } for span in spans]
+
+
+def extract_drug_dosages(entities, text):
+    """
+    Pairs each drug span with the nearest dosage span in the text, if any.
+    Returns a list of {"drug", "dosage"} dicts.
+    """
+    spans = group_entities(entities, text)
+    drugs = [span for span in spans if any(k in span["label"].upper() for k in DRUG_LABEL_KEYWORDS)]
+    dosages = [span for span in spans if any(k in span["label"].upper() for k in DOSAGE_LABEL_KEYWORDS)]
+
+    pairs = []
+    for drug in drugs:
+        nearest = min(dosages, key=lambda d: abs(d["start"] - drug["start"]), default=None)
+        pairs.append({"drug": drug["text"], "dosage": nearest["text"] if nearest else None})
+    return pairs
+
+
+# Default location of the ONNX export written by scripts/export_ner_model.py
+DEFAULT_ONNX_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'models', 'medical-ner-onnx'
+)
+
 
 class NERModel:
-    def __init__(self, model_name="samant/medical-ner", api_key=None):
+    # "pytorch": the fp32 transformers pipeline.
+    # "int8": the same model with its Linear layers dynamically quantized to int8 by PyTorch.
+    # "onnx": an ONNX Runtime export (see scripts/export_ner_model.py), optionally int8-quantized.
+    BACKENDS = ("pytorch", "int8", "onnx")
+
+    def __init__(self, model_name="samant/medical-ner", api_key=None, backend=None, onnx_path=None, onnx_file_name=None):
         self.model_name = model_name
         self.api_key = api_key or os.getenv("HUGGING_FACE_API_KEY")
         if not self.api_key:
             raise ValueError("Hugging Face API key not provided or found in environment variables.")
+
+        self.backend = backend or os.getenv("NER_BACKEND", "pytorch")
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"Unknown NER backend '{self.backend}'. Choose one of: {', '.join(self.BACKENDS)}.")
+        self.onnx_path = onnx_path or os.getenv("NER_ONNX_PATH") or DEFAULT_ONNX_PATH
+        self.onnx_file_name = onnx_file_name or os.getenv("NER_ONNX_FILE", "model.onnx")
         
         # Initialize the Hugging Face pipeline for NER
         # For local inference, you might download the model first.
         # For API-based inference, you'd typically use requests to call the API endpoint.
         # This example assumes a local pipeline for simplicity, but notes API usage.
+        # transformers is imported here rather than at module level because importing
+        # it takes seconds and most importers of this module never build a pipeline.
+        from transformers import pipeline
+
+        if self.backend != "pytorch":
+            self.nlp = pipeline("ner", model=self._load_optimized_model(), tokenizer=self._load_tokenizer())
+            return
+
         try:
             self.nlp = pipeline("ner", model=self.model_name, token=self.api_key)
         except Exception as e:
-            print(f"Error initializing NER pipeline: {e}")
-            print("Attempting to initialize without token (might fail for private models or rate limits).")
+            logger.warning("Could not initialize the NER pipeline with a token, retrying without one "
+                           "(might fail for private models or rate limits)", extra={"error": str(e)})
             self.nlp = pipeline("ner", model=self.model_name)
 
-    def extract_entities(self, text):
-        """
-        Extracts named entities (e.g., drug names, dosages) from the given text.
-        """
-        if not hasattr(self, 'nlp'):
-            print("NER pipeline not initialized. Cannot extract entities.")
-            return []
-        
-        print(f"Extracting entities from text: '{text}'")
-        entities = self.nlp(text)
+    def _load_tokenizer(self):
+        from transformers import AutoTokenizer
+
+        source = self.onnx_path if self.backend == "onnx" else self.model_name
+        return AutoTokenizer.from_pretrained(source, token=self.api_key)
+
+    def _load_optimized_model(self):
+        if self.backend == "onnx":
+            # onnxruntime and optimum are optional dependencies, only needed for this backend
+            from optimum.onnxruntime import ORTModelForTokenClassification
+
+            if not os.path.exists(os.path.join(self.onnx_path, self.onnx_file_name)):
+                raise ValueError(f"ONNX model not found at {self.onnx_path}. Run scripts/export_ner_model.py first.")
+            return ORTModelForTokenClassification.from_pretrained(self.onnx_path, file_name=self.onnx_file_name)
+
+        import torch
+        from transformers import AutoModelForTokenClassification
+
+        model = AutoModelForTokenClassification.from_pretrained(self.model_name, token=self.api_key)
+        model.eval()
+        # Weights of the Linear layers are stored as int8 and activations are
+        # quantized on the fly, which is where almost all of the model's compute goes
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    @staticmethod
+    def _format_entities(entities):
         extracted_data = []
         for entity in entities:
             extracted_data.append({
@@ -40,6 +140,37 @@ class NERModel:
             })
         return extracted_data
 
+    def extract_entities(self, text):
+        """
+        Extracts named entities (e.g., drug names, dosages) from the given text.
+        """
+        if not hasattr(self, 'nlp'):
+            logger.error("NER pipeline not initialized, cannot extract entities")
+            return []
+
+        logger.debug("Extracting entities", extra={"text_length": len(text)})
+        NER_BATCH_SIZE.observe(1)
+        entities = self.nlp(text)
+        return self._format_entities(entities)
+
+    def extract_entities_batch(self, texts, batch_size=None):
+        """
+        Extracts named entities from several texts in one pipeline call.
+        Returns one entity list per input text, in the same order.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        if not hasattr(self, 'nlp'):
+            logger.error("NER pipeline not initialized, cannot extract entities")
+            return [[] for _ in texts]
+
+        logger.debug("Extracting entities from a batch", extra={"batch_size": len(texts)})
+        NER_BATCH_SIZE.observe(len(texts))
+        # The pipeline pads each batch to its longest text and runs it as one forward pass
+        batch_entities = self.nlp(texts, batch_size=batch_size or len(texts))
+        return [self._format_entities(entities) for entities in batch_entities]
+
 if __name__ == "__main__":
     # Example Usage:
     # Ensure HUGGING_FACE_API_KEY is set in your environment or passed directly
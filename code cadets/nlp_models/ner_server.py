@@ -0,0 +1,180 @@
+from multiprocessing.connection import Client, Listener
+import argparse
+import os
+import queue
+import sys
+import threading
+
+# Add the project root to the Python path so the server can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nlp_models.ner_model import NERModel
+from observability.log import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_ADDRESS = "/tmp/code-cadets-ner.sock"
+
+
+class NERUnavailable(Exception):
+    """
+    Raised by RemoteNERModel when the NER server cannot be reached or fails, so callers
+    carry on without entities as when no NER model is loaded.
+    """
+
+
+def parse_address(address):
+    """
+    'host:port' becomes a TCP address; anything else is a Unix socket path.
+    """
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+def get_authkey(authkey=None):
+    # multiprocessing connections unpickle what they receive, so both sides must share a secret
+    authkey = authkey or os.getenv("NER_SERVER_AUTHKEY")
+    if not authkey:
+        raise ValueError("NER server auth key not provided or found in environment variables (NER_SERVER_AUTHKEY).")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+class NERServer:
+    """
+    Serves one NERModel to any number of API worker processes over local IPC.
+
+    Each client connection is handled on its own thread and puts its texts on a
+    shared queue. A single inference thread drains the queue into batches of up to
+    max_batch_size texts, so requests from different workers share forward passes
+    and the model weights exist once no matter how many workers there are.
+    """
+
+    def __init__(self, address, authkey=None, max_batch_size=32, ner_model=None):
+        self.address = parse_address(address)
+        self.authkey = get_authkey(authkey)
+        self.max_batch_size = max_batch_size
+        self.ner_model = ner_model or NERModel()
+        self.requests = queue.Queue()
+
+    def _inference_loop(self):
+        while True:
+            batch = [self.requests.get()]
+            size = len(batch[0][0])
+            while size < self.max_batch_size:
+                try:
+                    item = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                results = self.ner_model.extract_entities_batch(texts)
+            except Exception as e:
+                for _, reply in batch:
+                    reply.put(("error", str(e)))
+                continue
+            offset = 0
+            for item_texts, reply in batch:
+                reply.put(("ok", results[offset:offset + len(item_texts)]))
+                offset += len(item_texts)
+
+    def _handle_connection(self, conn):
+        reply = queue.Queue(maxsize=1)
+        with conn:
+            while True:
+                try:
+                    texts = conn.recv()
+                except EOFError:
+                    return
+                self.requests.put((texts, reply))
+                conn.send(reply.get())
+
+    def serve_forever(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        threading.Thread(target=self._inference_loop, daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            logger.info("NER server listening", extra={"address": str(self.address)})
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # A client with the wrong auth key must not bring the server down
+                    logger.warning("Rejected NER client connection", extra={"error": str(e)})
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+
+class RemoteNERModel:
+    """
+    Drop-in replacement for NERModel that sends texts to a running NERServer.
+    Each thread keeps its own connection, since a connection is not safe to share.
+    """
+
+    def __init__(self, address=None, authkey=None):
+        self.address = parse_address(address or os.getenv("NER_SERVER_ADDRESS") or DEFAULT_ADDRESS)
+        self.authkey = get_authkey(authkey)
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self.local.conn = conn
+        return conn
+
+    def _close_connection(self):
+        conn = getattr(self.local, "conn", None)
+        self.local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, texts):
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(texts)
+                status, payload = conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                # The server restarted since this thread connected; reconnect once
+                self._close_connection()
+                if attempt == 1:
+                    logger.warning("NER server unavailable", extra={"address": str(self.address), "error": str(e)})
+                    raise NERUnavailable(f"NER server at {self.address} is unavailable: {e}") from e
+        if status != "ok":
+            raise NERUnavailable(f"NER server error: {payload}")
+        return payload
+
+    def extract_entities(self, text):
+        return self._call([text])[0]
+
+    def extract_entities_batch(self, texts, batch_size=None):
+        texts = list(texts)
+        if not texts:
+            return []
+        return self._call(texts)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Run the shared NER inference server.")
+    parser.add_argument("--address", default=os.getenv("NER_SERVER_ADDRESS") or DEFAULT_ADDRESS,
+                        help="Unix socket path or host:port to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=int(os.getenv("NER_MAX_BATCH_SIZE", "32")))
+    args = parser.parse_args()
+
+    NERServer(args.address, max_batch_size=args.max_batch_size).serve_forever()
+
+if __name__ == "__main__":
+    main()
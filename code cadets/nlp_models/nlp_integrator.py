@@ -1,49 +1,455 @@
 from .ner_model import NERModel
-from .ibm_granite_nlp import IBMLanguageModel
-from .ner_model import NERModel
+from .ibm_granite_nlp import GenerationError, IBMLanguageModel
+from .ner_model import NERModel, extract_drug_dosages
+from .micro_batcher import MicroBatcher
+from .ner_server import NERUnavailable, RemoteNERModel
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import contextvars
 import os
+import time
+
+from observability.log import get_logger
+from observability.metrics import STAGE_DURATION
+from observability.tracing import span
+from scripts.interaction_index import InteractionIndex
+
+logger = get_logger(__name__)
+
+# Stage names used in metrics and traces for the keys of the 'timings' result
+STAGE_NAMES = {"ner": "ner", "interaction": "granite"}
+
+
+def _timed_call(stage, func, *args):
+    """
+    Runs func(*args) as a pipeline stage and returns (result, elapsed milliseconds).
+    """
+    start = time.perf_counter()
+    with span(stage):
+        result = func(*args)
+    return result, round((time.perf_counter() - start) * 1000, 2)
+
+
+def _submit(executor, stage, func, *args):
+    """
+    Runs a stage on an executor thread, in a copy of the caller's context so its span
+    nests under the request's span.
+    """
+    return executor.submit(contextvars.copy_context().run, _timed_call, stage, func, *args)
+
 
 class NLPIntegrator:
-    def __init__(self):
+    def __init__(self, ner_max_workers=None, ner_timeout=None, interaction_timeout=None):
         self.ner_model = None
         self.ibm_nlp_model = None
+
+        # NER inference is CPU-bound; the async path runs it on a small dedicated
+        # pool so it neither blocks the event loop nor oversubscribes the CPU.
+        ner_max_workers = ner_max_workers or int(os.getenv("NER_MAX_WORKERS", "2"))
+        self.ner_executor = ThreadPoolExecutor(max_workers=ner_max_workers, thread_name_prefix="ner")
+        # The blocking path also needs a thread to wait on Granite while NER runs
+        self.interaction_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="granite")
+
+        # Per-stage deadlines in seconds. A stage that misses its deadline is reported
+        # in 'timed_out' and the other stage's result is still returned.
+        self.ner_timeout = ner_timeout or float(os.getenv("NER_TIMEOUT", "10"))
+        self.interaction_timeout = interaction_timeout or float(os.getenv("GRANITE_TIMEOUT", "30"))
         
         try:
-            self.ner_model = NERModel()
-            print("NERModel initialized successfully.")
+            if os.getenv("NER_SERVER_ADDRESS"):
+                # Use the shared inference process instead of loading a model copy in this worker
+                self.ner_model = RemoteNERModel()
+                logger.info("Using NER server", extra={"address": str(self.ner_model.address)})
+            else:
+                self.ner_model = NERModel()
+                logger.info("NERModel initialized successfully")
         except ValueError as e:
-            print(f"Warning: Could not initialize NERModel: {e}")
+            logger.warning("Could not initialize NERModel", extra={"error": str(e)})
+        
+        # Concurrent requests on the async path share NER forward passes through the
+        # micro-batcher. NER_MAX_BATCH_SIZE=1 sends every text through on its own.
+        self.ner_batcher = None
+        max_batch_size = int(os.getenv("NER_MAX_BATCH_SIZE", "8"))
+        if self.ner_model and max_batch_size > 1:
+            self.ner_batcher = MicroBatcher(
+                self.ner_model.extract_entities_batch,
+                self.ner_executor,
+                max_batch_size=max_batch_size,
+                max_wait_ms=float(os.getenv("NER_MAX_WAIT_MS", "5")),
+                max_concurrent_batches=ner_max_workers,
+            )
         
         try:
             self.ibm_nlp_model = IBMLanguageModel()
-            print("IBMLanguageModel initialized successfully.")
+            logger.info("IBMLanguageModel initialized successfully")
         except ValueError as e:
-            print(f"Warning: Could not initialize IBMLanguageModel: {e}")
+            logger.warning("Could not initialize IBMLanguageModel", extra={"error": str(e)})
+
+        # Known interactions from the prepared interactions dataset. When it is available,
+        # drug pairs are checked locally and Granite is only asked to explain the hits;
+        # otherwise Granite analyzes the whole prescription text.
+        self.interaction_index = InteractionIndex.from_file()
+        if self.interaction_index is not None:
+            logger.info("Loaded known drug interactions", extra={"interactions": len(self.interaction_index)})
+        else:
+            logger.info("No interaction index found, interaction analysis will use IBM Granite on the full text")
+
+    @staticmethod
+    def _build_result(extracted_entities, interaction_analysis, timings, timed_out, start, interactions=None, failed=None):
+        failed = failed or []
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return {
+            "extracted_entities": extracted_entities or [],
+            "interaction_analysis": interaction_analysis,
+            # Known interactions found in the local index; None when they were not checked (no index or no NER)
+            "interactions": [interaction._asdict() for interaction in interactions] if interactions is not None else None,
+            "timings": timings,
+            "timed_out": timed_out,
+            # Stages that failed, such as NER with its server down
+            "failed": failed,
+            "partial": bool(timed_out or failed)
+        }
+
+    @staticmethod
+    def _ner_failed(error, failed):
+        logger.warning("NER failed, continuing without entities", extra={"stage": "ner", "error": str(error)})
+        failed.append("ner")
+
+    def _find_interactions(self, entities, prescription_text):
+        drugs = [pair["drug"] for pair in extract_drug_dosages(entities or [], prescription_text)]
+        return self.interaction_index.find_interactions(drugs)
+
+    @staticmethod
+    def _summarize_interactions(interactions):
+        """
+        Plain-text summary of known interactions, used when no explanation is generated.
+        """
+        if not interactions:
+            return "No known interactions were found between the extracted drugs."
+        return "Known interactions: " + "; ".join(
+            f"{i.drug_a} + {i.drug_b}" + (f" ({i.severity})" if i.severity else "") + (f": {i.description}" if i.description else "")
+            for i in interactions
+        )
 
     def analyze_prescription(self, prescription_text):
         """
         Analyzes a prescription text using both NER and IBM Granite NLP.
-        Returns extracted entities and interaction analysis.
+        Both stages run in parallel, each bounded by its own deadline.
+        Returns extracted entities, interaction analysis and per-stage timings in milliseconds.
+        """
+        with span("analyze_prescription"):
+            start = time.perf_counter()
+            # Without NER there are no drugs to look up, so Granite analyzes the full text
+            if self.interaction_index is not None and self.ner_model:
+                return self._analyze_with_index(prescription_text, start)
+            return self._analyze_text(prescription_text, start)
+
+    def _analyze_text(self, prescription_text, start):
         """
-        extracted_entities = []
-        interaction_analysis = None
+        NER and Granite's analysis of the full text, in parallel.
+        """
+        stages = {}
 
         if self.ner_model:
-            print("Performing Named Entity Recognition...")
-            extracted_entities = self.ner_model.extract_entities(prescription_text)
+            logger.debug("Performing Named Entity Recognition")
+            stages["ner"] = (_submit(self.ner_executor, "ner", self.ner_model.extract_entities, prescription_text), self.ner_timeout)
         else:
-            print("NERModel not available. Skipping entity extraction.")
+            logger.debug("NERModel not available, skipping entity extraction")
 
         if self.ibm_nlp_model:
-            print("Performing IBM Granite NLP interaction analysis...")
-            interaction_analysis = self.ibm_nlp_model.analyze_text(prescription_text)
+            logger.debug("Performing IBM Granite NLP interaction analysis")
+            stages["interaction"] = (_submit(self.interaction_executor, "granite", self.ibm_nlp_model.analyze_text, prescription_text), self.interaction_timeout)
         else:
-            print("IBMLanguageModel not available. Skipping interaction analysis.")
+            logger.debug("IBMLanguageModel not available, skipping interaction analysis")
 
-        return {
-            "extracted_entities": extracted_entities,
-            "interaction_analysis": interaction_analysis
-        }
+        results, timings, timed_out, failed = {}, {}, [], []
+        for stage, (future, timeout) in stages.items():
+            # Both deadlines are measured from the start of the request
+            remaining = max(0.0, start + timeout - time.perf_counter())
+            try:
+                results[stage], timings[f"{stage}_ms"] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                logger.warning("Stage missed its deadline, returning partial results", extra={"stage": stage, "timeout_s": timeout})
+                timings[f"{stage}_ms"] = round(timeout * 1000, 2)
+                timed_out.append(stage)
+            except NERUnavailable as e:
+                self._ner_failed(e, failed)
+
+        return self._build_result(results.get("ner"), results.get("interaction"), timings, timed_out, start, failed=failed)
+
+    def _analyze_with_index(self, prescription_text, start):
+        """
+        NER, then a local lookup of every pair of extracted drugs, then Granite only to explain hits.
+        If NER fails or misses its deadline, Granite analyzes the full text instead and
+        'interactions' is None.
+        """
+        timings, timed_out, failed = {}, [], []
+        entities = []
+        logger.debug("Performing Named Entity Recognition")
+        future = _submit(self.ner_executor, "ner", self.ner_model.extract_entities, prescription_text)
+        try:
+            entities, timings["ner_ms"] = future.result(timeout=self.ner_timeout)
+        except FutureTimeoutError:
+            logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "ner", "timeout_s": self.ner_timeout})
+            timings["ner_ms"] = round(self.ner_timeout * 1000, 2)
+            timed_out.append("ner")
+        except NERUnavailable as e:
+            self._ner_failed(e, failed)
+        if timed_out or failed:
+            return self._analyze_full_text_after_ner(prescription_text, start, timings, timed_out, failed)
+
+        interactions, timings["lookup_ms"] = _timed_call("interaction_lookup", self._find_interactions, entities, prescription_text)
+        analysis = self._summarize_interactions(interactions)
+        if interactions and self.ibm_nlp_model:
+            future = _submit(self.interaction_executor, "granite", self.ibm_nlp_model.explain_interactions, interactions)
+            remaining = max(0.0, start + self.interaction_timeout - time.perf_counter())
+            try:
+                explanation, timings["interaction_ms"] = future.result(timeout=remaining)
+                analysis = explanation or analysis
+            except FutureTimeoutError:
+                logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "interaction", "timeout_s": self.interaction_timeout})
+                timed_out.append("interaction")
+
+        return self._build_result(entities, analysis, timings, timed_out, start, interactions)
+
+    def _analyze_full_text_after_ner(self, prescription_text, start, timings, timed_out, failed):
+        """
+        Granite's analysis of the full text, for when NER failed to give the drugs to look up.
+        """
+        analysis = None
+        if self.ibm_nlp_model:
+            future = _submit(self.interaction_executor, "granite", self.ibm_nlp_model.analyze_text, prescription_text)
+            remaining = max(0.0, start + self.interaction_timeout - time.perf_counter())
+            try:
+                analysis, timings["interaction_ms"] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "interaction", "timeout_s": self.interaction_timeout})
+                timed_out.append("interaction")
+        return self._build_result([], analysis, timings, timed_out, start, failed=failed)
+
+    async def extract_entities_async(self, text):
+        """
+        Runs NER off the event loop, through the micro-batcher when it is enabled.
+        """
+        if not self.ner_model:
+            return []
+        if self.ner_batcher:
+            return await self.ner_batcher.submit(text)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.ner_executor, self.ner_model.extract_entities, text)
+
+    async def analyze_prescription_async(self, prescription_text):
+        """
+        Async version of analyze_prescription for the FastAPI request path.
+        NER runs on the bounded NER executor while the Granite call uses the async client.
+        """
+        with span("analyze_prescription"):
+            start = time.perf_counter()
+            if self.interaction_index is not None and self.ner_model:
+                return await self._analyze_with_index_async(prescription_text, start)
+            return await self._analyze_text_async(prescription_text, start)
+
+    async def _analyze_text_async(self, prescription_text, start):
+        """
+        Async version of _analyze_text.
+        """
+        stages = {}
+
+        if self.ner_model:
+            stages["ner"] = (self.extract_entities_async(prescription_text), self.ner_timeout)
+        else:
+            logger.debug("NERModel not available, skipping entity extraction")
+
+        if self.ibm_nlp_model:
+            stages["interaction"] = (self.ibm_nlp_model.analyze_text_async(prescription_text), self.interaction_timeout)
+        else:
+            logger.debug("IBMLanguageModel not available, skipping interaction analysis")
+
+        timings, timed_out, failed = {}, [], []
+
+        async def run_stage(stage, awaitable, timeout):
+            stage_start = time.perf_counter()
+            try:
+                with span(STAGE_NAMES[stage]):
+                    return await asyncio.wait_for(awaitable, timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Stage missed its deadline, returning partial results", extra={"stage": stage, "timeout_s": timeout})
+                timed_out.append(stage)
+                return None
+            except NERUnavailable as e:
+                self._ner_failed(e, failed)
+                return None
+            finally:
+                timings[f"{stage}_ms"] = round((time.perf_counter() - stage_start) * 1000, 2)
+
+        outputs = await asyncio.gather(*(run_stage(stage, awaitable, timeout) for stage, (awaitable, timeout) in stages.items()))
+        results = dict(zip(stages, outputs))
+        return self._build_result(results.get("ner"), results.get("interaction"), timings, timed_out, start, failed=failed)
+
+    async def _analyze_with_index_async(self, prescription_text, start):
+        """
+        Async version of _analyze_with_index.
+        """
+        timings, timed_out, failed = {}, [], []
+        entities = []
+        stage_start = time.perf_counter()
+        try:
+            with span("ner"):
+                entities = await asyncio.wait_for(self.extract_entities_async(prescription_text), self.ner_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "ner", "timeout_s": self.ner_timeout})
+            timed_out.append("ner")
+        except NERUnavailable as e:
+            self._ner_failed(e, failed)
+        timings["ner_ms"] = round((time.perf_counter() - stage_start) * 1000, 2)
+        if timed_out or failed:
+            return await self._analyze_full_text_after_ner_async(prescription_text, start, timings, timed_out, failed)
+
+        interactions, timings["lookup_ms"] = _timed_call("interaction_lookup", self._find_interactions, entities, prescription_text)
+        analysis = self._summarize_interactions(interactions)
+        if interactions and self.ibm_nlp_model:
+            stage_start = time.perf_counter()
+            remaining = max(0.0, start + self.interaction_timeout - stage_start)
+            try:
+                with span("granite"):
+                    explanation = await asyncio.wait_for(self.ibm_nlp_model.explain_interactions_async(interactions), remaining)
+                analysis = explanation or analysis
+            except asyncio.TimeoutError:
+                logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "interaction", "timeout_s": self.interaction_timeout})
+                timed_out.append("interaction")
+            timings["interaction_ms"] = round((time.perf_counter() - stage_start) * 1000, 2)
+
+        return self._build_result(entities, analysis, timings, timed_out, start, interactions)
+
+    async def _analyze_full_text_after_ner_async(self, prescription_text, start, timings, timed_out, failed):
+        """
+        Async version of _analyze_full_text_after_ner.
+        """
+        analysis = None
+        if self.ibm_nlp_model:
+            stage_start = time.perf_counter()
+            remaining = max(0.0, start + self.interaction_timeout - stage_start)
+            try:
+                with span("granite"):
+                    analysis = await asyncio.wait_for(self.ibm_nlp_model.analyze_text_async(prescription_text), remaining)
+            except asyncio.TimeoutError:
+                logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "interaction", "timeout_s": self.interaction_timeout})
+                timed_out.append("interaction")
+            timings["interaction_ms"] = round((time.perf_counter() - stage_start) * 1000, 2)
+        return self._build_result([], analysis, timings, timed_out, start, failed=failed)
+
+    @staticmethod
+    def _stream_in_background(chunks):
+        """
+        Consumes an async stream of text chunks on its own task into a queue, so
+        generation can run while other work (NER) is still in progress. None marks the end;
+        if the stream fails, its exception is queued before it for the consumer to report.
+        """
+        queue = asyncio.Queue()
+
+        async def pump():
+            try:
+                async for chunk in chunks:
+                    queue.put_nowait(chunk)
+            except GenerationError as e:
+                # Already logged by the client
+                queue.put_nowait(e)
+            except Exception as e:
+                logger.exception("Streaming generation failed")
+                queue.put_nowait(e)
+            finally:
+                queue.put_nowait(None)
+
+        return queue, asyncio.create_task(pump())
+
+    async def analyze_prescription_stream(self, prescription_text):
+        """
+        Streams the analysis as (event, data) pairs for the server-sent events endpoint:
+        'entities' first, then 'interactions' when the interaction index is loaded,
+        then one 'token' per generated chunk, and finally 'done' with timings. If generation
+        fails midway, an 'error' event is sent before 'done'.
+        """
+        start = time.perf_counter()
+        timings, timed_out, failed = {}, [], []
+        stream = None
+        # Known interactions are looked up when there is an index and NER to find the drugs
+        use_index = self.interaction_index is not None and self.ner_model is not None
+        try:
+            if not use_index and self.ibm_nlp_model:
+                # The free-text analysis does not depend on NER, so generation starts right away
+                stream = self._stream_in_background(self.ibm_nlp_model.analyze_text_stream_async(prescription_text))
+                stream_start = time.perf_counter()
+
+            entities = []
+            if self.ner_model:
+                stage_start = time.perf_counter()
+                try:
+                    with span("ner"):
+                        entities = await asyncio.wait_for(self.extract_entities_async(prescription_text), self.ner_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "ner", "timeout_s": self.ner_timeout})
+                    timed_out.append("ner")
+                except NERUnavailable as e:
+                    self._ner_failed(e, failed)
+                timings["ner_ms"] = round((time.perf_counter() - stage_start) * 1000, 2)
+            yield "entities", {"extracted_entities": entities}
+
+            if use_index and ("ner" in timed_out or "ner" in failed):
+                # No drugs to look up: fall back to the full-text analysis
+                use_index = False
+                if self.ibm_nlp_model:
+                    stream = self._stream_in_background(self.ibm_nlp_model.analyze_text_stream_async(prescription_text))
+                    stream_start = time.perf_counter()
+
+            if use_index:
+                interactions, timings["lookup_ms"] = _timed_call("interaction_lookup", self._find_interactions, entities, prescription_text)
+                yield "interactions", {
+                    "interactions": [interaction._asdict() for interaction in interactions],
+                    "summary": self._summarize_interactions(interactions),
+                }
+                if interactions and self.ibm_nlp_model:
+                    stream = self._stream_in_background(self.ibm_nlp_model.explain_interactions_stream_async(interactions))
+                    stream_start = time.perf_counter()
+
+            if stream:
+                queue, _ = stream
+                deadline = start + self.interaction_timeout
+                first_token = True
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(queue.get(), max(0.0, deadline - time.perf_counter()))
+                    except asyncio.TimeoutError:
+                        logger.warning("Stage missed its deadline, returning partial results", extra={"stage": "interaction", "timeout_s": self.interaction_timeout})
+                        timed_out.append("interaction")
+                        break
+                    if chunk is None:
+                        break
+                    if isinstance(chunk, Exception):
+                        failed.append("interaction")
+                        yield "error", {"stage": "interaction", "detail": "The interaction analysis failed."}
+                        break
+                    if first_token:
+                        timings["first_token_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                        first_token = False
+                    yield "token", {"text": chunk}
+                timings["interaction_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                # Generation spans yields to the client, so it is timed without a span
+                STAGE_DURATION.labels(stage="granite").observe(time.perf_counter() - stream_start)
+
+            timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            yield "done", {"timings": timings, "timed_out": timed_out, "failed": failed,
+                           "partial": bool(timed_out or failed)}
+        finally:
+            # Stop generating if the deadline passed or the client went away
+            if stream:
+                stream[1].cancel()
+
+    async def aclose(self):
+        """
+        Stops the NER micro-batcher; called when the backend shuts down.
+        """
+        if self.ner_batcher:
+            await self.ner_batcher.close()
 
 if __name__ == "__main__":
     # Example Usage:
@@ -64,5 +470,8 @@ if __name__ == "__main__":
         print("\nInteraction Analysis:")
         print(analysis_results["interaction_analysis"])
 
+        print("\nStage Timings (ms):")
+        print(analysis_results["timings"])
+
     except Exception as e:
         print(f"An error occurred during integration: {e}")
\ No newline at end of file
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import sys
+
+# HTTP client libraries log every call at info level; only their warnings are kept
+_QUIET_LOGGERS = ("httpx", "httpcore", "urllib3")
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line: time, level, logger, message, the fields
+    passed with extra=, and the exception if there is one.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Human-readable lines for development, with the extra= fields appended as key=value.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = " ".join(f"{key}={value}" for key, value in vars(record).items()
+                          if key not in _RECORD_ATTRIBUTES and not key.startswith("_"))
+        return f"{line} {fields}" if fields else line
+
+
+def configure_logging(level=None, log_format=None):
+    """
+    Sets up the root logger from LOG_LEVEL (debug, info, warning, error, or off; default info)
+    and LOG_FORMAT (json or text; default json). Logs go to stderr. With LOG_LEVEL=off nothing
+    is logged, and disabled calls cost a level check only.
+    Called once by the entry points (the backend and the scripts' main()), never on import,
+    so applications embedding these modules keep their own logging setup.
+    """
+    level = (level or os.getenv("LOG_LEVEL", "info")).upper()
+    log_format = (log_format or os.getenv("LOG_FORMAT", "json")).lower()
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter() if log_format == "text" else JSONFormatter())
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if getattr(h, "_observability", False)]:
+        root.removeHandler(existing)
+    handler._observability = True
+    root.addHandler(handler)
+    if level in ("OFF", "NONE", "FALSE"):
+        root.setLevel(logging.CRITICAL + 1)
+    else:
+        root.setLevel(getattr(logging, level, logging.INFO))
+    for name in _QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def get_logger(name):
+    """
+    Returns the logger for a module. Its records go wherever configure_logging() or the
+    embedding application sends them.
+    """
+    return logging.getLogger(name)
+
+if __name__ == "__main__":
+    configure_logging()
+    logger = get_logger("example")
+    logger.info("RxNorm lookup", extra={"drug_name": "aspirin", "rxcui": "1191"})
+    logger.debug("Only logged with LOG_LEVEL=debug")
@@ -0,0 +1,66 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+
+# Content type of the Prometheus text exposition format served by render()
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# The metrics of the verification service. Label values are kept to small fixed sets
+# (route templates, stage and service names) so the number of series stays bounded.
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to serve an API request, until the last byte of the response.",
+    ["method", "endpoint", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "API requests being served.", ["endpoint"],
+)
+STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each stage of the verification pipeline (NER, RxNorm, Granite, ...).",
+    ["stage"],
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total", "Calls to upstream services by outcome (ok, error after retries, or rejected by an open circuit).",
+    ["service", "outcome"],
+)
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total", "Retried HTTP attempts to upstream hosts (connection errors, 429 and 5xx).",
+    ["host"],
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_requests_in_flight", "Calls to upstream services waiting for an answer.", ["service"],
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups by result (hit or miss); the hit ratio is hit / (hit + miss).",
+    ["cache", "result"],
+)
+COALESCED_REQUESTS = Counter(
+    "coalesced_requests_total", "Upstream lookups answered by an identical call already in flight.", ["service"],
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state", "State of the circuit breaker of each upstream service: 0 closed, 1 half-open, 2 open.",
+    ["service"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "API requests rejected before being served (queue_full, queue_timeout, rate_limited).",
+    ["endpoint", "reason"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "API requests waiting for a free slot of their endpoint.", ["endpoint"],
+)
+NER_BATCH_SIZE = Histogram(
+    "ner_batch_size", "Texts per NER forward pass.", buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+
+def render():
+    """
+    Returns all metrics of this process in the Prometheus text exposition format.
+    """
+    return generate_latest(REGISTRY)
+
+if __name__ == "__main__":
+    with STAGE_DURATION.labels(stage="ner").time():
+        time.sleep(0.01)
+    CACHE_LOOKUPS.labels(cache="rxnorm", result="hit").inc()
+    print(render().decode("utf-8"))
@@ -0,0 +1,52 @@
+import time
+
+from observability.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and in-flight count of every HTTP request,
+    labelled with its endpoint (e.g. /suggest_alternatives).
+    Latency runs until the last body chunk is sent, so streamed responses count in full.
+    """
+
+    def __init__(self, app, excluded_paths=("/metrics",)):
+        self.app = app
+        self.excluded_paths = set(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        # The API's routes are fixed paths, so the path is the route template;
+        # paths no route serves share one label to keep the number of series bounded
+        endpoint = scope["path"] if self._is_route(scope) else "unmatched"
+        status = [500]
+        recorded = []
+
+        def record():
+            if not recorded:
+                recorded.append(True)
+                HTTP_REQUEST_DURATION.labels(method=scope["method"], endpoint=endpoint,
+                                             status=status[0]).observe(time.perf_counter() - start)
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        HTTP_REQUESTS_IN_FLIGHT.labels(endpoint=endpoint).inc()
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.labels(endpoint=endpoint).dec()
+            # Client disconnects and errors are recorded with the status sent so far
+            record()
+
+    @staticmethod
+    def _is_route(scope):
+        router = getattr(scope.get("app"), "router", None)
+        return router is None or any(getattr(route, "path", None) == scope["path"] for route in router.routes)
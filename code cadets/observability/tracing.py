@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+import importlib.util
+import os
+import sys
+import time
+
+# Add the project root to the Python path so the example below can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from observability.metrics import STAGE_DURATION
+
+# Spans are only sent to OpenTelemetry (an optional dependency) when TRACING_ENABLED=true.
+# The exporter is whatever SDK the deployment configures, e.g. with opentelemetry-instrument.
+TRACING_ENABLED = (os.getenv("TRACING_ENABLED", "false").lower() == "true"
+                   and importlib.util.find_spec("opentelemetry") is not None)
+
+_tracer = None
+
+
+def get_tracer():
+    global _tracer
+    if _tracer is None:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("prescription-verification")
+    return _tracer
+
+
+@contextmanager
+def span(stage, **attributes):
+    """
+    Times a pipeline stage: its duration is always recorded in the stage histogram, and
+    when tracing is enabled it also becomes a span, nested under the current one.
+    Works around awaits too, since the current span is kept in a context variable.
+    """
+    start = time.perf_counter()
+    try:
+        if TRACING_ENABLED:
+            with get_tracer().start_as_current_span(stage, attributes=attributes):
+                yield
+        else:
+            yield
+    finally:
+        STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start)
+
+if __name__ == "__main__":
+    from observability.metrics import render
+
+    with span("rxnorm", endpoint="rxcui"):
+        time.sleep(0.01)
+    print(render())
@@ -0,0 +1,319 @@
+import argparse
+from bisect import bisect_right
+import csv
+import math
+import os
+import sys
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.rxnorm_store import DEFAULT_DB_PATH, RxNormStore, normalize_name
+from scripts.columnar_store import processed_path
+from scripts.dosage_rules import DEFAULT_RULES, DEFAULT_RULES_PATH, load_rules
+
+# Default location of the graph written by this script
+DEFAULT_GRAPH_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'processed', 'alternatives_graph.npz'
+)
+
+# Term types in the graph, ranked from ingredient (0) to packs. A concept's ingredients are
+# found by following relations to concepts of lower rank only, so a clinical drug component
+# never leads back up to the combination products that contain it.
+TTY_RANKS = {
+    "IN": 0, "MIN": 1, "PIN": 1, "BN": 1,
+    "SCDC": 2, "SCDF": 2, "SCDG": 2, "SBDC": 3, "SBDF": 3, "SBDG": 3,
+    "SCD": 4, "SBD": 5, "GPCK": 5, "BPCK": 6,
+}
+
+# Term types offered as alternatives; any concept in the graph can be looked up
+ALTERNATIVE_TTYS = ("IN", "MIN", "PIN", "BN")
+
+# Why a concept is an alternative, stored per edge as an index into this list
+RELATIONS = ["ingredient", "same_ingredient", "same_class"]
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _parse_age(value):
+    value = (value or "").strip() if isinstance(value, str) else value
+    return float(value) if value not in (None, "") else None
+
+
+def load_contraindications(path):
+    """
+    Reads age contraindications from a CSV with columns rxcui and/or drug_name, age_min, age_max
+    (years, lower bound inclusive, upper exclusive, empty for unbounded), e.g. aspirin under 16.
+    """
+    return [
+        ((row.get("rxcui") or "").strip() or None, normalize_name(row.get("drug_name") or "") or None,
+         _parse_age(row.get("age_min")), _parse_age(row.get("age_max")))
+        for row in _read_csv(path)
+    ]
+
+
+def load_classes(path):
+    """
+    Reads therapeutic class memberships from a CSV with columns rxcui and class_id
+    (e.g. an ATC or EPC export from RxClass; the RxNorm release has no classes).
+    """
+    return [(row["rxcui"].strip(), row["class_id"].strip()) for row in _read_csv(path)]
+
+
+def _covers(age_min, age_max, age):
+    return (age_min is None or age_min <= age) and (age_max is None or age < age_max)
+
+
+def build_graph(store, rules=(), contraindications=(), classes=()):
+    """
+    Materializes the alternatives of every concept of the store as CSR arrays.
+    A concept's alternatives are its ingredients, the ingredients, precise ingredients and
+    brands with exactly the same ingredients, and the concepts sharing a therapeutic class
+    with it or its ingredients. Each concept also gets a bitset of the age intervals it is
+    contraindicated in: explicitly listed ones, and those no dosage rule covers for a drug
+    that has rules; products inherit the bits of their ingredients.
+    Returns a dict of numpy arrays, as saved by save_graph.
+    """
+    rxcuis, names, ttys = [], [], []
+    for rxcui, name, tty in store.iter_concepts():
+        if tty in TTY_RANKS and rxcui.isdigit():
+            rxcuis.append(rxcui)
+            names.append(name)
+            ttys.append(tty)
+    node_ids = {rxcui: node for node, rxcui in enumerate(rxcuis)}
+    ranks = [TTY_RANKS[tty] for tty in ttys]
+
+    lower = [set() for _ in rxcuis]
+    for rxcui, _, related_rxcui in store.iter_relations():
+        a, b = node_ids.get(rxcui), node_ids.get(related_rxcui)
+        if a is None or b is None or ranks[a] == ranks[b]:
+            continue
+        if ranks[b] < ranks[a]:
+            lower[a].add(b)
+        else:
+            lower[b].add(a)
+
+    # Ingredient sets, computed from the lowest rank up; identical sets are shared
+    interned = {}
+    ingredients = [None] * len(rxcuis)
+    for node in sorted(range(len(rxcuis)), key=ranks.__getitem__):
+        if ttys[node] == "IN":
+            found = frozenset((node,))
+        else:
+            found = frozenset().union(*(ingredients[other] for other in lower[node]))
+        ingredients[node] = interned.setdefault(found, found)
+
+    same_ingredients = {}
+    for node, tty in enumerate(ttys):
+        if tty in ALTERNATIVE_TTYS and ingredients[node]:
+            same_ingredients.setdefault(ingredients[node], []).append(node)
+
+    class_members, node_classes = {}, {}
+    for rxcui, class_id in classes:
+        node = node_ids.get(rxcui)
+        if node is not None and ttys[node] in ALTERNATIVE_TTYS:
+            class_members.setdefault(class_id, []).append(node)
+            node_classes.setdefault(node, []).append(class_id)
+
+    # Age intervals: every rule and contraindication bound starts a new one
+    bounds = {-math.inf}
+    for rule in rules:
+        bounds.update(bound for bound in (rule.age_min, rule.age_max) if bound is not None)
+    for _, _, age_min, age_max in contraindications:
+        bounds.update(bound for bound in (age_min, age_max) if bound is not None)
+    age_starts = sorted(bounds)
+    all_intervals = (1 << len(age_starts)) - 1
+
+    def interval_bits(age_min, age_max):
+        return sum(1 << i for i, start in enumerate(age_starts) if _covers(age_min, age_max, start))
+
+    name_ids = {}
+    for node, name in enumerate(names):
+        name_ids.setdefault(normalize_name(name), node)
+
+    def match(rxcui, drug_name):
+        node = node_ids.get(rxcui) if rxcui else None
+        return node if node is not None else name_ids.get(drug_name)
+
+    covered = {}
+    for rule in rules:
+        node = match(rule.rxcui, rule.drug_name)
+        if node is not None:
+            covered[node] = covered.get(node, 0) | interval_bits(rule.age_min, rule.age_max)
+    own = {node: all_intervals & ~bits for node, bits in covered.items()}
+    for rxcui, drug_name, age_min, age_max in contraindications:
+        node = match(rxcui, drug_name)
+        if node is not None:
+            own[node] = own.get(node, 0) | interval_bits(age_min, age_max)
+
+    row_bytes = (len(age_starts) + 7) // 8
+    contraindicated = bytearray()
+    indptr, indices, relations = [0], [], []
+    for node in range(len(rxcuis)):
+        bits = own.get(node, 0)
+        for ingredient in ingredients[node]:
+            bits |= own.get(ingredient, 0)
+        contraindicated += bits.to_bytes(row_bytes, "little")
+
+        found = {}
+        node_ingredients = ingredients[node]
+        for relation, targets in enumerate((
+            node_ingredients,
+            same_ingredients.get(node_ingredients, ()),
+            (member for source in node_ingredients | {node} for class_id in node_classes.get(source, ())
+             for member in class_members[class_id] if ingredients[member] != node_ingredients),
+        )):
+            for target in sorted(targets, key=names.__getitem__):
+                found.setdefault(target, relation)
+        found.pop(node, None)
+        indices.extend(found)
+        relations.extend(found.values())
+        indptr.append(len(indices))
+
+    encoded = [name.encode("utf-8") for name in names]
+    tty_names = sorted(set(ttys))
+    tty_codes = {tty: code for code, tty in enumerate(tty_names)}
+    return {
+        "rxcui": np.array([int(rxcui) for rxcui in rxcuis], dtype=np.int64),
+        "tty": np.array([tty_codes[tty] for tty in ttys], dtype=np.uint8),
+        "tty_names": np.array(tty_names),
+        "name_offsets": np.cumsum([0] + [len(name) for name in encoded], dtype=np.int64),
+        "names": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "indptr": np.array(indptr, dtype=np.int64),
+        "indices": np.array(indices, dtype=np.int32),
+        "relation": np.array(relations, dtype=np.uint8),
+        "age_starts": np.array(age_starts, dtype=np.float64),
+        "contraindicated": np.frombuffer(bytes(contraindicated), dtype=np.uint8).reshape(len(rxcuis), row_bytes),
+    }
+
+
+def save_graph(arrays, path):
+    """
+    Writes the graph arrays to an .npz file that replaces path once complete.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+class AlternativesGraph:
+    """
+    Alternatives of every RxNorm concept, precomputed by build_graph, in CSR arrays:
+    the alternatives of node i are indices[indptr[i]:indptr[i + 1]]. A lookup is one dict
+    access and a few array slices; the age filter is a bit test per alternative.
+    """
+
+    def __init__(self, arrays):
+        # Kept as memoryviews: indexing one yields plain ints, which is much cheaper than
+        # numpy indexing for the handful of alternatives a lookup returns
+        self.rxcuis = memoryview(arrays["rxcui"])
+        self.ttys = memoryview(arrays["tty"])
+        self.tty_names = arrays["tty_names"].tolist()
+        self.name_offsets = memoryview(arrays["name_offsets"])
+        self.names = arrays["names"].tobytes()
+        self.indptr = memoryview(arrays["indptr"])
+        self.indices = memoryview(arrays["indices"])
+        self.relations = memoryview(arrays["relation"])
+        self.age_starts = arrays["age_starts"].tolist()
+        self.row_bytes = arrays["contraindicated"].shape[1]
+        self.contraindicated = memoryview(arrays["contraindicated"].reshape(-1))
+        self.node_ids = {rxcui: node for node, rxcui in enumerate(arrays["rxcui"].tolist())}
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    @classmethod
+    def from_file(cls, path=None):
+        """
+        Loads the graph written by this script, or returns None if it has not been built.
+        """
+        path = path or os.getenv("ALTERNATIVES_GRAPH_PATH") or DEFAULT_GRAPH_PATH
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def _node(self, rxcui):
+        try:
+            return self.node_ids.get(int(rxcui))
+        except (TypeError, ValueError):
+            return None
+
+    def __contains__(self, rxcui):
+        return self._node(rxcui) is not None
+
+    def _interval(self, age):
+        return bisect_right(self.age_starts, age) - 1
+
+    def is_contraindicated(self, rxcui, age):
+        """
+        True if the concept is contraindicated at this age (in years).
+        """
+        node = self._node(rxcui)
+        if node is None or age is None:
+            return False
+        interval = self._interval(age)
+        return bool(self.contraindicated[node * self.row_bytes + (interval >> 3)] >> (interval & 7) & 1)
+
+    def alternatives(self, rxcui, patient_age=None):
+        """
+        Returns the alternatives of a concept as {"name", "rxcui", "type", "relation"} dicts,
+        without those contraindicated at patient_age, or None if the concept is not in the graph.
+        """
+        node = self._node(rxcui)
+        if node is None:
+            return None
+        start, end = self.indptr[node], self.indptr[node + 1]
+        interval = self._interval(patient_age) if patient_age is not None else None
+
+        alternatives = []
+        names, offsets, contraindicated, row_bytes = self.names, self.name_offsets, self.contraindicated, self.row_bytes
+        for target, relation in zip(self.indices[start:end], self.relations[start:end]):
+            if interval is not None and contraindicated[target * row_bytes + (interval >> 3)] >> (interval & 7) & 1:
+                continue
+            alternatives.append({
+                "name": names[offsets[target]:offsets[target + 1]].decode("utf-8"),
+                "rxcui": str(self.rxcuis[target]),
+                "type": self.tty_names[self.ttys[target]],
+                "relation": RELATIONS[relation],
+            })
+        return alternatives
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the alternatives graph from the local RxNorm store.")
+    parser.add_argument("--db-path", default=os.getenv("RXNORM_LOCAL_DB") or DEFAULT_DB_PATH,
+                        help="Local RxNorm store built by load_rxnorm.py")
+    parser.add_argument("--rules", default=os.getenv("DOSAGE_RULES_PATH") or processed_path(DEFAULT_RULES_PATH),
+                        help="Dosage rules whose age ranges mark the ages a drug is dosed for")
+    parser.add_argument("--contraindications", help="Optional CSV of age contraindications (rxcui/drug_name, age_min, age_max)")
+    parser.add_argument("--classes", help="Optional CSV of therapeutic class memberships (rxcui, class_id)")
+    parser.add_argument("--output", default=os.getenv("ALTERNATIVES_GRAPH_PATH") or DEFAULT_GRAPH_PATH)
+    args = parser.parse_args()
+
+    print("\n--- Building Alternatives Graph ---")
+    if not os.path.exists(args.db_path):
+        print(f"No RxNorm local store at {args.db_path}. Build it with scripts/load_rxnorm.py first.")
+        return
+    rules = load_rules(args.rules) if os.path.exists(args.rules) else DEFAULT_RULES
+    contraindications = load_contraindications(args.contraindications) if args.contraindications else []
+    classes = load_classes(args.classes) if args.classes else []
+
+    store = RxNormStore(args.db_path)
+    try:
+        arrays = build_graph(store, rules, contraindications, classes)
+    finally:
+        store.close()
+    save_graph(arrays, args.output)
+    print(f"{len(arrays['rxcui'])} concepts, {len(arrays['indices'])} alternatives and "
+          f"{len(arrays['age_starts'])} age intervals written to {args.output}")
+    print("--- Alternatives Graph Build Finished ---\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import importlib.util
+import os
+
+# Text columns are dictionary-encoded when they have fewer distinct values than this share of rows
+MAX_DICTIONARY_RATIO = 0.5
+
+# Rows per record batch of the files written by ArrowChunkWriter
+OUTPUT_BATCH_ROWS = 1 << 18
+
+
+def arrow_available():
+    """
+    True if pyarrow, an optional dependency only needed for Arrow output, is installed.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def processed_path(csv_path):
+    """
+    Returns the Arrow version of a processed CSV path (same name, .arrow) when it has
+    been prepared and pyarrow is installed, otherwise csv_path.
+    """
+    arrow_path = f"{os.path.splitext(csv_path)[0]}.arrow"
+    if os.path.exists(arrow_path) and arrow_available():
+        return arrow_path
+    return csv_path
+
+
+def read_table(path):
+    """
+    Opens an Arrow IPC file as a memory-mapped pyarrow Table. Columns point into the mapped
+    file, so nothing is parsed or copied and processes reading the same file share its pages.
+    """
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def read_records(path):
+    """
+    Reads an Arrow IPC file as a list of dicts, one per row.
+    """
+    return read_table(path).to_pylist()
+
+
+def _is_text(data_type):
+    import pyarrow as pa
+
+    return pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+
+
+def _text_dictionary(column, force=False):
+    """
+    The sorted dictionary to encode a text column with, so code order is value order.
+    Unless forced, None for columns with mostly distinct values (e.g. descriptions).
+    """
+    import pyarrow.compute as pc
+
+    # Checked on the first chunk before hashing the whole column, which for mostly
+    # distinct values would take about as much memory as the column itself
+    if not force and column.num_chunks:
+        sample = column.chunk(0)
+        if len(pc.unique(sample)) > len(sample) * MAX_DICTIONARY_RATIO:
+            return None
+    dictionary = pc.unique(column).drop_null()
+    if not force and len(dictionary) > len(column) * MAX_DICTIONARY_RATIO:
+        return None
+    return dictionary.take(pc.sort_indices(dictionary))
+
+
+def _encode_array(array, dictionary):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    return pa.DictionaryArray.from_arrays(pc.index_in(array, value_set=dictionary), dictionary)
+
+
+def _dictionary_encode(column, force=False):
+    """
+    Dictionary-encodes a text column with a sorted dictionary (see _text_dictionary).
+    """
+    dictionary = _text_dictionary(column, force)
+    return _encode_chunks(column, dictionary) if dictionary is not None else column
+
+
+def _encode_chunks(column, dictionary):
+    import pyarrow as pa
+
+    return pa.chunked_array([_encode_array(chunk, dictionary) for chunk in column.chunks],
+                            type=pa.dictionary(pa.int32(), dictionary.type))
+
+
+def _take_rows(column, rows, chunk_starts):
+    """
+    column.take(rows) for a chunked column, reading only the chunks the rows are in.
+    ChunkedArray.take concatenates every chunk first, which would copy the whole column.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    chunk_ids = np.searchsorted(chunk_starts, rows, side="right") - 1
+    grouped = np.argsort(chunk_ids, kind="stable")
+    grouped_ids = chunk_ids[grouped]
+    parts = []
+    for chunk_id in np.unique(grouped_ids):
+        lo, hi = np.searchsorted(grouped_ids, [chunk_id, chunk_id + 1])
+        parts.append(column.chunk(chunk_id).take(rows[grouped[lo:hi]] - chunk_starts[chunk_id]))
+    # parts hold the rows grouped by chunk; put them back in the order asked for
+    return pa.concat_arrays(parts).take(np.argsort(grouped))
+
+
+def _sort_codes(column):
+    """
+    Returns a column as int64 codes in value order, nulls last, and the number of distinct codes.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not pa.types.is_dictionary(column.type):
+        column = _dictionary_encode(column, force=True)
+    size = len(column.chunk(0).dictionary)
+    indices = pa.chunked_array([chunk.indices for chunk in column.chunks], type=pa.int32())
+    return pc.fill_null(indices, size).to_numpy().astype("int64"), size + 1
+
+
+def _merge_order(key_columns):
+    """
+    The row order sorting a table by key_columns (a stable sort, nulls last). Only the keys'
+    codes are sorted: they are folded into one int64 per row when they fit, and numpy's stable
+    sort (timsort) then merges the sorted runs left by ArrowChunkWriter.write in about one pass.
+    """
+    import numpy as np
+
+    codes = [_sort_codes(column) for column in key_columns]
+    if np.prod([float(size) for _, size in codes]) >= 2 ** 62:
+        return np.lexsort([column_codes for column_codes, _ in reversed(codes)])
+    keys = np.zeros(len(codes[0][0]), dtype="int64")
+    for column_codes, size in codes:
+        keys = keys * size + column_codes
+    return np.argsort(keys, kind="stable")
+
+
+class ArrowChunkWriter:
+    """
+    Writes chunks as an uncompressed Arrow IPC file that replaces the output only once
+    every chunk is written. Chunks are sorted by sort_by and appended to a temporary Arrow
+    stream; on close it is memory-mapped, the sorted chunks are merged, text columns are
+    dictionary-encoded (always for dictionary_columns, otherwise when they repeat enough)
+    and written out in record batches of batch_rows rows, which readers map without copying.
+
+    Only the merge order and the key codes (a few bytes per row), the dictionaries and one
+    output batch are held in memory; every other column is read from the mapped stream.
+    """
+
+    def __init__(self, output_path, sort_by=None, dictionary_columns=(), batch_rows=OUTPUT_BATCH_ROWS):
+        self.output_path = output_path
+        self.tmp_path = f"{output_path}.tmp"
+        self.stream_path = f"{output_path}.chunks.tmp"
+        self.sort_by = sort_by
+        self.dictionary_columns = set(dictionary_columns)
+        self.batch_rows = batch_rows
+        self.schema = None
+        self.writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata()
+        if self.writer is None:
+            # A column that is empty in the first chunk has no type yet; treat it as text
+            self.schema = pa.schema([
+                field.with_type(pa.large_string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self.writer = pa.ipc.new_stream(self.stream_path, self.schema)
+        table = table.select(self.schema.names).cast(self.schema)
+        if self.sort_by:
+            table = table.sort_by([(column, "ascending") for column in self.sort_by])
+        self.writer.write_table(table)
+        return df
+
+    def _field(self, name, table, encoded, dictionaries):
+        import pyarrow as pa
+
+        if name in encoded:
+            return pa.field(name, encoded[name].type)
+        if dictionaries.get(name) is not None:
+            return pa.field(name, pa.dictionary(pa.int32(), dictionaries[name].type))
+        return table.schema.field(name)
+
+    def close(self):
+        import numpy as np
+        import pyarrow as pa
+
+        if self.writer is None:
+            # Nothing survived cleaning; still produce an (empty) output file
+            pa.ipc.new_file(self.tmp_path, pa.schema([])).close()
+            os.replace(self.tmp_path, self.output_path)
+            return
+
+        self.writer.close()
+        with pa.memory_map(self.stream_path) as source:
+            table = pa.ipc.open_stream(source).read_all()
+            dictionaries = {
+                name: _text_dictionary(table.column(name), name in self.dictionary_columns)
+                for name in table.column_names if _is_text(table.schema.field(name).type)
+            }
+            # The keys are encoded up front for the merge; other text columns one batch at a time
+            encoded = {}
+            for name in self.sort_by or ():
+                dictionary = dictionaries.pop(name, None)
+                encoded[name] = _encode_chunks(table.column(name), dictionary) if dictionary is not None else table.column(name)
+            order = _merge_order([encoded[name] for name in self.sort_by]) if encoded and table.num_rows else None
+            chunk_starts = np.cumsum([0] + [len(chunk) for chunk in table.column(0).chunks])[:-1]
+
+            schema = pa.schema([self._field(name, table, encoded, dictionaries) for name in table.column_names])
+            with pa.ipc.new_file(self.tmp_path, schema) as writer:
+                for start in range(0, table.num_rows, self.batch_rows):
+                    arrays = []
+                    for name in schema.names:
+                        column = encoded[name] if name in encoded else table.column(name)
+                        if order is not None:
+                            array = _take_rows(column, order[start:start + self.batch_rows], chunk_starts)
+                        else:
+                            array = column.slice(start, self.batch_rows).combine_chunks()
+                        if dictionaries.get(name) is not None:
+                            array = _encode_array(array, dictionaries[name])
+                        arrays.append(array)
+                    writer.write_batch(pa.record_batch(arrays, schema=schema))
+        os.remove(self.stream_path)
+        os.replace(self.tmp_path, self.output_path)
+
+if __name__ == "__main__":
+    import tempfile
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "example.arrow")
+        writer = ArrowChunkWriter(path, sort_by=["drug_name"], dictionary_columns=["drug_name"])
+        writer.write(pd.DataFrame({"drug_name": ["warfarin", "aspirin"], "max_dose_mg": [10.0, 1000.0]}))
+        writer.write(pd.DataFrame({"drug_name": ["aspirin"], "max_dose_mg": [None]}))
+        writer.close()
+        table = read_table(path)
+        print(table.schema)
+        print(table.to_pylist())
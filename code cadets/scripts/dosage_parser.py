@@ -0,0 +1,295 @@
+from collections import namedtuple
+
+# A parsed dose. 'amount' and 'unit' are the dose as written; 'dose' and 'daily_dose'
+# are normalized to 'dose_unit' (mg for masses and for volumes of a known
+# concentration, otherwise IU, mEq or mL). 'per_kg' is True for weight-based doses
+# ('5mg/kg'), which only have a dose when the patient's weight is known.
+# Fields that cannot be determined are None.
+ParsedDosage = namedtuple("ParsedDosage", [
+    "amount", "unit", "dose", "dose_unit", "frequency_per_day", "duration_days", "daily_dose", "per_kg"
+], defaults=(False,))
+
+EMPTY_DOSAGE = ParsedDosage(None, None, None, None, None, None, None)
+
+NUMBER, WORD, SLASH = 0, 1, 2
+
+# Lookup tables built once at import; the parser never uses regular expressions.
+# unit word -> (canonical unit, factor to the canonical unit)
+UNITS = {}
+for _words, _unit, _factor in [
+    (("mg", "mgs", "milligram", "milligrams"), "mg", 1.0),
+    (("g", "gm", "gms", "gram", "grams"), "mg", 1000.0),
+    (("mcg", "ug", "µg", "microgram", "micrograms"), "mg", 0.001),
+    (("iu", "unit", "units", "u"), "IU", 1.0),
+    (("meq",), "mEq", 1.0),
+    (("ml", "mls", "cc", "milliliter", "milliliters", "millilitre", "millilitres"), "mL", 1.0),
+    (("l", "liter", "liters", "litre", "litres"), "mL", 1000.0),
+]:
+    for _word in _words:
+        UNITS[_word] = (_unit, _factor)
+
+# Time unit word -> length in days
+TIME_UNITS = {}
+for _words, _days in [
+    (("h", "hr", "hrs", "hour", "hours"), 1 / 24),
+    (("d", "day", "days"), 1.0),
+    (("wk", "wks", "week", "weeks"), 7.0),
+    (("month", "months"), 30.0),
+]:
+    for _word in _words:
+        TIME_UNITS[_word] = _days
+
+# Abbreviations that set the number of doses per day on their own
+FREQUENCY_WORDS = {
+    "qd": 1, "od": 1, "nightly": 1, "qhs": 1, "hs": 1, "qam": 1, "qpm": 1,
+    "bid": 2, "bd": 2,
+    "tid": 3, "tds": 3,
+    "qid": 4, "qds": 4,
+}
+# Words giving how many times a dose is taken per period ('twice weekly'; a day by default)
+COUNT_WORDS = {"once": 1, "twice": 2, "thrice": 3}
+# Words giving that period in days; they never override a frequency set another way
+PERIOD_WORDS = {"daily": 1.0, "weekly": 7.0}
+# Spelled-out numbers, read as numbers by the tokenizer ('three times daily')
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12,
+}
+# Words after which 'N hours/days' is an interval between doses rather than a duration
+INTERVAL_WORDS = {"q", "every", "each"}
+TIMES_WORDS = {"times", "time", "x"}
+WEIGHT_WORDS = {"kg", "kgs"}
+# Dose forms counted as units per dose ('2 tablets of 500mg')
+FORM_WORDS = {
+    "tab", "tabs", "tablet", "tablets", "cap", "caps", "capsule", "capsules",
+    "pill", "pills", "caplet", "caplets",
+}
+
+
+def tokenize(text):
+    """
+    Splits text into (kind, value) tokens in a single pass over its characters.
+    Numbers become floats ('1,000', '2.5' and spelled-out ones such as 'three' included),
+    words are lower-cased with abbreviation dots removed ('b.i.d.' -> 'bid'), and '/' is
+    kept as its own token, as is 'per', which means the same.
+    """
+    tokens = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch.isdigit() or (ch == "." and i + 1 < n and text[i + 1].isdigit()):
+            start = i
+            digits = []
+            while i < n:
+                ch = text[i]
+                if ch.isdigit() or ch == ".":
+                    digits.append(ch)
+                elif not (ch == "," and text[i + 1:i + 4].isdigit() and not text[i + 4:i + 5].isdigit()):
+                    # A comma only belongs to a number as a thousands separator
+                    break
+                i += 1
+            try:
+                tokens.append((NUMBER, float("".join(digits))))
+            except ValueError:
+                tokens.append((WORD, text[start:i]))
+        elif ch.isalpha():
+            letters = []
+            while i < n:
+                ch = text[i]
+                if ch.isalpha():
+                    letters.append(ch)
+                elif not (ch == "." and i + 1 < n and text[i + 1].isalpha()):
+                    break
+                i += 1
+            # A trailing abbreviation dot ('b.i.d.') is not part of the next token
+            if i < n and text[i] == ".":
+                i += 1
+            word = "".join(letters).lower()
+            if word in NUMBER_WORDS:
+                tokens.append((NUMBER, float(NUMBER_WORDS[word])))
+            elif word == "per":
+                tokens.append((SLASH, "/"))
+            else:
+                tokens.append((WORD, word))
+        elif ch == "/":
+            tokens.append((SLASH, "/"))
+            i += 1
+        else:
+            i += 1
+    return tokens
+
+
+def read_denominators(tokens, j):
+    """
+    Reads the '/[number] unit' parts starting at the slash token j, as in '250mg/5mL',
+    '5mg/kg' or '10 mg/kg/day'. Returns ({'mL': volume, 'kg': True, 'days': length}, index
+    after them), or (None, j) when a denominator is not a volume, 'kg' or a time unit.
+    """
+    n = len(tokens)
+    per = {}
+    while j < n and tokens[j][0] == SLASH:
+        j += 1
+        count = 1.0
+        if j < n and tokens[j][0] == NUMBER:
+            count = tokens[j][1]
+            j += 1
+        word = tokens[j][1] if j < n and tokens[j][0] == WORD else None
+        if word in UNITS and UNITS[word][0] == "mL" and "mL" not in per:
+            per["mL"] = count * UNITS[word][1]
+        elif word in WEIGHT_WORDS and count == 1 and "kg" not in per:
+            per["kg"] = True
+        elif word in TIME_UNITS and "days" not in per:
+            per["days"] = count * TIME_UNITS[word]
+        else:
+            return None, j
+        j += 1
+    return per, j
+
+
+def parse_dosage(text, patient_weight=None):
+    """
+    Parses a free-text dose such as '500mg', '1 g', '500 mcg', '10mg BID', '2 x 500mg',
+    '2 tablets of 500mg', '5 mL of 250mg/5mL', '500 mg per day', '100 mg three times daily',
+    '500mg x 3 daily' or '1 g twice daily for 7 days' into a ParsedDosage.
+    Weight-based doses ('5mg/kg') are scaled by patient_weight in kg. A dose per anything
+    else ('mg/m2', 'mg/tab') is returned unparsed rather than read as a plain dose.
+    """
+    if not text:
+        return EMPTY_DOSAGE
+
+    tokens = tokenize(str(text))
+    n = len(tokens)
+    amount = None          # (value as written, unit word)
+    concentration = None   # (value as written, unit word, per volume in mL)
+    count = None           # units taken per dose, as in '2 x 500mg'
+    per_kg = False
+    per_days = None        # the amount is spread over this many days, as in '500 mg/day'
+    frequency = None       # doses per day from an abbreviation ('bid') or interval ('every 8 hours')
+    times = None           # doses per period, as in 'three times' or 'x 3'
+    period = None          # that period in days, as in 'daily', 'weekly' or 'a day'
+    duration = None
+
+    i = 0
+    while i < n:
+        kind, value = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < n else None
+        previous = tokens[i - 1][1] if i > 0 and tokens[i - 1][0] == WORD else None
+
+        if kind == NUMBER and nxt is not None and nxt[0] == WORD:
+            word = nxt[1]
+            if word in UNITS:
+                unit = UNITS[word][0]
+                per, j = {}, i + 2
+                if j < n and tokens[j][0] == SLASH:
+                    per, j = read_denominators(tokens, j)
+                    if per is None:
+                        return EMPTY_DOSAGE
+                if "mL" in per:
+                    # '250mg/5mL' or '250 mg/mL' is a concentration, not a dose
+                    if unit == "mL" or len(per) > 1:
+                        return EMPTY_DOSAGE
+                    if concentration is None:
+                        concentration = (value, word, per["mL"])
+                elif amount is None:
+                    amount = (value, word)
+                    per_kg = "kg" in per
+                    per_days = per.get("days")
+                i = j
+                continue
+            if word in TIME_UNITS:
+                days = value * TIME_UNITS[word]
+                if previous in INTERVAL_WORDS:
+                    frequency = 1 / days
+                elif duration is None:
+                    duration = days
+                i += 2
+                continue
+            if word in TIMES_WORDS and amount is None and i + 3 < n and tokens[i + 2][0] == NUMBER \
+                    and tokens[i + 3][0] == WORD and tokens[i + 3][1] in UNITS:
+                # '2 x 500mg' is two units of 500 mg per dose, not twice a day
+                count = value
+                i += 2
+                continue
+            if word in FORM_WORDS and count is None:
+                # '2 tablets of 500mg' or '500mg, 2 tablets'
+                count = value
+                i += 2
+                continue
+            if word in TIMES_WORDS and times is None:
+                times = value
+                i += 2
+                continue
+            i += 1
+            continue
+
+        if kind == WORD:
+            if value in FREQUENCY_WORDS and frequency is None:
+                frequency = FREQUENCY_WORDS[value]
+            elif value in COUNT_WORDS and times is None:
+                times = COUNT_WORDS[value]
+            elif value in PERIOD_WORDS and period is None:
+                period = PERIOD_WORDS[value]
+            elif value == "x" and times is None and nxt is not None and nxt[0] == NUMBER \
+                    and not (i + 2 < n and tokens[i + 2][0] == WORD
+                             and (tokens[i + 2][1] in UNITS or tokens[i + 2][1] in TIME_UNITS)):
+                # 'x 3' after the dose is three times; 'x 3 days' is a duration
+                times = nxt[1]
+                i += 2
+                continue
+            elif value == "a" and nxt is not None and nxt[0] == WORD and nxt[1] in TIME_UNITS and period is None:
+                period = TIME_UNITS[nxt[1]]
+                i += 2
+                continue
+        elif kind == SLASH and nxt is not None and nxt[0] == WORD and nxt[1] in TIME_UNITS and period is None:
+            # 'twice per day'; a '/day' right after the amount was read as a daily total above
+            period = TIME_UNITS[nxt[1]]
+            i += 2
+            continue
+        i += 1
+
+    if frequency is None and (times is not None or period is not None):
+        frequency = (times if times is not None else 1) / (period or 1.0)
+
+    if amount is None and concentration is None:
+        return ParsedDosage(None, None, None, None, frequency, duration, None)
+
+    # Only a strength was given ('250mg/5mL'): take it as one dose of that volume
+    value, word = amount or concentration[:2]
+    dose_unit, factor = UNITS[word]
+    dose = (count or 1.0) * value * factor
+    if dose_unit == "mL" and concentration is not None:
+        # Volume of a solution with a known strength: convert to the active ingredient
+        strength_unit, strength_factor = UNITS[concentration[1]]
+        dose = dose * concentration[0] * strength_factor / concentration[2]
+        dose_unit = strength_unit
+
+    if per_kg:
+        if patient_weight is None:
+            return ParsedDosage(value, word, None, dose_unit, frequency, duration, None, True)
+        dose = dose * patient_weight
+    if per_days is not None:
+        # '500 mg/day' is a daily total; it is a per-dose amount only when the frequency is known
+        daily_dose = dose / per_days
+        dose = daily_dose / frequency if frequency else None
+    else:
+        daily_dose = dose * frequency if frequency is not None else None
+    return ParsedDosage(value, word, dose, dose_unit, frequency, duration, daily_dose, per_kg)
+
+
+def parse_dosage_series(series):
+    """
+    Parses a pandas Series of dose strings into a DataFrame with one column per ParsedDosage field.
+    Each distinct string is parsed once, which is what makes whole columns cheap:
+    real dosage columns repeat a small set of values many times.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    # Missing values get code -1; point them at an empty row appended after the parsed ones
+    rows = [parse_dosage(value) for value in uniques] + [EMPTY_DOSAGE]
+    codes[codes < 0] = len(uniques)
+    parsed = pd.DataFrame(rows, columns=list(ParsedDosage._fields))
+    result = parsed.iloc[codes]
+    result.index = series.index
+    return result
@@ -0,0 +1,226 @@
+from bisect import bisect_right
+from collections import namedtuple
+import csv
+import math
+import os
+import threading
+import time
+
+from observability.log import get_logger
+from scripts.columnar_store import processed_path, read_records
+
+logger = get_logger(__name__)
+
+# Default location of the dosage rules written by prepare_datasets.py
+# (processed_dosage_rules.arrow is used instead when it exists)
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'processed', 'processed_dosage_rules.csv'
+)
+
+# Age assumed when the patient's age is not given, so adult ranges apply; check() says so
+# in its message whenever the drug's rules depend on age
+ADULT_REFERENCE_AGE = 30
+
+# One dosage range. Ages are in years and weights in kg, lower bound inclusive and
+# upper bound exclusive; None means unbounded. Doses are in mg.
+DosageRule = namedtuple("DosageRule", [
+    "rxcui", "drug_name", "route", "age_min", "age_max", "weight_min", "weight_max",
+    "min_dose_mg", "max_dose_mg", "max_daily_mg"
+])
+
+# Used when no rules file has been prepared yet
+DEFAULT_RULES = [
+    DosageRule("1191", "aspirin", None, 18, None, None, None, 50, 1000, 4000),
+]
+
+
+def normalize_drug_name(name):
+    return " ".join(name.lower().split())
+
+
+def _parse_float(value):
+    if isinstance(value, str):
+        value = value.strip()
+    return float(value) if value not in (None, "") else None
+
+
+def _read_rows(path):
+    if path.endswith(".arrow"):
+        return read_records(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def load_rules(path):
+    """
+    Reads dosage rules from a CSV or Arrow file with one column per DosageRule field.
+    """
+    rules = []
+    for row in _read_rows(path):
+        rules.append(DosageRule(
+            rxcui=(row.get("rxcui") or "").strip() or None,
+            drug_name=normalize_drug_name(row.get("drug_name") or "") or None,
+            route=(row.get("route") or "").strip().lower() or None,
+            age_min=_parse_float(row.get("age_min")),
+            age_max=_parse_float(row.get("age_max")),
+            weight_min=_parse_float(row.get("weight_min")),
+            weight_max=_parse_float(row.get("weight_max")),
+            min_dose_mg=_parse_float(row.get("min_dose_mg")),
+            max_dose_mg=_parse_float(row.get("max_dose_mg")),
+            max_daily_mg=_parse_float(row.get("max_daily_mg")),
+        ))
+    return rules
+
+
+class _AgeIntervalIndex:
+    """
+    Rules for one drug, split into elementary age intervals.
+    The age boundaries of all rules cut the age axis into intervals; each interval
+    stores the rules covering it, so a lookup is one bisect plus a scan of the few
+    rules (routes, weight bands) that share that interval.
+    """
+
+    def __init__(self, rules):
+        self.age_dependent = any(rule.age_min is not None or rule.age_max is not None for rule in rules)
+        bounds = {-math.inf}
+        for rule in rules:
+            bounds.add(-math.inf if rule.age_min is None else rule.age_min)
+            bounds.add(math.inf if rule.age_max is None else rule.age_max)
+        self.starts = sorted(bounds)
+        self.rules = []
+        for start in self.starts:
+            self.rules.append([
+                rule for rule in rules
+                if (rule.age_min is None or rule.age_min <= start)
+                and (rule.age_max is None or start < rule.age_max)
+            ])
+
+    def lookup(self, age):
+        return self.rules[bisect_right(self.starts, age) - 1]
+
+
+class DosageRuleIndex:
+    """
+    Immutable in-memory index of dosage rules keyed by RxCUI and by drug name.
+    """
+
+    def __init__(self, rules):
+        by_key = {}
+        for rule in rules:
+            if rule.rxcui:
+                by_key.setdefault(("rxcui", rule.rxcui), []).append(rule)
+            if rule.drug_name:
+                by_key.setdefault(("name", rule.drug_name), []).append(rule)
+        self.indexes = {key: _AgeIntervalIndex(key_rules) for key, key_rules in by_key.items()}
+        self.rule_count = len(rules)
+
+    def has_drug(self, drug_name=None, rxcui=None):
+        return (("name", normalize_drug_name(drug_name or "")) in self.indexes
+                or ("rxcui", rxcui) in self.indexes)
+
+    def _drug_index(self, drug_name, rxcui):
+        index = None
+        if rxcui:
+            index = self.indexes.get(("rxcui", rxcui))
+        if index is None and drug_name:
+            index = self.indexes.get(("name", normalize_drug_name(drug_name)))
+        return index
+
+    def is_age_dependent(self, drug_name=None, rxcui=None):
+        """
+        Whether the drug's rules differ by age, so a missing age changes the outcome.
+        """
+        index = self._drug_index(drug_name, rxcui)
+        return index is not None and index.age_dependent
+
+    def find(self, drug_name=None, rxcui=None, age=None, weight=None, route=None):
+        """
+        Returns the rules matching the drug, patient age, weight and route.
+        """
+        index = self._drug_index(drug_name, rxcui)
+        if index is None:
+            return []
+
+        age = ADULT_REFERENCE_AGE if age is None else age
+        route = route.lower() if route else None
+        return [
+            rule for rule in index.lookup(age)
+            if (route is None or rule.route is None or rule.route == route)
+            and (weight is None or rule.weight_min is None or rule.weight_min <= weight)
+            and (weight is None or rule.weight_max is None or weight < rule.weight_max)
+        ]
+
+
+class DosageRuleEngine:
+    """
+    Checks doses against the rules in a CSV or Arrow file and reloads them when the file changes.
+    The file's modification time is checked at most every reload_interval seconds;
+    a new index is built off to the side and swapped in, so checks never see a partial one.
+    Without an explicit path, the default file is looked up again on every check, so an
+    .arrow version prepared after startup replaces the .csv.
+    """
+
+    def __init__(self, path=None, reload_interval=1.0):
+        self.configured_path = path or os.getenv("DOSAGE_RULES_PATH")
+        self.path = self.configured_path or processed_path(DEFAULT_RULES_PATH)
+        self.reload_interval = reload_interval
+        self.index = DosageRuleIndex(DEFAULT_RULES)
+        self.loaded_mtime = None
+        self.next_check = 0.0
+        self.reload_lock = threading.Lock()
+        self.maybe_reload(force=True)
+
+    def maybe_reload(self, force=False):
+        now = time.monotonic()
+        if not force and now < self.next_check:
+            return
+        if not self.reload_lock.acquire(blocking=False):
+            return
+        try:
+            self.next_check = now + self.reload_interval
+            path = self.configured_path or processed_path(DEFAULT_RULES_PATH)
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                return
+            if path == self.path and mtime == self.loaded_mtime:
+                return
+            try:
+                rules = load_rules(path)
+            except (OSError, ValueError, csv.Error) as e:
+                # Keep serving the previous rules if the new file is broken or half-written
+                logger.error("Could not load dosage rules", extra={"path": path, "error": str(e)})
+                return
+            self.index = DosageRuleIndex(rules)
+            self.path, self.loaded_mtime = path, mtime
+            logger.info("Loaded dosage rules", extra={"rules": len(rules), "path": path})
+        finally:
+            self.reload_lock.release()
+
+    def has_drug(self, drug_name=None, rxcui=None):
+        self.maybe_reload()
+        return self.index.has_drug(drug_name, rxcui)
+
+    def check(self, drug_name, dose_mg, daily_mg=None, rxcui=None, age=None, weight=None, route=None):
+        """
+        Returns (is_safe, message), or None when no rule covers this drug and patient.
+        A dose_mg of None (only a daily total was given) is checked against the daily maximum only.
+        Without an age, adult rules are used and the message says so if the drug's rules depend on age.
+        """
+        self.maybe_reload()
+        index = self.index
+        rules = index.find(drug_name, rxcui, age, weight, route)
+        if not rules:
+            return None
+
+        note = ""
+        if age is None and index.is_age_dependent(drug_name, rxcui):
+            note = " The patient's age was not given, so an adult patient was assumed; the limits may differ for children."
+        for rule in rules:
+            if dose_mg is not None and rule.min_dose_mg is not None and dose_mg < rule.min_dose_mg:
+                return False, f"Dose of {dose_mg:g} mg is below the minimum of {rule.min_dose_mg:g} mg per dose. Consult a physician.{note}"
+            if dose_mg is not None and rule.max_dose_mg is not None and dose_mg > rule.max_dose_mg:
+                return False, f"Dose of {dose_mg:g} mg is above the maximum of {rule.max_dose_mg:g} mg per dose. Consult a physician.{note}"
+            if daily_mg is not None and rule.max_daily_mg is not None and daily_mg > rule.max_daily_mg:
+                return False, f"Daily total of {daily_mg:g} mg is above the maximum of {rule.max_daily_mg:g} mg per day. Consult a physician.{note}"
+        return True, f"Dosage appears to be within the typical range for this patient.{note}"
@@ -1,48 +1,300 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import hashlib
+import json
 import os
+import sys
+import threading
+import time
 import requests
 
-def download_file(url, folder, filename=None):
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.http_transport import get_transport
+
+# Datasets to download: {"datasets": [{"url": ..., "filename": ..., "checksum": "sha256:..."}]}
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datasets.json')
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Files at least this large are fetched as several byte ranges in parallel
+DEFAULT_SEGMENT_THRESHOLD = 64 * 1024 * 1024
+DEFAULT_SEGMENTS = 4
+# Attempts per stream or segment; each retry resumes from the bytes already on disk
+MAX_ATTEMPTS = 3
+
+# What a HEAD request tells us about a remote file; unknown values are None
+RemoteInfo = namedtuple("RemoteInfo", ["size", "etag", "last_modified", "accepts_ranges"])
+
+
+def load_manifest(path):
+    """
+    Reads the list of datasets from a JSON manifest.
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("datasets", [])
+
+
+def probe(transport, url):
+    """
+    Returns the RemoteInfo of url, or an all-unknown RemoteInfo if the server does not answer HEAD.
+    """
+    try:
+        response = transport.request("HEAD", url, allow_redirects=True)
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        return RemoteInfo(None, None, None, False)
+    size = response.headers.get("Content-Length")
+    return RemoteInfo(
+        size=int(size) if size and size.isdigit() else None,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        accepts_ranges=response.headers.get("Accept-Ranges", "").lower() == "bytes",
+    )
+
+
+def _if_range(info):
+    # A weak ETag cannot be used in If-Range
+    if info.etag and not info.etag.startswith("W/"):
+        return info.etag
+    return info.last_modified
+
+
+def _meta_path(filepath):
+    return f"{filepath}.meta.json"
+
+
+def is_unchanged(filepath, url, info, checksum=None):
+    """
+    True if filepath was downloaded from url and the server still reports the same ETag or
+    Last-Modified (and size), so the download can be skipped.
+    """
+    try:
+        with open(_meta_path(filepath), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not os.path.exists(filepath) or meta.get("url") != url:
+        return False
+    if checksum and meta.get("checksum") != checksum:
+        return False
+    if info.size is not None and os.path.getsize(filepath) != info.size:
+        return False
+    if info.etag:
+        return meta.get("etag") == info.etag
+    if info.last_modified:
+        return meta.get("last_modified") == info.last_modified
+    return False
+
+
+def verify_checksum(path, checksum, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Checks a file against 'algorithm:hexdigest' (e.g. 'sha256:ab12...'); a bare digest means sha256.
+    """
+    algorithm, _, expected = checksum.rpartition(":")
+    digest = hashlib.new(algorithm or "sha256")
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest() == expected.lower()
+
+
+def _download_stream(transport, url, part_path, info, chunk_size):
+    """
+    Downloads url into part_path over one connection, resuming from the bytes already in
+    part_path with a Range request when the server supports it.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if not info.accepts_ranges or (info.size is not None and offset > info.size):
+            offset = 0
+        if offset and offset == info.size:
+            return
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if _if_range(info):
+                headers["If-Range"] = _if_range(info)
+            print(f"Resuming {url} at byte {offset}...")
+        try:
+            with transport.get(url, headers=headers, stream=True) as response:
+                response.raise_for_status()  # Raise an exception for HTTP errors
+                if response.status_code != 206:
+                    # The server sent the whole file, e.g. because it changed since the partial download
+                    offset = 0
+                with open(part_path, "r+b" if offset else "wb") as f:
+                    f.seek(offset)
+                    f.truncate()
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+            return
+        except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            print(f"Connection lost while downloading {url} ({e}). Retrying...")
+
+
+def _download_segments(transport, url, part_path, info, chunk_size, segments):
+    """
+    Downloads url into part_path as several byte ranges fetched in parallel.
+    Progress per segment is kept in part_path + '.json' so an interrupted download
+    resumes each segment where it stopped.
+    """
+    state_path = f"{part_path}.json"
+    state = None
+    if os.path.exists(part_path) and os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if (state.get("size"), state.get("etag"), state.get("last_modified")) != (info.size, info.etag, info.last_modified):
+            # The remote file changed; the bytes on disk belong to another version
+            state = None
+    if state is None:
+        step = -(-info.size // segments)
+        state = {
+            "size": info.size, "etag": info.etag, "last_modified": info.last_modified,
+            # [first byte, last byte, bytes done]
+            "segments": [[start, min(start + step, info.size) - 1, 0] for start in range(0, info.size, step)],
+        }
+        with open(part_path, "wb") as f:
+            f.truncate(info.size)
+    else:
+        print(f"Resuming {url} from {sum(s[2] for s in state['segments'])} of {info.size} bytes...")
+
+    state_lock = threading.Lock()
+
+    def save_state():
+        with state_lock:
+            with open(f"{state_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(f"{state_path}.tmp", state_path)
+
+    def fetch(segment):
+        for attempt in range(MAX_ATTEMPTS):
+            position = segment[0] + segment[2]
+            if position > segment[1]:
+                return
+            headers = {"Range": f"bytes={position}-{segment[1]}"}
+            if _if_range(info):
+                headers["If-Range"] = _if_range(info)
+            last_save = time.monotonic()
+            try:
+                with transport.get(url, headers=headers, stream=True) as response:
+                    response.raise_for_status()  # Raise an exception for HTTP errors
+                    if response.status_code != 206:
+                        raise requests.exceptions.RequestException(f"Server ignored the Range request for {url}")
+                    with open(part_path, "r+b") as f:
+                        f.seek(position)
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            f.write(chunk)
+                            segment[2] += len(chunk)
+                            if time.monotonic() - last_save > 1.0:
+                                # Progress on disk must never claim bytes still in the write buffer
+                                f.flush()
+                                save_state()
+                                last_save = time.monotonic()
+                return
+            except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                print(f"Connection lost while downloading part of {url} ({e}). Retrying...")
+            finally:
+                save_state()
+
+    with ThreadPoolExecutor(max_workers=len(state["segments"]), thread_name_prefix="segment") as pool:
+        # list() re-raises the first segment failure
+        list(pool.map(fetch, state["segments"]))
+    os.remove(state_path)
+
+
+def download_file(url, folder, filename=None, transport=None, checksum=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                  segments=DEFAULT_SEGMENTS, segment_threshold=DEFAULT_SEGMENT_THRESHOLD, force=False):
     """
     Downloads a file from a given URL to a specified folder.
+    Skips files whose ETag/Last-Modified have not changed since the last download, resumes
+    interrupted downloads, fetches large files in parallel segments and verifies the checksum
+    if one is given. Returns the file path, or None if the download failed.
     """
-    if not os.path.exists(folder):
-        os.makedirs(folder)
+    transport = transport or get_transport()
+    os.makedirs(folder, exist_ok=True)
 
     if filename is None:
         filename = url.split('/')[-1]
 
     filepath = os.path.join(folder, filename)
+    info = probe(transport, url)
+    if not force and is_unchanged(filepath, url, info, checksum):
+        print(f"{filename} is unchanged since the last download. Skipping.")
+        return filepath
 
+    part_path = f"{filepath}.part"
     print(f"Downloading {url} to {filepath}...")
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        if segments > 1 and info.accepts_ranges and info.size and info.size >= segment_threshold:
+            _download_segments(transport, url, part_path, info, chunk_size, segments)
+        else:
+            _download_stream(transport, url, part_path, info, chunk_size)
+
+        if checksum and not verify_checksum(part_path, checksum):
+            os.remove(part_path)
+            print(f"Checksum mismatch for {filename}; the download was discarded.")
+            return None
+
+        os.replace(part_path, filepath)
+        with open(_meta_path(filepath), "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": info.etag, "last_modified": info.last_modified,
+                       "size": os.path.getsize(filepath), "checksum": checksum}, f)
         print(f"Successfully downloaded {filename}.")
-    except requests.exceptions.RequestException as e:
-        print(f"Error downloading {url}: {e}")
+        return filepath
+    except (requests.exceptions.RequestException, OSError) as e:
+        resume_hint = " Run again to resume." if os.path.exists(part_path) else ""
+        print(f"Error downloading {url}: {e}.{resume_hint}")
+        return None
+
+
+def download_all(datasets, folder, max_parallel_files=4, transport=None, **options):
+    """
+    Downloads the manifest entries concurrently, at most max_parallel_files at a time.
+    Returns {filename: path or None}.
+    """
+    transport = transport or get_transport()
+
+    def download(dataset):
+        filename = dataset.get("filename") or dataset["url"].split('/')[-1]
+        return filename, download_file(dataset["url"], folder, filename, transport=transport,
+                                       checksum=dataset.get("checksum"), **options)
+
+    with ThreadPoolExecutor(max_workers=max_parallel_files, thread_name_prefix="download") as pool:
+        return dict(pool.map(download, datasets))
+
 
 def main():
-    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+    parser = argparse.ArgumentParser(description="Download the datasets listed in the manifest.")
+    parser.add_argument("--manifest", default=os.getenv("DATASETS_MANIFEST") or DEFAULT_MANIFEST_PATH)
+    parser.add_argument("--max-parallel-files", type=int, default=int(os.getenv("DOWNLOAD_MAX_PARALLEL_FILES", "4")))
+    parser.add_argument("--segments", type=int, default=int(os.getenv("DOWNLOAD_SEGMENTS", str(DEFAULT_SEGMENTS))),
+                        help="Parallel byte ranges per large file")
+    parser.add_argument("--segment-threshold-mb", type=float, default=DEFAULT_SEGMENT_THRESHOLD / (1024 * 1024),
+                        help="Files at least this large are downloaded in segments")
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(DEFAULT_CHUNK_SIZE))))
+    parser.add_argument("--force", action="store_true", help="Download even if the remote files are unchanged")
+    args = parser.parse_args()
 
-    # Example datasets (replace with actual dataset URLs)
-    # You will need to find appropriate datasets for drug interactions, dosages, etc.
-    # For demonstration, I'm using placeholder URLs.
-    datasets = [
-        # {"url": "https://example.com/drug_interactions.csv", "filename": "drug_interactions.csv"},
-        # {"url": "https://example.com/drug_dosages.json", "filename": "drug_dosages.json"},
-        # {"url": "https://example.com/medication_alternatives.csv", "filename": "medication_alternatives.csv"},
-    ]
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
 
     print("\n--- Starting Dataset Download ---")
+    datasets = load_manifest(args.manifest)
     if not datasets:
-        print("No dataset URLs provided. Please update 'download_datasets.py' with actual dataset URLs.")
+        print(f"No dataset URLs provided. Please add the datasets to download to {args.manifest}.")
     else:
-        for dataset in datasets:
-            download_file(dataset["url"], data_dir, dataset.get("filename"))
+        results = download_all(
+            datasets, data_dir, max_parallel_files=args.max_parallel_files, chunk_size=args.chunk_size,
+            segments=args.segments, segment_threshold=int(args.segment_threshold_mb * 1024 * 1024), force=args.force,
+        )
+        failed = [filename for filename, path in results.items() if path is None]
+        if failed:
+            print(f"Failed to download: {', '.join(failed)}")
     print("--- Dataset Download Finished ---\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
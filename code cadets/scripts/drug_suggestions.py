@@ -1,69 +1,211 @@
 from api_clients.rxnorm_api import RxNormAPI
-import pandas as pd
+from scripts.alternatives_graph import AlternativesGraph
+from scripts.dosage_parser import parse_dosage
+from scripts.dosage_rules import DosageRuleEngine, normalize_drug_name
+from observability.log import get_logger
+from observability.tracing import span
+
+logger = get_logger(__name__)
 
 class DrugSuggester:
     def __init__(self):
         self.rxnorm_api = RxNormAPI()
+        # Dosage ranges from the processed dosage rules dataset, reloaded when the file changes
+        self.dosage_rules = DosageRuleEngine()
+        # Alternatives precomputed by scripts/alternatives_graph.py, with age contraindications.
+        # Without it, alternatives are looked up through RxNorm relations on every call.
+        self.alternatives_graph = AlternativesGraph.from_file()
+        if self.alternatives_graph is not None:
+            logger.info("Loaded the alternatives graph", extra={"concepts": len(self.alternatives_graph)})
         # In a real application, you might load age-specific drug data here
         # For now, we'll use a placeholder or rely on RxNorm's related concepts.
 
-    def suggest_alternatives(self, drug_name, patient_age=None):
+    def suggest_alternatives(self, drug_name, patient_age=None, match=None):
         """
         Suggests alternative safe drug options based on the given drug name and patient age.
         This is a simplified example. A real-world system would require extensive medical knowledge bases.
+        match is the NameMatch of drug_name when the caller has already looked it up, and then
+        reports a corrected typo itself. Otherwise, like verify_dosage, a misspelled name is not
+        taken to mean the closest known drug, and no alternatives are suggested for it.
         """
-        print(f"Suggesting alternatives for {drug_name} (Age: {patient_age})...")
-        rxcui = self.rxnorm_api.get_rxcui_by_name(drug_name)
-        alternatives = []
+        with span("suggest_alternatives"):
+            logger.debug("Suggesting alternatives", extra={"drug_name": drug_name, "patient_age": patient_age})
+            match = match or self._exact_match(drug_name, self.rxnorm_api.match_name(drug_name))
+            if not match:
+                return []
+            rxcui = match.rxcui
+            alternatives = self._graph_alternatives(drug_name, rxcui, patient_age)
+            if alternatives is not None:
+                return alternatives
 
-        if rxcui:
             # Get related concepts that might be alternatives (e.g., different forms, similar drugs)
             # The 'rela' parameter can be tuned for more specific relationships
             related_concepts_groups = self.rxnorm_api.get_related_concepts(rxcui, rela="has_precise_ingredient")
-            if related_concepts_groups:
-                for group in related_concepts_groups:
-                    if "concept" in group:
-                        for concept in group["concept"]:
-                            # Filter out the original drug itself
-                            if concept["name"].lower() != drug_name.lower():
-                                alternatives.append({
-                                    "name": concept["name"],
-                                    "rxcui": concept["rxcui"],
-                                    "type": group["conceptType"]
-                                })
-            
-            # Placeholder for age-based filtering/suggestions
-            if patient_age:
-                print(f"Applying age-based considerations for age {patient_age} (placeholder).")
-                # In a real system, this would involve checking contraindications or preferred drugs for age groups.
-                # For example, if drug is not suitable for children, filter it out if patient_age < 18.
+            return self._collect_alternatives(drug_name, related_concepts_groups, patient_age, rxcui)
+
+    async def suggest_alternatives_async(self, drug_name, patient_age=None, match=None):
+        """
+        Async version of suggest_alternatives using the non-blocking RxNorm lookups.
+        """
+        with span("suggest_alternatives"):
+            logger.debug("Suggesting alternatives", extra={"drug_name": drug_name, "patient_age": patient_age})
+            match = match or self._exact_match(drug_name, await self.rxnorm_api.match_name_async(drug_name))
+            if not match:
+                return []
+            rxcui = match.rxcui
+            alternatives = self._graph_alternatives(drug_name, rxcui, patient_age)
+            if alternatives is not None:
+                return alternatives
+
+            related_concepts_groups = await self.rxnorm_api.get_related_concepts_async(rxcui, rela="has_precise_ingredient")
+            return self._collect_alternatives(drug_name, related_concepts_groups, patient_age, rxcui)
+
+    def suggest_alternatives_many(self, drug_names, patient_age=None, matches=None):
+        """
+        Suggests alternatives for every drug of a prescription at once. All names are resolved
+        in parallel, then all related concepts, so a five-drug prescription waits for two rounds
+        of lookups instead of ten. Returns {drug_name: alternatives}. matches are the
+        {drug_name: NameMatch} of match_many when the caller has already looked them up (and
+        reports corrected typos); otherwise misspelled names get no alternatives.
+        """
+        with span("suggest_alternatives"):
+            logger.debug("Suggesting alternatives", extra={"drugs": len(drug_names), "patient_age": patient_age})
+            rxcuis = self._match_rxcuis(matches or self._exact_matches(self.rxnorm_api.match_many(drug_names)))
+            related = self.rxnorm_api.related_many(self._rxcuis_to_walk(rxcuis), rela="has_precise_ingredient")
+            return self._collect_many(rxcuis, related, patient_age)
+
+    async def suggest_alternatives_many_async(self, drug_names, patient_age=None, matches=None):
+        """
+        Async version of suggest_alternatives_many.
+        """
+        with span("suggest_alternatives"):
+            logger.debug("Suggesting alternatives", extra={"drugs": len(drug_names), "patient_age": patient_age})
+            rxcuis = self._match_rxcuis(matches or self._exact_matches(await self.rxnorm_api.match_many_async(drug_names)))
+            related = await self.rxnorm_api.related_many_async(self._rxcuis_to_walk(rxcuis), rela="has_precise_ingredient")
+            return self._collect_many(rxcuis, related, patient_age)
+
+    @staticmethod
+    def _exact_match(drug_name, match):
+        # A corrected name nobody reports back would give alternatives to a drug the patient
+        # may not take: look-alike names are different drugs
+        if match and match.distance:
+            logger.info("Not suggesting alternatives for a misspelled drug name",
+                        extra={"drug_name": drug_name, "closest_match": match.name})
+            return None
+        return match
+
+    def _exact_matches(self, matches):
+        return {drug_name: self._exact_match(drug_name, match) for drug_name, match in matches.items()}
+
+    @staticmethod
+    def _match_rxcuis(matches):
+        return {drug_name: match.rxcui if match else None for drug_name, match in matches.items()}
+
+    def _graph_alternatives(self, drug_name, rxcui, patient_age):
+        """
+        Alternatives from the precomputed graph, without those contraindicated at patient_age,
+        or None when no graph is loaded or it does not know the RxCUI.
+        """
+        if self.alternatives_graph is None:
+            return None
+        alternatives = self.alternatives_graph.alternatives(rxcui, patient_age)
+        if alternatives is None:
+            return None
+        return [alternative for alternative in alternatives
+                if normalize_drug_name(alternative["name"]) != normalize_drug_name(drug_name)]
 
+    def _rxcuis_to_walk(self, rxcuis):
+        """
+        The resolved RxCUIs whose alternatives have to be looked up through RxNorm relations.
+        """
+        graph = self.alternatives_graph
+        return [rxcui for rxcui in rxcuis.values() if rxcui and (graph is None or rxcui not in graph)]
+
+    def _collect_many(self, rxcuis, related, patient_age):
+        alternatives = {}
+        for drug_name, rxcui in rxcuis.items():
+            found = self._graph_alternatives(drug_name, rxcui, patient_age) if rxcui else []
+            if found is None:
+                found = self._collect_alternatives(drug_name, related.get(rxcui), patient_age, rxcui)
+            alternatives[drug_name] = found
         return alternatives
 
-    def verify_dosage(self, drug_name, dosage, patient_age=None):
+    def _collect_alternatives(self, drug_name, related_concepts_groups, patient_age=None, rxcui=None):
+        alternatives = []
+        if related_concepts_groups:
+            for group in related_concepts_groups:
+                if "concept" in group:
+                    for concept in group["concept"]:
+                        # Filter out the original drug itself, also when it was matched from a misspelled name
+                        if concept["rxcui"] != rxcui and normalize_drug_name(concept["name"]) != normalize_drug_name(drug_name):
+                            alternatives.append({
+                                "name": concept["name"],
+                                "rxcui": concept["rxcui"],
+                                "type": group["conceptType"]
+                            })
+
+        # Age-based filtering needs the contraindications of the alternatives graph
+        if patient_age and self.alternatives_graph is None:
+            logger.debug("No alternatives graph loaded, alternatives are not filtered for age", extra={"patient_age": patient_age})
+
+        return alternatives
+
+    def verify_dosage(self, drug_name, dosage, patient_age=None, patient_weight=None, route=None, rxcui=None):
         """
         Verifies if a given dosage is within a safe range for a drug and patient age.
-        This is a highly simplified placeholder and requires a comprehensive dosage database.
-        """
-        print(f"Verifying dosage for {drug_name} ({dosage}) for age {patient_age} (placeholder)...")
-        # In a real system, this would involve:
-        # 1. Looking up standard dosage ranges for the drug.
-        # 2. Adjusting ranges based on patient factors like age, weight, kidney function.
-        # 3. Comparing the given dosage to the safe range.
-        
-        # For demonstration, assume a generic safe range for 'Aspirin'
-        if "aspirin" in drug_name.lower():
-            if "mg" in dosage.lower():
-                try:
-                    value = float(dosage.lower().replace('mg', '').strip())
-                    if 50 <= value <= 1000: # Example safe range for adult aspirin dose
-                        return True, "Dosage appears to be within typical adult range."
-                    else:
-                        return False, "Dosage outside typical adult range. Consult a physician."
-                except ValueError:
-                    return False, "Could not parse dosage value."
-        
-        return True, "Dosage verification not implemented for this drug or general range assumed safe."
+        Ranges come from the dosage rule engine, matched by drug name or RxCUI,
+        patient age, weight (kg) and route. A misspelled drug name is not checked against the
+        drug it most likely means; the closest known name is suggested instead.
+        """
+        with span("verify_dosage"):
+            if rxcui is None and not self.dosage_rules.has_drug(drug_name):
+                match = self.rxnorm_api.match_name(drug_name)
+                if match and match.distance:
+                    return False, self._correction_message(drug_name, match)
+                rxcui = match.rxcui if match else None
+            return self._check_dosage(drug_name, dosage, patient_age, patient_weight, route, rxcui)
+
+    async def verify_dosage_async(self, drug_name, dosage, patient_age=None, patient_weight=None, route=None, rxcui=None):
+        """
+        Async version of verify_dosage; only differs in how an RxCUI is looked up when needed.
+        """
+        with span("verify_dosage"):
+            if rxcui is None and not self.dosage_rules.has_drug(drug_name):
+                match = await self.rxnorm_api.match_name_async(drug_name)
+                if match and match.distance:
+                    return False, self._correction_message(drug_name, match)
+                rxcui = match.rxcui if match else None
+            return self._check_dosage(drug_name, dosage, patient_age, patient_weight, route, rxcui)
+
+    @staticmethod
+    def _correction_message(drug_name, match):
+        # A dose is never checked against a drug the name was only guessed to mean:
+        # look-alike drug names have very different dosages
+        return (f"'{drug_name}' is not a known drug name; did you mean '{match.name}'? "
+                "Verify the dosage again with the corrected name.")
+
+    def _check_dosage(self, drug_name, dosage, patient_age, patient_weight, route, rxcui):
+        logger.debug("Verifying dosage", extra={"drug_name": drug_name, "dosage": dosage, "patient_age": patient_age})
+        if not self.dosage_rules.has_drug(drug_name, rxcui):
+            return True, "Dosage verification not implemented for this drug or general range assumed safe."
+
+        parsed = parse_dosage(dosage, patient_weight)
+        if parsed.per_kg and patient_weight is None:
+            return False, "The dose is per kg of body weight; the patient's weight is needed to verify it."
+        if parsed.dose is None and parsed.daily_dose is None:
+            return False, "Could not parse dosage value."
+        if parsed.dose_unit != "mg":
+            # Rules are in mg; a dose in IU, mEq or mL of unknown strength cannot be compared
+            return False, f"Could not convert a dose in {parsed.dose_unit} to mg. For liquids, include the strength, e.g. '5 mL of 250mg/5mL'."
+
+        result = self.dosage_rules.check(drug_name, parsed.dose, daily_mg=parsed.daily_dose, rxcui=rxcui,
+                                         age=patient_age, weight=patient_weight, route=route)
+        if result is None:
+            # The drug has rules but none for this patient: an uncovered age band is treated as
+            # contraindicated by the alternatives graph too, so it is never assumed safe
+            return False, ("No dosage range for this drug covers this patient's age, weight or route; "
+                           "the dosage cannot be verified. Consult a physician.")
+        return result
 
 if __name__ == "__main__":
     # Example Usage:
@@ -83,6 +225,10 @@ if __name__ == "__main__":
     else:
         print("No direct alternatives found or implemented.")
 
+    # Alternatives for a whole prescription, looked up in parallel
+    for drug_name, alternatives in suggester.suggest_alternatives_many(["Aspirin", "Ibuprofen", "Warfarin"], age).items():
+        print(f"{drug_name}: {len(alternatives)} alternatives")
+
     # Example 2: Verify dosage
     drug_to_verify = "Aspirin"
     dosage_to_verify = "500mg"
@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from nlp_models.ner_model import DEFAULT_ONNX_PATH
+
+def export_onnx(model_name, output_dir, api_key=None):
+    """
+    Exports the Hugging Face NER model and its tokenizer to ONNX in output_dir.
+    """
+    from optimum.onnxruntime import ORTModelForTokenClassification
+    from transformers import AutoTokenizer
+
+    print(f"Exporting {model_name} to ONNX...")
+    model = ORTModelForTokenClassification.from_pretrained(model_name, export=True, token=api_key)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(model_name, token=api_key).save_pretrained(output_dir)
+    print(f"ONNX model saved to {os.path.join(output_dir, 'model.onnx')}")
+
+def quantize_onnx(output_dir, arch="avx2"):
+    """
+    Writes a dynamically int8-quantized copy of the exported model as model_quantized.onnx.
+    """
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    configs = {
+        "avx2": AutoQuantizationConfig.avx2,
+        "avx512": AutoQuantizationConfig.avx512,
+        "avx512_vnni": AutoQuantizationConfig.avx512_vnni,
+        "arm64": AutoQuantizationConfig.arm64,
+    }
+    print(f"Quantizing ONNX model to int8 ({arch})...")
+    quantizer = ORTQuantizer.from_pretrained(output_dir, file_name="model.onnx")
+    quantizer.quantize(save_dir=output_dir, quantization_config=configs[arch](is_static=False, per_channel=False))
+    print(f"Quantized model saved to {os.path.join(output_dir, 'model_quantized.onnx')}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the NER model to ONNX Runtime, optionally int8-quantized.")
+    parser.add_argument("--model-name", default="samant/medical-ner")
+    parser.add_argument("--output-dir", default=os.getenv("NER_ONNX_PATH") or DEFAULT_ONNX_PATH)
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8 dynamically quantized model")
+    parser.add_argument("--arch", default="avx2", choices=["avx2", "avx512", "avx512_vnni", "arm64"],
+                        help="CPU instruction set to quantize for")
+    args = parser.parse_args()
+
+    load_dotenv()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    print("\n--- Starting NER Model Export ---")
+    export_onnx(args.model_name, args.output_dir, os.getenv("HUGGING_FACE_API_KEY"))
+    if args.quantize:
+        quantize_onnx(args.output_dir, args.arch)
+    print("--- NER Model Export Finished ---\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from itertools import combinations
+import csv
+import os
+import re
+import sys
+import numpy as np
+
+# Add the project root to the Python path so the example below can run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.rxnorm_store import RxNormStore
+from scripts.columnar_store import processed_path, read_table
+from scripts.dosage_rules import normalize_drug_name
+
+# Default location of the interaction table written by prepare_datasets.py
+# (processed_drug_interactions.arrow is used instead when it exists)
+DEFAULT_INTERACTIONS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'processed', 'processed_drug_interactions.csv'
+)
+
+# One known interaction between two drugs. drug_a and drug_b are normalized ingredient names
+# (brand names resolved through the RxNorm store when it is available) with drug_a <= drug_b.
+Interaction = namedtuple("Interaction", ["drug_a", "drug_b", "severity", "description"])
+
+# Column names accepted for the two drugs of a pair in a raw interactions dataset
+DRUG_COLUMN_PAIRS = [
+    ("drug_a", "drug_b"), ("drug_1", "drug_2"), ("drug1", "drug2"), ("drug_name_1", "drug_name_2"),
+]
+
+
+def pair_key(drug_1, drug_2):
+    """
+    Canonical key of an unordered drug pair: both names normalized, in sorted order.
+    """
+    return tuple(sorted((normalize_drug_name(drug_1), normalize_drug_name(drug_2))))
+
+
+class IngredientResolver:
+    """
+    Maps a drug name to the ingredient names the interaction table is keyed by, so a brand
+    ('Advil') finds the interactions of its ingredient ('ibuprofen'). Names are resolved
+    through the local RxNorm store; without one, or for names it does not know, a name
+    stands for itself. Results are cached, since prescriptions repeat a small set of names.
+    """
+
+    def __init__(self, store=None, max_cached=10000):
+        self.store = store
+        self.max_cached = max_cached
+        self.cache = {}
+
+    @classmethod
+    def from_store(cls, db_path=None):
+        """
+        A resolver over the local RxNorm store, or one that only normalizes names when
+        the store has not been built.
+        """
+        try:
+            return cls(RxNormStore(db_path))
+        except FileNotFoundError:
+            return cls()
+
+    def _ingredients(self, name):
+        # () for a name the store does not know
+        names = self.cache.get(name)
+        if names is None:
+            rxcui = self.store.get_rxcui_by_name(name) if self.store and name else None
+            names = tuple(self.store.get_ingredient_names(rxcui)) if rxcui else ()
+            if len(self.cache) >= self.max_cached:
+                self.cache.clear()
+            self.cache[name] = names
+        return names
+
+    def resolve(self, drug_name):
+        """
+        Returns the ingredient names (a tuple, usually of one) that drug_name stands for.
+        """
+        name = normalize_drug_name(drug_name)
+        return self._ingredients(name) or (name,)
+
+    def drugs_in_text(self, text, max_words=3):
+        """
+        Returns the sorted ingredient names of the drugs named in a free text, looking up every
+        run of up to max_words words. None without a store, since drugs cannot then be told
+        apart from other words.
+        """
+        if self.store is None:
+            return None
+        words = re.findall(r"[a-z0-9]+(?:[-'][a-z0-9]+)*", text.lower())
+        found = set()
+        for i in range(len(words)):
+            for n in range(1, min(max_words, len(words) - i) + 1):
+                found.update(self._ingredients(" ".join(words[i:i + n])))
+        return tuple(sorted(found))
+
+
+_default_resolver = None
+
+
+def default_resolver():
+    """
+    The resolver over the default RxNorm store, opened once per process.
+    """
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = IngredientResolver.from_store()
+    return _default_resolver
+
+
+def candidate_pairs(drug_names, known, resolver=None):
+    """
+    The canonical pairs to look up for the drugs of a prescription: every pair of names from
+    two different drugs, where a drug is known by its normalized name and its ingredients.
+    Only names in known (the drugs of the table) are paired.
+    """
+    groups = []
+    for drug_name in drug_names:
+        names = {normalize_drug_name(drug_name)}
+        if resolver is not None:
+            names.update(resolver.resolve(drug_name))
+        names &= known
+        if names:
+            groups.append(names)
+    pairs = set()
+    for first, second in combinations(groups, 2):
+        pairs.update(tuple(sorted((a, b))) for a in first for b in second if a != b)
+    return sorted(pairs)
+
+
+def build_interaction_table(df, resolver=None):
+    """
+    Turns a raw interactions DataFrame into the processed table read by InteractionIndex:
+    one row per canonical pair (drug_a, drug_b, severity, description), duplicates and
+    self-pairs removed. Drug names are replaced by their ingredients (see IngredientResolver;
+    the default RxNorm store is used unless a resolver is given). Used by prepare_datasets.py.
+    """
+    columns = next((pair for pair in DRUG_COLUMN_PAIRS if set(pair) <= set(df.columns)), None)
+    if columns is None:
+        raise ValueError(f"Interactions dataset needs one of the column pairs {DRUG_COLUMN_PAIRS}")
+
+    resolver = resolver or default_resolver()
+    df = df.dropna(subset=list(columns))
+    # A brand with several ingredients gives one pair per ingredient
+    names = {name: list(resolver.resolve(name)) for name in set(df[columns[0]].astype(str)) | set(df[columns[1]].astype(str))}
+    df = df.assign(_first=df[columns[0]].astype(str).map(names), _second=df[columns[1]].astype(str).map(names))
+    df = df.explode("_first").explode("_second")
+    first, second = df["_first"], df["_second"]
+    table = df.assign(
+        drug_a=first.where(first <= second, second),
+        drug_b=second.where(first <= second, first),
+        severity=df["severity"] if "severity" in df.columns else "",
+        description=df["description"] if "description" in df.columns else "",
+    )[list(Interaction._fields)]
+    table = table[table["drug_a"] != table["drug_b"]]
+    return table.drop_duplicates(subset=["drug_a", "drug_b"])
+
+
+def _optional_text(value):
+    return (value or "").strip() or None
+
+
+def load_interactions(path):
+    """
+    Reads interactions from a CSV file with one column per Interaction field.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            Interaction(*pair_key(row["drug_a"], row["drug_b"]), _optional_text(row.get("severity")),
+                        _optional_text(row.get("description")))
+            for row in csv.DictReader(f)
+        ]
+
+
+class InteractionIndex:
+    """
+    In-memory hash of known interactions keyed by canonical drug pair.
+    Checking every pair of the drugs in a prescription is a handful of dict lookups.
+    """
+
+    def __init__(self, interactions, resolver=None):
+        self.pairs = {(interaction.drug_a, interaction.drug_b): interaction for interaction in interactions}
+        self.drugs = {name for pair in self.pairs for name in pair}
+        self.resolver = resolver
+
+    def __len__(self):
+        return len(self.pairs)
+
+    @classmethod
+    def from_file(cls, path=None, resolver=None):
+        """
+        Loads the processed interaction table, or returns None when it has not been prepared
+        or has no rows (then there is nothing to check against, and Granite analyzes the text).
+        An Arrow table is memory-mapped (see MappedInteractionIndex) instead of read into memory.
+        Drug names are resolved to ingredients with resolver, by default over the RxNorm store.
+        """
+        path = path or os.getenv("INTERACTIONS_PATH") or processed_path(DEFAULT_INTERACTIONS_PATH)
+        if not os.path.exists(path):
+            return None
+        resolver = resolver or default_resolver()
+        if path.endswith(".arrow"):
+            table = read_table(path)
+            # ArrowChunkWriter writes a file without columns when no rows survived cleaning
+            if table.num_rows == 0:
+                return None
+            return MappedInteractionIndex(table, resolver)
+        interactions = load_interactions(path)
+        return cls(interactions, resolver) if interactions else None
+
+    def lookup(self, drug_1, drug_2):
+        found = self.find_interactions([drug_1, drug_2])
+        return found[0] if found else None
+
+    def find_interactions(self, drug_names):
+        """
+        Returns the known interactions among all pairs of the given drugs.
+        """
+        pairs = candidate_pairs(drug_names, self.drugs, self.resolver)
+        return [self.pairs[pair] for pair in pairs if pair in self.pairs]
+
+
+class MappedInteractionIndex:
+    """
+    Same lookups as InteractionIndex, served from a memory-mapped Arrow table written by
+    prepare_datasets.py. Its rows are sorted by (drug_a, drug_b) and both drug columns are
+    dictionary-encoded with sorted dictionaries, so a pair is found with a binary search
+    over the mapped drug_b codes of drug_a's rows, in each record batch they span. Only the
+    drug name dictionaries and one offset per drug and per batch live in this process; the
+    rows stay in the page cache, shared by every worker that maps the same file.
+    """
+
+    def __init__(self, table, resolver=None):
+        self.table = table
+        self.resolver = resolver
+        # Every batch of a column shares the dictionary written by ArrowChunkWriter
+        drug_a = table.column("drug_a").chunks
+        drug_b = table.column("drug_b").chunks
+        self.codes_a = {name: code for code, name in enumerate(drug_a[0].dictionary.to_pylist())}
+        self.codes_b = {name: code for code, name in enumerate(drug_b[0].dictionary.to_pylist())}
+        # Rows of drug_a code c are group_starts[c]:group_starts[c + 1]; one int per drug
+        counts = sum(np.bincount(chunk.indices.to_numpy(), minlength=len(self.codes_a)) for chunk in drug_a)
+        self.group_starts = [0] + np.cumsum(counts).tolist()
+        # First row of each batch, and one past the last
+        self.batch_starts = [0] + np.cumsum([len(chunk) for chunk in drug_b]).tolist()
+        # bisect over a memoryview reads the mapped codes without numpy's per-call overhead
+        self.rows_b = [memoryview(chunk.indices.to_numpy()) for chunk in drug_b]
+        self.severity = table.column("severity").chunks
+        self.description = table.column("description").chunks
+        self.drugs = set(self.codes_a) | set(self.codes_b)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def _find(self, drug_a, drug_b):
+        code_a, code_b = self.codes_a.get(drug_a), self.codes_b.get(drug_b)
+        if code_a is None or code_b is None:
+            return None
+        start, end = self.group_starts[code_a], self.group_starts[code_a + 1]
+        batch = bisect_right(self.batch_starts, start) - 1
+        while start < end:
+            batch_start, batch_end = self.batch_starts[batch], self.batch_starts[batch + 1]
+            hi = min(end, batch_end) - batch_start
+            row = bisect_left(self.rows_b[batch], code_b, start - batch_start, hi)
+            if row < hi:
+                if self.rows_b[batch][row] != code_b:
+                    return None
+                return Interaction(drug_a, drug_b, _optional_text(self.severity[batch][row].as_py()),
+                                   _optional_text(self.description[batch][row].as_py()))
+            start, batch = batch_end, batch + 1
+        return None
+
+    def lookup(self, drug_1, drug_2):
+        found = self.find_interactions([drug_1, drug_2])
+        return found[0] if found else None
+
+    def find_interactions(self, drug_names):
+        """
+        Returns the known interactions among all pairs of the given drugs.
+        """
+        found = (self._find(drug_a, drug_b) for drug_a, drug_b in candidate_pairs(drug_names, self.drugs, self.resolver))
+        return [interaction for interaction in found if interaction]
+
+if __name__ == "__main__":
+    index = InteractionIndex([
+        Interaction(*pair_key("Warfarin", "Ibuprofen"), "major", "Increased risk of bleeding."),
+    ])
+    print(index.find_interactions(["ibuprofen", "Lipitor", "WARFARIN"]))
@@ -0,0 +1,236 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api_clients.rxnorm_store import DEFAULT_DB_PATH, INDEXES, SCHEMA, SYNONYM_TTYS, normalize_name
+
+# Column positions in the RxNorm RRF release files (see the RxNorm technical documentation)
+RXNCONSO_RXCUI, RXNCONSO_SAB, RXNCONSO_TTY, RXNCONSO_STR, RXNCONSO_SUPPRESS = 0, 11, 12, 14, 16
+RXNREL_RXCUI1, RXNREL_RXCUI2, RXNREL_RELA, RXNREL_SAB = 0, 4, 7, 10
+RXNSAT_RXCUI, RXNSAT_ATN, RXNSAT_SAB, RXNSAT_ATV = 0, 8, 9, 10
+RXNCUI_CUI1, RXNCUI_CUI2 = 0, 4
+
+BATCH_SIZE = 10000
+
+
+def read_rrf(filepath):
+    """
+    Yields the fields of each row in a pipe-delimited RRF file.
+    """
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            # Every RRF row ends with a trailing '|'
+            yield line.rstrip("\n").split("|")[:-1]
+
+
+def insert_batches(conn, sql, rows):
+    """
+    Inserts rows with executemany in fixed-size batches to bound memory.
+    """
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def load_concepts(conn, rrf_dir):
+    """
+    Loads RxNorm-sourced atoms from RXNCONSO.RRF into the concepts and names tables.
+    """
+    canonical = {}
+
+    def name_rows():
+        for fields in read_rrf(os.path.join(rrf_dir, "RXNCONSO.RRF")):
+            if fields[RXNCONSO_SAB] != "RXNORM" or fields[RXNCONSO_SUPPRESS] not in ("", "N"):
+                continue
+            rxcui, tty, name = fields[RXNCONSO_RXCUI], fields[RXNCONSO_TTY], fields[RXNCONSO_STR]
+            if tty not in SYNONYM_TTYS or rxcui not in canonical:
+                canonical[rxcui] = (name, tty)
+            yield (normalize_name(name), rxcui, tty)
+
+    names = insert_batches(conn, "INSERT INTO names VALUES (?, ?, ?)", name_rows())
+    concepts = insert_batches(
+        conn,
+        "INSERT OR REPLACE INTO concepts VALUES (?, ?, ?)",
+        ((rxcui, name, tty) for rxcui, (name, tty) in canonical.items()),
+    )
+    return concepts, names
+
+
+def load_relations(conn, rrf_dir, upsert=False):
+    """
+    Loads RxNorm relationships from RXNREL.RRF.
+    A row 'RXCUI1 | RELA | RXCUI2' reads as 'RXCUI2 RELA RXCUI1', so it is stored
+    keyed by RXCUI2 to match what the RxNav 'related' endpoint returns.
+    With upsert=True, relations already in the store are not inserted again.
+    """
+    def relation_rows():
+        for fields in read_rrf(os.path.join(rrf_dir, "RXNREL.RRF")):
+            if fields[RXNREL_SAB] != "RXNORM" or not fields[RXNREL_RELA]:
+                continue
+            if not fields[RXNREL_RXCUI1] or not fields[RXNREL_RXCUI2]:
+                continue
+            yield (fields[RXNREL_RXCUI2], fields[RXNREL_RELA], fields[RXNREL_RXCUI1])
+
+    if upsert:
+        sql = ("INSERT INTO relations SELECT ?1, ?2, ?3 WHERE NOT EXISTS "
+               "(SELECT 1 FROM relations WHERE rxcui = ?1 AND rela = ?2 AND related_rxcui = ?3)")
+    else:
+        sql = "INSERT INTO relations VALUES (?, ?, ?)"
+    return insert_batches(conn, sql, relation_rows())
+
+
+def load_properties(conn, rrf_dir):
+    """
+    Loads RxNorm attributes from RXNSAT.RRF, if present.
+    """
+    filepath = os.path.join(rrf_dir, "RXNSAT.RRF")
+    if not os.path.exists(filepath):
+        print("RXNSAT.RRF not found, skipping drug properties.")
+        return 0
+
+    def property_rows():
+        for fields in read_rrf(filepath):
+            if fields[RXNSAT_SAB] != "RXNORM":
+                continue
+            yield (fields[RXNSAT_RXCUI], fields[RXNSAT_ATN], fields[RXNSAT_ATV])
+
+    return insert_batches(conn, "INSERT INTO properties VALUES (?, ?, ?)", property_rows())
+
+
+def build_store(rrf_dir, db_path):
+    """
+    Builds the local RxNorm store from the RRF files in rrf_dir.
+    The store is written to a temporary file and moved into place when complete,
+    so readers never see a half-built database.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+
+        concepts, names = load_concepts(conn, rrf_dir)
+        print(f"Loaded {concepts} concepts and {names} names.")
+        relations = load_relations(conn, rrf_dir)
+        print(f"Loaded {relations} relations.")
+        properties = load_properties(conn, rrf_dir)
+        print(f"Loaded {properties} properties.")
+
+        conn.executescript(INDEXES)
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    print(f"RxNorm local store written to {db_path}")
+
+
+def delta_rxcuis(rrf_dir):
+    """
+    Returns (changed, retired) RxCUIs of an update release: the concepts whose RxNorm atoms
+    or attributes it carries, and the concepts RXNCUI.RRF retires in favour of another one.
+    """
+    changed = set()
+    for filename, rxcui_column, sab_column in [("RXNCONSO.RRF", RXNCONSO_RXCUI, RXNCONSO_SAB),
+                                               ("RXNSAT.RRF", RXNSAT_RXCUI, RXNSAT_SAB)]:
+        filepath = os.path.join(rrf_dir, filename)
+        if os.path.exists(filepath):
+            changed.update(fields[rxcui_column] for fields in read_rrf(filepath) if fields[sab_column] == "RXNORM")
+
+    retired = set()
+    filepath = os.path.join(rrf_dir, "RXNCUI.RRF")
+    if os.path.exists(filepath):
+        retired = {fields[RXNCUI_CUI1] for fields in read_rrf(filepath) if fields[RXNCUI_CUI1] != fields[RXNCUI_CUI2]}
+    return changed, retired - changed
+
+
+def apply_delta(rrf_dir, db_path):
+    """
+    Applies an RxNorm update release on top of an existing store instead of rebuilding it.
+    An update release holds every atom, relationship and attribute of the concepts that
+    changed, so each changed concept's rows are replaced by the release's, and retired
+    concepts are removed. The update is made on a copy that replaces the store when
+    complete, so readers never see a half-updated database.
+    """
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    changed, retired = delta_rxcuis(rrf_dir)
+    source = sqlite3.connect(db_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        source.backup(conn)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("CREATE TEMP TABLE affected (rxcui TEXT PRIMARY KEY)")
+        insert_batches(conn, "INSERT INTO affected VALUES (?)", ((rxcui,) for rxcui in changed | retired))
+
+        affected = "SELECT rxcui FROM affected"
+        conn.execute(f"DELETE FROM names WHERE rxcui IN ({affected})")
+        conn.execute(f"DELETE FROM concepts WHERE rxcui IN ({affected})")
+        conn.execute(f"DELETE FROM properties WHERE rxcui IN ({affected})")
+        conn.execute(f"DELETE FROM relations WHERE rxcui IN ({affected}) OR related_rxcui IN ({affected})")
+        print(f"Replacing {len(changed)} changed concepts and removing {len(retired)} retired ones.")
+
+        if os.path.exists(os.path.join(rrf_dir, "RXNCONSO.RRF")):
+            concepts, names = load_concepts(conn, rrf_dir)
+            print(f"Loaded {concepts} concepts and {names} names.")
+        if os.path.exists(os.path.join(rrf_dir, "RXNREL.RRF")):
+            relations = load_relations(conn, rrf_dir, upsert=True)
+            print(f"Loaded {relations} relations.")
+        properties = load_properties(conn, rrf_dir)
+        print(f"Loaded {properties} properties.")
+        conn.commit()
+    finally:
+        source.close()
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    print(f"RxNorm local store at {db_path} updated")
+
+
+def main():
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+    parser = argparse.ArgumentParser(description="Build the local RxNorm store from RRF release files.")
+    parser.add_argument("--rrf-dir", default=os.path.join(data_dir, "rxnorm", "rrf"),
+                        help="Directory containing RXNCONSO.RRF, RXNREL.RRF and RXNSAT.RRF")
+    parser.add_argument("--db-path", default=os.getenv("RXNORM_LOCAL_DB") or DEFAULT_DB_PATH,
+                        help="Where to write the SQLite store")
+    parser.add_argument("--delta", metavar="RRF_DIR",
+                        help="Apply the RRF files of an RxNorm update release in RRF_DIR to the existing store instead of rebuilding it")
+    args = parser.parse_args()
+
+    print("\n--- Starting RxNorm Local Store Build ---")
+    if args.delta:
+        if not os.path.exists(args.db_path):
+            print(f"No RxNorm local store at {args.db_path} to update. Build it from a full release first.")
+        else:
+            apply_delta(args.delta, args.db_path)
+    elif not os.path.exists(os.path.join(args.rrf_dir, "RXNCONSO.RRF")):
+        print(f"RXNCONSO.RRF not found in {args.rrf_dir}. Please download and extract an RxNorm release first.")
+    else:
+        build_store(args.rrf_dir, args.db_path)
+    print("--- RxNorm Local Store Build Finished ---\n")
+
+if __name__ == "__main__":
+    main()
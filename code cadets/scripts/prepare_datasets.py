@@ -1,36 +1,168 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import inspect
+import json
+import numpy as np
 import pandas as pd
 import os
+import pickle
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import columnar_store, dosage_parser
+from scripts.columnar_store import ArrowChunkWriter, arrow_available
+from scripts.dosage_parser import parse_dosage_series
+from scripts.dosage_rules import normalize_drug_name
+from scripts.interaction_index import build_interaction_table
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB, or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Rows per chunk; datasets are streamed through the pipeline one chunk at a time
+DEFAULT_CHUNKSIZE = 100000
+
+# Free-text dose columns that get parsed into canonical per-dose and per-day amounts
+DOSAGE_COLUMNS = ["dosage", "dose"]
+
+# Explicit column types per dataset. Columns not listed are read as text, so a
+# column's type cannot change from one chunk to the next.
+DATASET_DTYPES = {
+    "dosage_rules.csv": {
+        "age_min": "float64", "age_max": "float64", "weight_min": "float64", "weight_max": "float64",
+        "min_dose_mg": "float64", "max_dose_mg": "float64", "max_daily_mg": "float64",
+    },
+}
+
+# Columns a row must have to be kept. Datasets not listed need every column; an empty
+# list only drops rows that are entirely empty (e.g. where empty cells mean "unbounded").
+DATASET_REQUIRED_COLUMNS = {
+    "dosage_rules.csv": [],
+    "drug_interactions.csv": [],
+}
+
+# Datasets that are reshaped into a lookup table after the generic cleaning steps,
+# with the columns that identify a row of that table. Arrow output is sorted by those
+# columns and keeps them dictionary-encoded, so readers can binary-search the mapped file.
+DATASET_BUILDERS = {
+    "drug_interactions.csv": (build_interaction_table, ["drug_a", "drug_b"]),  # read by scripts/interaction_index.py
+}
+
+STAGES = ["load", "clean", "dedup", "transform", "write"]
+
+# Incremental builds keep each dataset's build state and cleaned checkpoint here, under the processed folder
+BUILD_STATE_DIR = ".build"
+
+# Processed files are written as memory-mappable Arrow IPC when pyarrow is installed
+OUTPUT_FORMATS = ["arrow", "csv"]
+DEFAULT_OUTPUT_FORMAT = "arrow" if arrow_available() else "csv"
+
+
+def iter_dataset_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE, dtypes=None):
+    """
+    Yields a dataset as DataFrames of at most chunksize rows (the whole file if chunksize is 0).
+    CSV and JSON lines (.jsonl/.ndjson) files are streamed; a plain JSON document is loaded whole.
+    """
+    chunksize = chunksize or None
+    if filepath.endswith('.csv'):
+        reader = pd.read_csv(filepath, chunksize=chunksize, dtype=defaultdict(lambda: str, dtypes or {}))
+    elif filepath.endswith(('.jsonl', '.ndjson')):
+        reader = pd.read_json(filepath, lines=True, chunksize=chunksize, dtype=dtypes or True)
+    elif filepath.endswith('.json'):
+        reader = pd.read_json(filepath, dtype=dtypes or True)
+    else:
+        raise ValueError(f"Unsupported file format: {filepath}")
+
+    if isinstance(reader, pd.DataFrame):
+        yield reader
+        return
+    with reader:
+        yield from reader
+
 
 def load_dataset(filepath):
     """
-    Loads a dataset from the given filepath.
+    Loads a whole dataset from the given filepath.
     Supports CSV and JSON for now.
     """
     if not os.path.exists(filepath):
         print(f"Error: File not found at {filepath}")
         return None
 
-    if filepath.endswith('.csv'):
-        return pd.read_csv(filepath)
-    elif filepath.endswith('.json'):
-        return pd.read_json(filepath)
-    else:
-        print(f"Unsupported file format: {filepath}")
+    try:
+        return next(iter_dataset_chunks(filepath, chunksize=0))
+    except ValueError as e:
+        print(e)
         return None
 
-def clean_data(df):
+
+class HashDeduplicator:
+    """
+    Drops rows seen before, in this chunk or any earlier one, by their 64-bit row hash.
+    Only the hashes are kept (8 bytes per distinct row) as a few sorted arrays of
+    decreasing size; a new chunk's hashes form a new array, and arrays of similar
+    size are merged, so lookups stay a handful of binary searches per row.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = columns
+        self.levels = []
+
+    def _seen(self, hashes):
+        found = np.zeros(len(hashes), dtype=bool)
+        for level in self.levels:
+            positions = np.searchsorted(level, hashes)
+            in_range = positions < len(level)
+            found[in_range] |= level[positions[in_range]] == hashes[in_range]
+        return found
+
+    def _add(self, hashes):
+        self.levels.append(hashes)
+        while len(self.levels) > 1 and len(self.levels[-2]) <= 2 * len(self.levels[-1]):
+            newest = self.levels.pop()
+            self.levels[-1] = np.union1d(self.levels[-1], newest)
+
+    def filter(self, df):
+        if df.empty:
+            return df
+        rows = df[self.columns] if self.columns else df
+        hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+        unique, first = np.unique(hashes, return_index=True)
+        new = ~self._seen(unique)
+        self._add(unique[new])
+        return df.take(np.sort(first[new]))
+
+
+def clean_data(df, required_columns=None):
     """
-    Placeholder for data cleaning operations.
-    e.g., handling missing values, removing duplicates, correcting data types.
+    Drops rows with missing values in required_columns (all columns when None).
+    Duplicate rows are removed across chunks by HashDeduplicator.
     """
     if df is None:
         return None
-    print("Cleaning data...")
-    # Example: Drop rows with any missing values
-    df = df.dropna()
-    # Example: Remove duplicates
-    df = df.drop_duplicates()
-    return df
+    if required_columns is None:
+        return df.dropna()
+    if required_columns:
+        return df.dropna(subset=required_columns)
+    return df.dropna(how="all")
+
 
 def transform_data(df):
     """
@@ -39,12 +171,271 @@ def transform_data(df):
     """
     if df is None:
         return None
-    print("Transforming data...")
     # Example: Convert all column names to lowercase
     df.columns = df.columns.str.lower()
+    for column in DOSAGE_COLUMNS:
+        if column in df.columns:
+            parsed = parse_dosage_series(df[column])
+            df[f"{column}_amount"] = parsed["dose"]
+            df[f"{column}_unit"] = parsed["dose_unit"]
+            df[f"{column}_per_day"] = parsed["daily_dose"]
+            df[f"{column}_frequency_per_day"] = parsed["frequency_per_day"]
+            df[f"{column}_duration_days"] = parsed["duration_days"]
     return df
 
+
+class CSVChunkWriter:
+    """
+    Appends chunks to a temporary file that replaces the output only once every chunk is written.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.tmp_path = f"{output_path}.tmp"
+        self.columns = None
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            df.to_csv(self.tmp_path, index=False)
+        else:
+            df.to_csv(self.tmp_path, index=False, header=False, mode="a", columns=self.columns)
+        return df
+
+    def close(self):
+        if self.columns is None:
+            # Nothing survived cleaning; still produce an (empty) output file
+            open(self.tmp_path, "w").close()
+        os.replace(self.tmp_path, self.output_path)
+
+
+class CheckpointWriter:
+    """
+    Pickles chunks one after another, with their exact dtypes, into a temporary file that
+    replaces the checkpoint once every chunk is written. Read back with iter_checkpoint.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, "wb")
+
+    def write(self, df):
+        pickle.dump(df, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        return df
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def iter_checkpoint(path):
+    """
+    Yields the chunks of a checkpoint written by CheckpointWriter (a local build artifact, never downloaded data).
+    """
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def input_fingerprint(path, previous=None):
+    """
+    Fingerprints an input file by size, mtime and sha256. The file is only hashed again when
+    its size or mtime differ from the previous fingerprint, so unchanged inputs cost one stat.
+    """
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous and all(previous.get(key) == value for key, value in fingerprint.items()):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = file_digest(path)
+    return fingerprint
+
+
+def stage_fingerprint(code, params):
+    """
+    Hashes the source of the functions, classes and modules a stage runs, with its parameters,
+    so editing a stage or changing its settings invalidates only that stage's cached output.
+    """
+    digest = hashlib.sha256()
+    for obj in code:
+        digest.update(inspect.getsource(obj).encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _stage_fingerprints(dataset_name, output_format):
+    builder, builder_keys = DATASET_BUILDERS.get(dataset_name, (None, None))
+    clean = stage_fingerprint(
+        [iter_dataset_chunks, clean_data, HashDeduplicator],
+        {"dtypes": DATASET_DTYPES.get(dataset_name), "required_columns": DATASET_REQUIRED_COLUMNS.get(dataset_name),
+         "pandas": pd.__version__},
+    )
+    transform = stage_fingerprint(
+        [transform_data, dosage_parser, CSVChunkWriter, columnar_store]
+        + ([builder, normalize_drug_name] if builder else []),
+        {"dosage_columns": DOSAGE_COLUMNS, "builder_keys": builder_keys, "format": output_format,
+         "pandas": pd.__version__},
+    )
+    return {"clean": clean, "transform": transform}
+
+
+def _load_build_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_build_state(path, state):
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def prepare_dataset(dataset_name, data_dir, processed_dir, chunksize=DEFAULT_CHUNKSIZE, output_format=DEFAULT_OUTPUT_FORMAT,
+                    incremental=False):
+    """
+    Streams one dataset through load -> clean -> dedup -> transform -> write in bounded-memory
+    chunks. Returns a report with rows and seconds per stage and the peak RSS of this process.
+
+    With incremental=True the cleaned, deduplicated rows are kept as a checkpoint next to
+    fingerprints of the input and of each stage's code and settings. A dataset whose input and
+    stages are unchanged is skipped, and one whose transform stage alone changed is rebuilt
+    from the checkpoint without loading, cleaning or deduplicating it again.
+    """
+    filepath = os.path.join(data_dir, dataset_name)
+    builder, builder_keys = DATASET_BUILDERS.get(dataset_name, (None, None))
+    required_columns = DATASET_REQUIRED_COLUMNS.get(dataset_name)
+    if output_format == "arrow":
+        output_path = os.path.join(processed_dir, f"processed_{os.path.splitext(dataset_name)[0]}.arrow")
+    else:
+        output_path = os.path.join(processed_dir, f"processed_{dataset_name}")
+
+    seconds = dict.fromkeys(STAGES, 0.0)
+    rows = dict.fromkeys(STAGES, 0)
+    report = {
+        "dataset": dataset_name,
+        "output": output_path,
+        "build": "full",
+        "rows": rows,
+        "seconds": seconds,
+    }
+
+    checkpoint = None
+    if incremental:
+        state_dir = os.path.join(processed_dir, BUILD_STATE_DIR)
+        os.makedirs(state_dir, exist_ok=True)
+        state_path = os.path.join(state_dir, f"{dataset_name}.json")
+        checkpoint_path = os.path.join(state_dir, f"{dataset_name}.cleaned.pickle")
+        state = _load_build_state(state_path)
+        fingerprints = _stage_fingerprints(dataset_name, output_format)
+        fingerprints["input"] = input_fingerprint(filepath, state.get("input"))
+        if (state.get("input", {}).get("sha256") == fingerprints["input"]["sha256"]
+                and state.get("clean") == fingerprints["clean"] and os.path.exists(checkpoint_path)):
+            report["build"] = "transform"
+            if state.get("transform") == fingerprints["transform"] and os.path.exists(output_path):
+                # Still record the new stat, so a touched but unchanged file is not hashed next time
+                _save_build_state(state_path, fingerprints)
+                report["build"] = "unchanged"
+                report["peak_rss_mb"] = peak_rss_mb()
+                return report
+        # Until this build finishes, the checkpoint may not match the recorded state
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        if report["build"] == "full":
+            checkpoint = CheckpointWriter(checkpoint_path)
+
+    deduplicator = HashDeduplicator()
+    table_deduplicator = HashDeduplicator(builder_keys) if builder else None
+    if output_format == "arrow":
+        writer = ArrowChunkWriter(output_path, sort_by=builder_keys, dictionary_columns=builder_keys or ())
+    else:
+        writer = CSVChunkWriter(output_path)
+
+    def run_stage(stage, func, df):
+        start = time.perf_counter()
+        df = func(df)
+        seconds[stage] += time.perf_counter() - start
+        rows[stage] += len(df)
+        return df
+
+    def dedup(df):
+        df = deduplicator.filter(df)
+        return checkpoint.write(df) if checkpoint else df
+
+    def transform(df):
+        df = transform_data(df)
+        if builder:
+            df = table_deduplicator.filter(builder(df))
+        return df
+
+    if report["build"] == "transform":
+        chunks = iter_checkpoint(checkpoint_path)
+    else:
+        chunks = iter_dataset_chunks(filepath, chunksize, DATASET_DTYPES.get(dataset_name))
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        seconds["load"] += time.perf_counter() - start
+        rows["load"] += len(chunk)
+
+        if report["build"] == "full":
+            chunk = run_stage("clean", lambda df: clean_data(df, required_columns), chunk)
+            chunk = run_stage("dedup", dedup, chunk)
+        chunk = run_stage("transform", transform, chunk)
+        run_stage("write", writer.write, chunk)
+
+    start = time.perf_counter()
+    writer.close()
+    if checkpoint:
+        checkpoint.close()
+    seconds["write"] += time.perf_counter() - start
+    if incremental:
+        _save_build_state(state_path, fingerprints)
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def print_report(report):
+    if report["build"] == "unchanged":
+        print(f"{report['dataset']}: unchanged since the last build -> {report['output']}")
+        return
+    rss = f", peak RSS {report['peak_rss_mb']:.1f} MB" if report["peak_rss_mb"] is not None else ""
+    print(f"{report['dataset']}: {report['build']} build{rss} -> {report['output']}")
+    for stage in STAGES:
+        elapsed = report["seconds"][stage]
+        rate = report["rows"][stage] / elapsed if elapsed else 0.0
+        print(f"  {stage:<10} {report['rows'][stage]:>12} rows {elapsed:8.2f} s {rate:12.0f} rows/s")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Clean and transform downloaded datasets.")
+    parser.add_argument("--chunksize", type=int, default=int(os.getenv("PREPARE_CHUNKSIZE", str(DEFAULT_CHUNKSIZE))),
+                        help="Rows per chunk; 0 loads each dataset whole")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PREPARE_WORKERS", "0")) or None,
+                        help="Datasets prepared in parallel (default: one per CPU)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=os.getenv("PREPARE_FORMAT") or DEFAULT_OUTPUT_FORMAT,
+                        help="Processed file format (default: arrow if pyarrow is installed)")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebuild every dataset instead of only those whose input or stages changed")
+    args = parser.parse_args()
+
     data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
     processed_data_dir = os.path.join(data_dir, 'processed')
 
@@ -55,6 +446,7 @@ def main():
     datasets_to_process = [
         # "drug_interactions.csv",
         # "drug_dosages.json",
+        # "dosage_rules.csv",  # becomes processed_dosage_rules.arrow (or .csv), read by scripts/dosage_rules.py
         # "medication_alternatives.csv",
     ]
 
@@ -62,20 +454,25 @@ def main():
     if not datasets_to_process:
         print("No datasets specified for processing. Please ensure you have downloaded datasets and updated 'prepare_datasets.py'.")
     else:
-        for dataset_name in datasets_to_process:
-            filepath = os.path.join(data_dir, dataset_name)
-            print(f"Processing {dataset_name}...")
-            df = load_dataset(filepath)
-            if df is not None:
-                df_cleaned = clean_data(df)
-                df_transformed = transform_data(df_cleaned)
-
-                if df_transformed is not None:
-                    output_filepath = os.path.join(processed_data_dir, f"processed_{dataset_name}")
-                    # Example: Save processed data back to CSV
-                    df_transformed.to_csv(output_filepath, index=False)
-                    print(f"Processed data saved to {output_filepath}")
+        missing = [name for name in datasets_to_process if not os.path.exists(os.path.join(data_dir, name))]
+        for name in missing:
+            print(f"Error: File not found at {os.path.join(data_dir, name)}")
+        datasets = [name for name in datasets_to_process if name not in missing]
+
+        # One fresh process per dataset, so each report's peak RSS is that dataset's alone.
+        # Before Python 3.11 workers are reused, and a peak may include an earlier dataset's.
+        pool_options = {"max_tasks_per_child": 1} if sys.version_info >= (3, 11) else {}
+        with ProcessPoolExecutor(max_workers=args.workers, **pool_options) as pool:
+            futures = {name: pool.submit(prepare_dataset, name, data_dir, processed_data_dir, args.chunksize, args.format,
+                                         incremental=not args.full)
+                       for name in datasets}
+            for name, future in futures.items():
+                try:
+                    print_report(future.result())
+                except Exception as e:
+                    # One broken dataset must not stop the others
+                    print(f"Error processing {name}: {e}")
     print("--- Dataset Mapping and Preparation Finished ---\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,30 @@
+import asyncio
+
+from backend.admission import AdmissionQueue, build_rate_limiter
+
+
+def test_rate_limiting_is_off_unless_configured(monkeypatch):
+    monkeypatch.delenv("RATE_LIMIT_PER_SECOND", raising=False)
+    assert build_rate_limiter() is None
+    monkeypatch.setenv("RATE_LIMIT_PER_SECOND", "5")
+    assert build_rate_limiter().rate == 5
+
+
+def test_timed_out_and_cancelled_waiters_do_not_keep_a_slot():
+    async def scenario():
+        queue = AdmissionQueue("/verify_dosage", limit=1, max_queue=4, queue_timeout=0.01)
+        assert await queue.acquire() is None
+        assert await queue.acquire() == "queue_timeout"
+
+        waiter = asyncio.ensure_future(queue.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        queue.release()
+        await asyncio.sleep(0)
+        assert not queue._semaphore.locked()
+        assert await queue.acquire() is None
+        assert queue.waiting == 0
+
+    asyncio.run(scenario())
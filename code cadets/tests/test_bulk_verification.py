@@ -0,0 +1,82 @@
+import asyncio
+
+from starlette.requests import Request
+
+from backend.bulk_verification import BulkVerifier, NDJSONStreamingResponse, iter_ndjson_lines, read_body
+
+
+class FakeRxNorm:
+    def __init__(self, delay):
+        self.delay = delay
+        self.started = 0
+        self.cancelled = 0
+
+    async def match_name_async(self, drug_name):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return None
+
+
+class FakeSuggester:
+    def __init__(self, delay):
+        self.rxnorm_api = FakeRxNorm(delay)
+
+
+def line(name):
+    return b'{"drug_name": "%s"}\n' % name.encode()
+
+
+def run_bulk(messages, delay):
+    """
+    Sends messages (the request body, then a disconnect) through the bulk response and
+    returns the fake RxNorm client and the messages sent back.
+    """
+    async def scenario():
+        suggester = FakeSuggester(delay)
+        verifier = BulkVerifier(None, suggester, max_concurrency=2)
+        incoming = iter(messages)
+
+        async def receive():
+            await asyncio.sleep(0.01)
+            return next(incoming)
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        body_read = asyncio.Event()
+        request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+        lines = iter_ndjson_lines(read_body(request, body_read))
+        response = NDJSONStreamingResponse(verifier.verify_stream(lines), body_read=body_read)
+        await asyncio.wait_for(response(request.scope, receive, send), 5)
+        await asyncio.sleep(0)
+        return suggester.rxnorm_api, sent
+
+    return asyncio.run(scenario())
+
+
+def test_a_disconnect_while_reading_stops_reading_the_input():
+    messages = [
+        {"type": "http.request", "body": line("aspirin") + line("ibuprofen"), "more_body": True},
+        {"type": "http.disconnect"},
+        {"type": "http.request", "body": line("warfarin"), "more_body": False},
+    ]
+    rxnorm_api, sent = run_bulk(messages, delay=0)
+    assert rxnorm_api.started == 2
+    assert {"type": "http.response.body", "body": b"", "more_body": False} not in sent
+
+
+def test_a_disconnect_after_the_body_cancels_the_pending_lookups():
+    messages = [
+        {"type": "http.request", "body": line("aspirin") + line("ibuprofen"), "more_body": False},
+        {"type": "http.disconnect"},
+    ]
+    rxnorm_api, sent = run_bulk(messages, delay=60)
+    assert rxnorm_api.started == 2
+    assert rxnorm_api.cancelled == 2
+    assert [message["type"] for message in sent] == ["http.response.start"]
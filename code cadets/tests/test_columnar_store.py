@@ -0,0 +1,38 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pd = pytest.importorskip("pandas")
+
+from scripts.columnar_store import ArrowChunkWriter, read_table
+
+
+CHUNKS = [
+    pd.DataFrame({"drug_a": ["warfarin", "aspirin", None], "drug_b": ["ibuprofen", "warfarin", "aspirin"], "row": [0, 1, 2]}),
+    pd.DataFrame({"drug_a": ["aspirin", "warfarin"], "drug_b": ["heparin", "aspirin"], "row": [3, 4]}),
+    pd.DataFrame({"drug_a": ["aspirin"], "drug_b": ["warfarin"], "row": [5]}),
+]
+
+
+def write_pairs(path, **options):
+    writer = ArrowChunkWriter(path, sort_by=["drug_a", "drug_b"], dictionary_columns=["drug_a", "drug_b"], **options)
+    for chunk in CHUNKS:
+        writer.write(chunk)
+    writer.close()
+    return read_table(path)
+
+
+def test_chunks_are_merged_in_sort_order(tmp_path):
+    table = write_pairs(str(tmp_path / "pairs.arrow"))
+    expected = pa.Table.from_pandas(pd.concat(CHUNKS), preserve_index=False).sort_by(
+        [("drug_a", "ascending"), ("drug_b", "ascending")])
+    assert table.column("row").to_pylist() == expected.column("row").to_pylist() == [3, 1, 5, 4, 0, 2]
+    assert pa.types.is_dictionary(table.schema.field("drug_a").type)
+    assert table.column("drug_a").num_chunks == 1
+
+
+def test_merged_rows_are_written_in_batches_sharing_one_dictionary(tmp_path):
+    table = write_pairs(str(tmp_path / "pairs.arrow"), batch_rows=4)
+    assert table.column("row").to_pylist() == [3, 1, 5, 4, 0, 2]
+    assert [len(chunk) for chunk in table.column("drug_b").chunks] == [4, 2]
+    dictionaries = [chunk.dictionary for chunk in table.column("drug_b").chunks]
+    assert dictionaries[0].equals(dictionaries[1])
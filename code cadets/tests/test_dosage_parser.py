@@ -0,0 +1,91 @@
+import pytest
+
+from scripts.dosage_parser import parse_dosage
+
+
+def test_plain_dose():
+    parsed = parse_dosage("500mg")
+    assert (parsed.dose, parsed.dose_unit, parsed.daily_dose, parsed.per_kg) == (500.0, "mg", None, False)
+
+
+def test_frequency_sets_daily_dose():
+    parsed = parse_dosage("1 g twice daily for 7 days")
+    assert (parsed.dose, parsed.frequency_per_day, parsed.daily_dose, parsed.duration_days) == (1000.0, 2, 2000.0, 7.0)
+
+
+def test_liquid_dose_with_concentration():
+    parsed = parse_dosage("5 mL of 250mg/5mL")
+    assert (parsed.dose, parsed.dose_unit) == (250.0, "mg")
+
+
+def test_per_kg_dose_is_scaled_by_weight():
+    parsed = parse_dosage("5mg/kg", patient_weight=20)
+    assert (parsed.dose, parsed.dose_unit, parsed.per_kg) == (100.0, "mg", True)
+
+
+def test_per_kg_dose_without_weight_has_no_dose():
+    parsed = parse_dosage("5mg/kg")
+    assert parsed.per_kg
+    assert parsed.dose is None
+    assert parsed.daily_dose is None
+
+
+def test_per_day_is_a_daily_total():
+    parsed = parse_dosage("500 mg/day")
+    assert parsed.dose is None
+    assert parsed.daily_dose == 500.0
+
+
+def test_per_day_with_frequency_gives_the_dose():
+    parsed = parse_dosage("500 mg/day bid")
+    assert (parsed.dose, parsed.daily_dose) == (250.0, 500.0)
+
+
+def test_per_kg_per_day():
+    parsed = parse_dosage("10 mg/kg/day", patient_weight=20)
+    assert (parsed.dose, parsed.daily_dose, parsed.per_kg) == (None, 200.0, True)
+
+
+def test_units_times_strength_is_one_dose():
+    parsed = parse_dosage("2 x 500mg")
+    assert (parsed.dose, parsed.frequency_per_day) == (1000.0, None)
+
+
+def test_times_after_the_dose_is_a_frequency():
+    parsed = parse_dosage("500mg 2 x daily")
+    assert (parsed.dose, parsed.frequency_per_day, parsed.daily_dose) == (500.0, 2.0, 1000.0)
+
+
+@pytest.mark.parametrize("text", ["100 mg/m2", "10mg/tab", "5 mg/dose", "2 mg/10kg"])
+def test_unknown_denominator_is_not_parsed(text):
+    parsed = parse_dosage(text)
+    assert parsed.dose is None
+    assert parsed.daily_dose is None
+
+
+@pytest.mark.parametrize("text, frequency, daily_dose", [
+    ("100 mg three times daily", 3, 300.0),
+    ("500 mg four times a day", 4, 2000.0),
+    ("500mg x 3 daily", 3, 1500.0),
+    ("500mg daily three times", 3, 1500.0),
+    ("500mg two times per day", 2, 1000.0),
+    ("250mg once daily", 1, 250.0),
+])
+def test_spelled_out_and_trailing_multipliers(text, frequency, daily_dose):
+    parsed = parse_dosage(text)
+    assert (parsed.frequency_per_day, parsed.daily_dose) == (frequency, daily_dose)
+
+
+def test_per_day_in_words_is_a_daily_total():
+    assert parse_dosage("1000mg per day")[2:] == parse_dosage("1000mg/day")[2:]
+    assert parse_dosage("1000mg per day").daily_dose == 1000.0
+
+
+def test_count_of_tablets_is_one_dose():
+    parsed = parse_dosage("2 tablets of 500mg three times a day")
+    assert (parsed.dose, parsed.daily_dose) == (1000.0, 3000.0)
+
+
+def test_times_followed_by_days_is_a_duration():
+    parsed = parse_dosage("500mg x 7 days")
+    assert (parsed.frequency_per_day, parsed.duration_days) == (None, 7.0)
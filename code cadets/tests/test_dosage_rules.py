@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from scripts import dosage_rules
+from scripts.dosage_rules import DosageRuleEngine
+
+HEADER = "rxcui,drug_name,route,age_min,age_max,weight_min,weight_max,min_dose_mg,max_dose_mg,max_daily_mg\n"
+
+
+def write_rules(path, *rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "".join(row + "\n" for row in rows))
+
+
+def test_a_missing_age_is_reported_for_age_dependent_rules(tmp_path):
+    path = str(tmp_path / "rules.csv")
+    write_rules(path, "1191,aspirin,,18,,,,50,1000,4000", "5640,ibuprofen,,,,,,100,800,3200")
+    engine = DosageRuleEngine(path)
+
+    is_safe, message = engine.check("aspirin", 500)
+    assert is_safe and "adult patient was assumed" in message
+    assert "assumed" not in engine.check("aspirin", 500, age=40)[1]
+    assert "assumed" not in engine.check("ibuprofen", 400)[1]
+
+
+def test_an_arrow_file_prepared_after_startup_is_picked_up(tmp_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from scripts.columnar_store import ArrowChunkWriter
+
+    csv_path = str(tmp_path / "processed_dosage_rules.csv")
+    write_rules(csv_path, "1191,aspirin,,,,,,50,1000,4000")
+    monkeypatch.delenv("DOSAGE_RULES_PATH", raising=False)
+    monkeypatch.setattr(dosage_rules, "DEFAULT_RULES_PATH", csv_path)
+    engine = DosageRuleEngine(reload_interval=0)
+    assert engine.check("aspirin", 900) == (True, "Dosage appears to be within the typical range for this patient.")
+
+    writer = ArrowChunkWriter(os.path.join(str(tmp_path), "processed_dosage_rules.arrow"))
+    writer.write(pd.DataFrame({"rxcui": ["1191"], "drug_name": ["aspirin"], "max_dose_mg": [500.0]}))
+    writer.close()
+
+    assert engine.check("aspirin", 900)[0] is False
+    assert engine.path.endswith(".arrow")
+
+
+def test_a_child_taking_aspirin_is_not_assumed_safe(tmp_path):
+    from scripts.drug_suggestions import DrugSuggester
+
+    suggester = DrugSuggester.__new__(DrugSuggester)
+    suggester.dosage_rules = DosageRuleEngine(str(tmp_path / "missing.csv"))
+
+    is_safe, message = suggester.verify_dosage("Aspirin", "2000mg", 10)
+    assert is_safe is False
+    assert "cannot be verified" in message
+    assert suggester.verify_dosage("Aspirin", "500mg", 40)[0] is True
+    assert suggester.verify_dosage("Aspirin", "2000mg", 40)[0] is False
@@ -0,0 +1,93 @@
+import hashlib
+import os
+
+import pytest
+
+from benchmarks.stubs import FileStubHandler, start_stub_server
+from scripts.download_datasets import download_file
+
+BODY = bytes(range(256)) * 4096  # 1 MB
+CHECKSUM = f"sha256:{hashlib.sha256(BODY).hexdigest()}"
+
+
+class RecordingFileHandler(FileStubHandler):
+    """
+    Records (method, Range header) of every request in the 'requests' list.
+    """
+    requests = None
+
+    def do_HEAD(self):
+        self.requests.append(("HEAD", None))
+        super().do_HEAD()
+
+    def do_GET(self):
+        self.requests.append(("GET", self.headers.get("Range")))
+        super().do_GET()
+
+
+@pytest.fixture(scope="module")
+def server():
+    files, requests = {}, []
+    server, url = start_stub_server(RecordingFileHandler, files=files, requests=requests)
+    yield files, requests, f"{url}/dataset.bin"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mirror(server):
+    files, requests, url = server
+    files["dataset.bin"] = BODY
+    requests.clear()
+    return server
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_resumes_a_partial_download(mirror, tmp_path):
+    _, requests, url = mirror
+    half = len(BODY) // 2
+    with open(tmp_path / "dataset.bin.part", "wb") as f:
+        f.write(BODY[:half])
+
+    path = download_file(url, str(tmp_path), checksum=CHECKSUM, segments=1)
+
+    assert path == os.path.join(str(tmp_path), "dataset.bin")
+    assert read(path) == BODY
+    assert requests == [("HEAD", None), ("GET", f"bytes={half}-")]
+    assert not os.path.exists(tmp_path / "dataset.bin.part")
+
+
+def test_large_files_are_fetched_in_segments(mirror, tmp_path):
+    _, requests, url = mirror
+    assert download_file(url, str(tmp_path), checksum=CHECKSUM, segments=4, segment_threshold=1)
+    ranges = sorted(header for method, header in requests if method == "GET")
+    assert len(ranges) == 4 and all(header.startswith("bytes=") for header in ranges)
+
+
+def test_checksum_mismatch_discards_the_download(mirror, tmp_path):
+    _, _, url = mirror
+
+    path = download_file(url, str(tmp_path), checksum="sha256:" + "0" * 64, segments=1)
+
+    assert path is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_unchanged_etag_skips_the_download(mirror, tmp_path):
+    files, requests, url = mirror
+    path = download_file(url, str(tmp_path), checksum=CHECKSUM, segments=1)
+    requests.clear()
+
+    assert download_file(url, str(tmp_path), checksum=CHECKSUM, segments=1) == path
+    assert requests == [("HEAD", None)]
+
+    # A new version of the file has a new ETag and is downloaded again
+    files["dataset.bin"] = BODY[::-1]
+    requests.clear()
+    assert download_file(url, str(tmp_path), segments=1) == path
+    assert requests == [("HEAD", None), ("GET", None)]
+    assert read(path) == BODY[::-1]
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from api_clients.circuit_breaker import CircuitBreaker
+from api_clients.response_cache import ResponseCache
+from api_clients.rxnorm_store import RxNormStore
+from nlp_models.ibm_granite_nlp import IBMLanguageModel
+from scripts.interaction_index import IngredientResolver
+from scripts.load_rxnorm import build_store
+
+RRF_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "rrf")
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.prompts = []
+
+    def post(self, url, headers=None, auth=None, data=None):
+        self.prompts.append(data)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"results": [{"generated_text": f"analysis {len(self.prompts)}"}]}
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    db_path = str(tmp_path / "rxnorm.db")
+    build_store(RRF_DIR, db_path)
+    store = RxNormStore(db_path)
+    yield IngredientResolver(store)
+    store.close()
+
+
+def granite(transport, resolver):
+    model = IBMLanguageModel(api_key="stub", service_url="http://granite.invalid/ml/v1/text/generation",
+                             transport=transport, cache=ResponseCache(disk_path=None), drug_resolver=resolver)
+    model.breaker = CircuitBreaker("granite-test")
+    return model
+
+
+def test_texts_naming_the_same_drugs_share_an_analysis(resolver):
+    transport = RecordingTransport()
+    model = granite(transport, resolver)
+
+    assert resolver.drugs_in_text("Take Advil 200mg with Bayer aspirin") == ("aspirin", "ibuprofen")
+    first = model.analyze_text("Take Advil 200mg with Bayer aspirin")
+    assert model.analyze_text("ASPIRIN 81 mg daily; ibuprofen as needed") == first
+    assert len(transport.prompts) == 1
+
+    # Texts in which no drug is recognized are keyed by their prompt
+    model.analyze_text("Rest and fluids")
+    model.analyze_text("Plenty of fluids")
+    assert len(transport.prompts) == 3
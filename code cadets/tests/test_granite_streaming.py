@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from api_clients.circuit_breaker import CircuitBreaker
+from api_clients.http_transport import AsyncHTTPTransport
+from benchmarks.stubs import GraniteStubHandler, start_stub_server
+from nlp_models.ibm_granite_nlp import IBMLanguageModel
+from nlp_models.nlp_integrator import NLPIntegrator
+
+
+@pytest.fixture
+def granite(monkeypatch):
+    """
+    Returns a function starting a Granite stub with the given attributes and an
+    integrator whose only stage is a streaming client of it.
+    """
+    monkeypatch.setenv("GRANITE_CACHE_ENABLED", "false")
+    servers = []
+
+    def start(**attributes):
+        server, url = start_stub_server(GraniteStubHandler, **attributes)
+        servers.append(server)
+        model = IBMLanguageModel(api_key="stub", service_url=f"{url}/ml/v1/text/generation",
+                                 async_transport=AsyncHTTPTransport(max_retries=0))
+        # A breaker of its own, so failures here do not open the shared one
+        model.breaker = CircuitBreaker("granite-test")
+        integrator = NLPIntegrator.__new__(NLPIntegrator)
+        integrator.ner_model = None
+        integrator.interaction_index = None
+        integrator.ibm_nlp_model = model
+        integrator.interaction_timeout = 10
+        return integrator
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def stream_events(integrator):
+    async def run():
+        return [event async for event in integrator.analyze_prescription_stream("Warfarin 5mg and Ibuprofen 400mg")]
+    return asyncio.run(run())
+
+
+def test_streamed_tokens_end_with_done(granite):
+    events = stream_events(granite())
+    assert [event for event, _ in events] == ["entities"] + ["token"] * len(GraniteStubHandler.STUB_TOKENS) + ["done"]
+    assert not events[-1][1]["partial"]
+
+
+def test_an_upstream_error_status_sends_an_error_event(granite):
+    events = stream_events(granite(error_rate=1.0, error_status=500))
+    assert [event for event, _ in events] == ["entities", "error", "done"]
+    assert events[-1][1]["failed"] == ["interaction"]
+    assert events[-1][1]["partial"]
+
+
+def test_a_stream_cut_off_midway_sends_an_error_event(granite):
+    events = stream_events(granite(fail_after_tokens=3))
+    assert [event for event, _ in events] == ["entities", "token", "token", "token", "error", "done"]
+    assert events[-1][1]["partial"]
@@ -0,0 +1,16 @@
+import httpx
+from urllib3 import HTTPResponse
+
+from api_clients.http_transport import AsyncHTTPTransport, HTTPTransport
+
+
+def test_retry_after_is_capped_at_the_max_backoff():
+    transport = AsyncHTTPTransport(backoff_factor=0.5, max_backoff=2)
+    assert transport._backoff(0, httpx.Response(429, headers={"Retry-After": "1"})) == 1
+    assert transport._backoff(0, httpx.Response(429, headers={"Retry-After": "3600"})) == 2
+    assert transport._backoff(10) == 2
+
+    retry = HTTPTransport(max_backoff=2).session.get_adapter("https://").max_retries
+    response = HTTPResponse(status=503, headers={"Retry-After": "3600"})
+    assert retry.get_retry_after(response) == 2
+    assert retry.increment("GET", "/", response=response).get_retry_after(response) == 2
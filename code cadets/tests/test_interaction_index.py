@@ -0,0 +1,90 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from api_clients.rxnorm_store import RxNormStore
+from nlp_models.nlp_integrator import NLPIntegrator
+from scripts.columnar_store import ArrowChunkWriter, arrow_available
+from scripts.interaction_index import IngredientResolver, InteractionIndex, build_interaction_table
+from scripts.load_rxnorm import build_store
+
+RRF_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "rrf")
+
+RAW = pd.DataFrame({
+    "drug1": ["Warfarin", "Bayer"],
+    "drug2": ["ibuprofen", "Warfarin"],
+    "severity": ["major", "major"],
+    "description": ["Bleeding risk", "Bleeding risk"],
+})
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    db_path = str(tmp_path / "rxnorm.db")
+    build_store(RRF_DIR, db_path)
+    store = RxNormStore(db_path)
+    yield IngredientResolver(store)
+    store.close()
+
+
+def test_brands_are_looked_up_by_ingredient(resolver, tmp_path):
+    table = build_interaction_table(RAW, resolver)
+    assert sorted(zip(table["drug_a"], table["drug_b"])) == [("aspirin", "warfarin"), ("ibuprofen", "warfarin")]
+
+    path = str(tmp_path / "interactions.csv")
+    table.to_csv(path, index=False)
+    index = InteractionIndex.from_file(path, resolver)
+    assert index.lookup("Advil", "warfarin").drug_a == "ibuprofen"
+    assert [i.drug_a for i in index.find_interactions(["warfarin", "Advil", "Bayer"])] == ["aspirin", "ibuprofen"]
+    assert index.lookup("Advil", "ibuprofen") is None
+
+
+@pytest.mark.skipif(not arrow_available(), reason="pyarrow is not installed")
+def test_mapped_index_resolves_brands_and_an_empty_table_is_no_index(resolver, tmp_path):
+    path = str(tmp_path / "interactions.arrow")
+    writer = ArrowChunkWriter(path, sort_by=["drug_a", "drug_b"], dictionary_columns=["drug_a", "drug_b"])
+    writer.write(build_interaction_table(RAW, resolver))
+    writer.close()
+    assert InteractionIndex.from_file(path, resolver).lookup("warfarin", "Advil").drug_b == "warfarin"
+
+    empty = str(tmp_path / "empty.arrow")
+    ArrowChunkWriter(empty).close()
+    assert InteractionIndex.from_file(empty, resolver) is None
+
+
+@pytest.mark.skipif(not arrow_available(), reason="pyarrow is not installed")
+def test_mapped_index_finds_pairs_across_record_batches(tmp_path):
+    pairs = [(a, b) for a in ["aspirin", "heparin", "ibuprofen"] for b in ["naproxen", "warfarin", "zinc"]]
+    table = pd.DataFrame({"drug_a": [a for a, _ in pairs], "drug_b": [b for _, b in pairs],
+                          "severity": "major", "description": [f"{a}+{b}" for a, b in pairs]})
+    path = str(tmp_path / "interactions.arrow")
+    writer = ArrowChunkWriter(path, sort_by=["drug_a", "drug_b"], dictionary_columns=["drug_a", "drug_b"], batch_rows=2)
+    writer.write(table)
+    writer.close()
+
+    index = InteractionIndex.from_file(path, IngredientResolver())
+    assert all(index.lookup(a, b).description == f"{a}+{b}" for a, b in pairs)
+    assert index.lookup("aspirin", "ibuprofen") is None
+    assert index.lookup("heparin", "aspirin") is None
+
+
+class TextOnlyGranite:
+    def analyze_text(self, text):
+        return f"analysis of {text}"
+
+
+def test_without_ner_granite_analyzes_the_full_text():
+    integrator = NLPIntegrator.__new__(NLPIntegrator)
+    integrator.ner_model = None
+    integrator.interaction_index = InteractionIndex([])
+    integrator.ibm_nlp_model = TextOnlyGranite()
+    integrator.interaction_timeout = 5
+    integrator.interaction_executor = ThreadPoolExecutor(max_workers=1)
+
+    result = integrator.analyze_prescription("Advil and warfarin")
+
+    assert result["interaction_analysis"] == "analysis of Advil and warfarin"
+    assert result["interactions"] is None
+
@@ -0,0 +1,67 @@
+import pytest
+
+from api_clients.fuzzy_name_index import FuzzyNameIndex
+from api_clients.rxnorm_api import NameMatch, RxNormAPI
+
+
+class FakeStore:
+    names = {"aspirin": "1191", "ibuprofen": "5640"}
+
+    def get_rxcui_by_name(self, drug_name):
+        return self.names.get(" ".join(drug_name.lower().split()))
+
+
+@pytest.fixture
+def rxnorm_api(monkeypatch):
+    monkeypatch.setenv("RXNORM_CACHE_ENABLED", "false")
+    index = FuzzyNameIndex([(name, rxcui, "IN") for name, rxcui in FakeStore.names.items()])
+    return RxNormAPI(local_store=FakeStore(), remote_fallback=False, fuzzy_index=index)
+
+
+def test_exact_lookups_do_not_correct_typos(rxnorm_api):
+    assert rxnorm_api.get_rxcui_by_name("Aspirin") == "1191"
+    assert rxnorm_api.get_rxcui_by_name("aspirn") is None
+    assert rxnorm_api.resolve_many(["aspirn", "Aspirin"]) == {"aspirn": None, "Aspirin": "1191"}
+
+
+def test_match_name_reports_the_correction(rxnorm_api):
+    assert rxnorm_api.match_name("Aspirin") == NameMatch("1191", "Aspirin", 0)
+    assert rxnorm_api.match_name("aspirn") == NameMatch("1191", "aspirin", 1)
+    assert rxnorm_api.match_name("zzzzzz") is None
+    assert rxnorm_api.match_many(["ibuprofin"])["ibuprofin"].describe() == {
+        "rxcui": "5640", "matched_name": "ibuprofen", "edit_distance": 1, "corrected": True,
+    }
+
+
+def test_dosage_is_not_verified_against_a_corrected_name(rxnorm_api):
+    from scripts.drug_suggestions import DrugSuggester
+
+    suggester = DrugSuggester()
+    suggester.rxnorm_api = rxnorm_api
+    is_safe, message = suggester.verify_dosage("aspirn", "500mg", 40)
+    assert is_safe is False
+    assert "did you mean 'aspirin'" in message
+
+
+class FakeGraph:
+    def __contains__(self, rxcui):
+        return rxcui == "1191"
+
+    def alternatives(self, rxcui, patient_age):
+        return [{"name": "Acetaminophen", "rxcui": "161", "type": "IN"}] if rxcui == "1191" else None
+
+
+def test_alternatives_are_not_suggested_for_an_unreported_correction(rxnorm_api):
+    from scripts.drug_suggestions import DrugSuggester
+
+    suggester = DrugSuggester()
+    suggester.rxnorm_api = rxnorm_api
+    suggester.alternatives_graph = FakeGraph()
+    assert suggester.suggest_alternatives("aspirn") == []
+    assert suggester.suggest_alternatives_many(["aspirn", "Aspirin"]) == {
+        "aspirn": [], "Aspirin": [{"name": "Acetaminophen", "rxcui": "161", "type": "IN"}],
+    }
+
+    # A caller passing the match reports the correction itself
+    match = rxnorm_api.match_name("aspirn")
+    assert suggester.suggest_alternatives("aspirn", match=match)[0]["name"] == "Acetaminophen"
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from nlp_models.ner_server import NERServer, NERUnavailable, RemoteNERModel
+from nlp_models.nlp_integrator import NLPIntegrator
+
+
+class FakeNER:
+    def extract_entities_batch(self, texts):
+        return [[{"word": text.split()[0], "entity_group": "DRUG"}] for text in texts]
+
+
+class StaleConnection:
+    closed = False
+
+    def send(self, texts):
+        raise BrokenPipeError("server restarted")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def server_address(tmp_path):
+    address = str(tmp_path / "ner.sock")
+    server = NERServer(address, authkey="test", ner_model=FakeNER())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(address):
+            break
+        time.sleep(0.01)
+    return address
+
+
+def test_a_stale_connection_is_closed_before_reconnecting(server_address):
+    model = RemoteNERModel(server_address, authkey="test")
+    stale = StaleConnection()
+    model.local.conn = stale
+
+    assert model.extract_entities("Warfarin 5mg")[0]["word"] == "Warfarin"
+    assert stale.closed
+    model.local.conn.close()
+
+
+def test_without_the_server_prescriptions_are_analyzed_without_ner(tmp_path):
+    model = RemoteNERModel(str(tmp_path / "missing.sock"), authkey="test")
+    with pytest.raises(NERUnavailable):
+        model.extract_entities("Warfarin 5mg")
+
+    class TextOnlyGranite:
+        def analyze_text(self, text):
+            return "analysis"
+
+    integrator = NLPIntegrator.__new__(NLPIntegrator)
+    integrator.ner_model = model
+    integrator.interaction_index = None
+    integrator.ibm_nlp_model = TextOnlyGranite()
+    integrator.ner_timeout = integrator.interaction_timeout = 5
+    integrator.ner_executor = integrator.interaction_executor = ThreadPoolExecutor(max_workers=2)
+
+    result = integrator.analyze_prescription("Warfarin 5mg")
+    assert result["interaction_analysis"] == "analysis"
+    assert result["extracted_entities"] == []
+    assert result["failed"] == ["ner"]
+    assert result["partial"]
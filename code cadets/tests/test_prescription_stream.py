@@ -0,0 +1,32 @@
+import asyncio
+
+from nlp_models.nlp_integrator import NLPIntegrator
+
+
+class FailingGranite:
+    def analyze_text_stream_async(self, text):
+        async def chunks():
+            yield "Warfarin "
+            raise RuntimeError("stream broke")
+        return chunks()
+
+
+def collect(integrator, text):
+    async def run():
+        return [event async for event in integrator.analyze_prescription_stream(text)]
+    return asyncio.run(run())
+
+
+def test_a_failed_generation_is_reported_as_an_error_event():
+    integrator = NLPIntegrator.__new__(NLPIntegrator)
+    integrator.ner_model = None
+    integrator.interaction_index = None
+    integrator.ibm_nlp_model = FailingGranite()
+    integrator.interaction_timeout = 5
+
+    events = collect(integrator, "Warfarin 5mg")
+
+    assert [event for event, _ in events] == ["entities", "token", "error", "done"]
+    assert events[2][1]["stage"] == "interaction"
+    assert events[3][1]["failed"] == ["interaction"]
+    assert events[3][1]["partial"]
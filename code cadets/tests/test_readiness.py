@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.components import LazyComponent
+
+
+def failing_factory():
+    raise RuntimeError("model files missing")
+
+
+def test_ready_only_once_every_component_loaded(monkeypatch):
+    loaded = LazyComponent("drug_suggester", object)
+    broken = LazyComponent("nlp_integrator", failing_factory)
+    monkeypatch.setattr(main, "COMPONENTS", [loaded, broken])
+    client = TestClient(main.app)
+
+    assert client.get("/ready").status_code == 503
+    loaded.get()
+    broken.get()
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["failed"] == ["nlp_integrator"]
+
+    monkeypatch.setattr(main, "COMPONENTS", [loaded])
+    assert client.get("/ready").json()["ready"]
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from api_clients.rxnorm_store import RxNormStore
+from scripts.load_rxnorm import build_store
+
+RRF_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "rrf")
+
+
+@pytest.fixture
+def store(tmp_path):
+    db_path = str(tmp_path / "rxnorm.db")
+    build_store(RRF_DIR, db_path)
+    store = RxNormStore(db_path)
+    yield store
+    store.close()
+
+
+def test_name_lookup(store):
+    assert store.get_rxcui_by_name("aspirin") == "1191"
+    assert store.get_rxcui_by_name("  ASPIRIN ") == "1191"
+    assert store.get_rxcui_by_name("acetylsalicylic acid") == "1191"
+    assert store.get_rxcui_by_name("advil") == "153010"
+
+
+def test_other_sources_and_suppressed_atoms_are_not_loaded(store):
+    assert store.get_rxcui_by_name("aspirin 325 mg") is None
+    assert store.get_rxcui_by_name("retired drug") is None
+
+
+def test_related_concepts(store):
+    assert store.get_related_concepts("1191", rela="has_tradename") == [
+        {"conceptType": "BN", "concept": [{"rxcui": "215568", "name": "Bayer", "tty": "BN"}]}
+    ]
+    assert store.get_related_concepts("215568", rela="tradename_of") == [
+        {"conceptType": "IN", "concept": [{"rxcui": "1191", "name": "aspirin", "tty": "IN"}]}
+    ]
+    # The MTHSPL relation between ibuprofen and aspirin is not loaded
+    assert store.get_related_concepts("1191", rela="ALL") == [
+        {"conceptType": "BN", "concept": [{"rxcui": "215568", "name": "Bayer", "tty": "BN"}]}
+    ]
+    assert store.get_related_concepts("9999") is None
+
+
+def test_drug_properties(store):
+    assert store.get_drug_properties("1191") == {
+        "RxCUI": "1191", "RxNorm Name": "aspirin", "TTY": "IN", "RXN_HUMAN_DRUG": "US",
+    }
+    assert store.get_drug_properties("9999") is None